@@ -0,0 +1,3 @@
+"""
+Offline benchmarks of dollarslice against a local mock LLM server, see run.py
+"""
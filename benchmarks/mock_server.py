@@ -0,0 +1,199 @@
+"""
+Local stand-in for the OpenAI/Groq, Anthropic and Ollama APIs
+
+Replays a scripted sequence of tool calls: script[i] lists the (name, arguments)
+calls answered on round i, where the round is the number of assistant turns in the
+request (for Ollama's raw /api/generate prompt, the number of previous function
+calls). Rounds past the end of the script repeat its last entry. Nothing is kept
+between requests, so any number of concurrent runs can follow the same script.
+"""
+
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PREVIOUS_CALL = re.compile(r'^\d+ ', re.MULTILINE)
+
+def _round_of_messages(body: dict) -> int:
+    return sum(1 for message in body.get('messages', []) if message.get('role') == 'assistant')
+
+def _round_of_prompt(body: dict) -> int:
+    prompt = body.get('prompt', '')
+    start = prompt.find('Previous function calls:')
+    end = prompt.find('Produce JSON OUTPUT ONLY!')
+    return len(_PREVIOUS_CALL.findall(prompt[start:end])) if start >= 0 else 0
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: 'MockLLMServer'
+
+    def setup(self):
+        super().setup()
+        # answer without waiting for delayed ACKs, the latency is configured explicitly
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers['Content-Length']))
+        body = json.loads(raw)
+        mock = self.server.mock
+        mock._count(len(raw))
+        prompt_tokens = len(raw) // 4
+        if self.path.endswith('/chat/completions'):
+            calls = mock.calls_for(_round_of_messages(body))
+            handler = self._openai
+        elif self.path.endswith('/messages'):
+            calls = mock.calls_for(_round_of_messages(body))
+            handler = self._anthropic
+        elif self.path.endswith('/api/chat'):
+            calls = mock.calls_for(_round_of_messages(body))
+            handler = self._ollama_chat
+        elif self.path.endswith('/api/generate'):
+            calls = mock.calls_for(_round_of_prompt(body))[:1]
+            handler = self._ollama_generate
+        else:
+            self.send_error(404)
+            return
+        if mock.latency:
+            time.sleep(mock.latency)
+        handler(calls, bool(body.get('stream')), prompt_tokens, mock.completion_tokens * max(len(calls), 1))
+
+    def _send_json(self, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, chunks, content_type: str):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for index, chunk in enumerate(chunks):
+            if index and self.server.mock.chunk_delay:
+                time.sleep(self.server.mock.chunk_delay)
+            data = chunk.encode()
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _openai(self, calls, stream, prompt_tokens, completion_tokens):
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        tool_calls = [{"id": f"call_{i}", "type": "function",
+                       "function": {"name": name, "arguments": json.dumps(arguments)}}
+                      for i, (name, arguments) in enumerate(calls)]
+        if not stream:
+            message = {"role": "assistant", "content": None, "tool_calls": tool_calls} if tool_calls else {"role": "assistant", "content": "done"}
+            self._send_json({"choices": [{"index": 0, "message": message, "finish_reason": "tool_calls"}], "usage": usage})
+            return
+        events = []
+        for i, call in enumerate(tool_calls):
+            arguments = call["function"]["arguments"]
+            events.append({"index": i, "id": call["id"], "type": "function", "function": {"name": call["function"]["name"], "arguments": ""}})
+            middle = len(arguments) // 2
+            events += [{"index": i, "function": {"arguments": part}} for part in (arguments[:middle], arguments[middle:])]
+        chunks = [{"choices": [{"index": 0, "delta": {"tool_calls": [event]}}]} for event in events]
+        chunks += [{"choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}]}, {"choices": [], "usage": usage}]
+        self._send_stream([f"data: {json.dumps(chunk)}\n\n" for chunk in chunks] + ["data: [DONE]\n\n"], 'text/event-stream')
+
+    def _anthropic(self, calls, stream, prompt_tokens, completion_tokens):
+        blocks = [{"type": "tool_use", "id": f"toolu_{i}", "name": name, "input": arguments}
+                  for i, (name, arguments) in enumerate(calls)]
+        usage = {"input_tokens": prompt_tokens, "output_tokens": completion_tokens}
+        if not stream:
+            self._send_json({"type": "message", "role": "assistant", "content": blocks,
+                             "stop_reason": "tool_use", "usage": usage})
+            return
+        events = [{"type": "message_start", "message": {"role": "assistant", "usage": {"input_tokens": prompt_tokens, "output_tokens": 1}}}]
+        for i, block in enumerate(blocks):
+            events.append({"type": "content_block_start", "index": i, "content_block": dict(block, input={})})
+            events.append({"type": "content_block_delta", "index": i, "delta": {"type": "input_json_delta", "partial_json": json.dumps(block["input"])}})
+            events.append({"type": "content_block_stop", "index": i})
+        events += [{"type": "message_delta", "delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": completion_tokens}},
+                   {"type": "message_stop"}]
+        self._send_stream([f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events], 'text/event-stream')
+
+    def _ollama_generate(self, calls, stream, prompt_tokens, completion_tokens):
+        name, arguments = calls[0] if calls else ("none", {})
+        text = json.dumps({"name": name, "arguments": arguments})
+        final = {"model": "mock", "done": True, "prompt_eval_count": prompt_tokens, "eval_count": completion_tokens}
+        if not stream:
+            self._send_json(dict(final, response=text))
+            return
+        middle = len(text) // 2
+        chunks = [{"model": "mock", "response": part, "done": False} for part in (text[:middle], text[middle:])]
+        self._send_stream([json.dumps(chunk) + "\n" for chunk in chunks + [dict(final, response="")]], 'application/x-ndjson')
+
+    def _ollama_chat(self, calls, stream, prompt_tokens, completion_tokens):
+        message = {"role": "assistant", "content": "",
+                   "tool_calls": [{"function": {"name": name, "arguments": arguments}} for name, arguments in calls]}
+        final = {"model": "mock", "done": True, "done_reason": "stop", "prompt_eval_count": prompt_tokens, "eval_count": completion_tokens}
+        if not stream:
+            self._send_json(dict(final, message=message))
+            return
+        chunks = [{"model": "mock", "message": message, "done": False},
+                  dict(final, message={"role": "assistant", "content": ""})]
+        self._send_stream([json.dumps(chunk) + "\n" for chunk in chunks], 'application/x-ndjson')
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+class MockLLMServer:
+    """
+    latency: seconds slept before answering each request, chunk_delay: seconds
+    between streamed chunks. Use as a context manager or call start()/stop().
+    """
+
+    def __init__(self, script: list = None, latency: float = 0.0, chunk_delay: float = 0.0,
+                 completion_tokens: int = 20, host: str = '127.0.0.1', port: int = 0):
+        self.script = script or [[]]
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.completion_tokens = completion_tokens
+        self.requests = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread = None
+
+    def calls_for(self, round: int) -> list:
+        return list(self.script[min(round, len(self.script) - 1)])
+
+    def _count(self, size: int):
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += size
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """Environment variables pointing the env-configured providers at this server"""
+        return {"OPENAI_API_KEY": "mock", "OPENAI_BASE_URL": f"{self.url}/v1"}
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,198 @@
+"""
+Measure the overhead dollarslice adds on top of the LLM and the tools
+
+    python -m benchmarks [--workloads hungry_box,long_run] [--repeat 3] [--latency 0]
+                         [--save-baseline NAME] [--compare NAME] [--json]
+
+Every workload runs against the local mock server. Reported per workload:
+  step_overhead  solve time not spent waiting for the LLM server or in tools, per step
+  llm_overhead   client side time of each LLM call outside the network (schema building,
+                 serialization, parsing)
+  save_time      time spent writing the run
+  peak_memory    tracemalloc peak of one run
+and for the fan_out workload, runs_per_sec of solve_many at --concurrency.
+Baselines are JSON files in benchmarks/baselines/, compare flags metrics that got
+worse by more than --threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from dollarslice import Hooks, solve_many, create_simple_llm, BatchStats
+from .mock_server import MockLLMServer
+from .workloads import all_workloads
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+LOWER_IS_BETTER = ('step_overhead', 'llm_overhead', 'save_time', 'peak_memory', 'solve_time')
+
+class Collector(Hooks):
+    """Sums the timings of one solve"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.network_time = 0.0
+        self.llm_overhead = 0.0
+        self.llm_calls = 0
+        self.tool_time = 0.0
+        self.solve = None
+
+    def on_llm_end(self, messages, tool_results, metrics):
+        network = metrics.get("network_time", 0.0) + metrics.get("rate_limit_wait", 0.0)
+        with self.lock:
+            self.llm_calls += 1
+            self.network_time += network
+            self.llm_overhead += max(metrics.get("duration", network) - network, 0.0)
+
+    def on_tool_end(self, name, args, id, output, trace):
+        with self.lock:
+            self.tool_time += trace["duration"]
+
+    def on_solve_end(self, final_result, answer_generated, steps, timings):
+        self.solve = {"steps": len(steps), "answer_generated": answer_generated, **timings}
+
+def measure(workload, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        collector = Collector()
+        workload.run(collector)
+        solve = collector.solve
+        if solve is None or not solve["answer_generated"]:
+            raise RuntimeError(f"{workload.name} did not reach its final answer")
+        overhead = solve["duration"] - collector.network_time - collector.tool_time
+        samples.append({
+            "solve_time": solve["duration"],
+            "step_overhead": overhead / max(solve["steps"], 1),
+            "llm_overhead": collector.llm_overhead / max(collector.llm_calls, 1),
+            "save_time": solve["save_time"],
+            "steps": solve["steps"]
+        })
+    result = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+    tracemalloc.start()
+    try:
+        workload.run(None)
+        result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result
+
+def measure_throughput(workload, runs: int, concurrency: int) -> float:
+    stats = BatchStats()
+    args = workload.task_args()
+    results = list(solve_many(args["task_id"], args["task"], [{"subject": str(i)} for i in range(runs)], args["functions"],
+                              create_simple_llm(), save=True, concurrency=concurrency, stats=stats, **workload.options))
+    failed = [r for r in results if r["error"] is not None]
+    if failed:
+        raise RuntimeError(f"throughput run failed: {failed[0]['error']!r}")
+    return stats.report()["runs_per_sec"]
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(BASELINE_DIR), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def run_benchmarks(names: list = None, repeat: int = 3, latency: float = 0.0,
+                   throughput_runs: int = 64, concurrency: int = 16) -> dict:
+    workloads = [w for w in all_workloads() if not names or w.name in names]
+    report = {"revision": git_revision(), "python": platform.python_version(), "latency": latency,
+              "created": time.time(), "workloads": {}}
+    saved_env = {key: os.environ.get(key) for key in ("OPENAI_API_KEY", "OPENAI_BASE_URL", "DOLLAR_SLICE_SAVE_LOC")}
+    with tempfile.TemporaryDirectory() as save_dir:
+        os.environ["DOLLAR_SLICE_SAVE_LOC"] = save_dir
+        try:
+            for workload in workloads:
+                with MockLLMServer(workload.script, latency=latency) as server:
+                    os.environ.update(server.env())
+                    result = measure(workload, repeat)
+                    if workload.name == "fan_out":
+                        result["runs_per_sec"] = measure_throughput(workload, throughput_runs, concurrency)
+                report["workloads"][workload.name] = result
+        finally:
+            for key, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+    return report
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """(workload, metric, baseline, current, relative change, regressed) rows"""
+    rows = []
+    for name, metrics in report["workloads"].items():
+        for metric, value in metrics.items():
+            previous = baseline.get("workloads", {}).get(name, {}).get(metric)
+            if previous is None or metric == "steps":
+                continue
+            change = (value - previous) / previous if previous else 0.0
+            worse = change if metric in LOWER_IS_BETTER else -change
+            rows.append((name, metric, previous, value, change, worse > threshold))
+    return rows
+
+def _format(metric: str, value) -> str:
+    if metric == "peak_memory":
+        return f"{value / 1024 / 1024:.2f}MB"
+    if metric in ("steps",):
+        return str(int(value))
+    if metric == "runs_per_sec":
+        return f"{value:.1f}/s"
+    return f"{value * 1000:.3f}ms"
+
+def print_report(report: dict):
+    print(f"revision {report['revision']}  python {report['python']}  server latency {report['latency']}s")
+    for name, metrics in report["workloads"].items():
+        print(f"{name:<18}" + "  ".join(f"{metric} {_format(metric, value)}" for metric, value in metrics.items()))
+
+def print_comparison(rows: list, baseline: dict):
+    print(f"\ncompared with baseline of revision {baseline.get('revision')}")
+    for name, metric, previous, value, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<18}{metric:<15}{_format(metric, previous):>12} -> {_format(metric, value):>12}  {change:+.1%}{flag}")
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Offline dollarslice benchmarks")
+    parser.add_argument("--workloads", help="comma separated workload names, default all")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server latency per request in seconds")
+    parser.add_argument("--throughput-runs", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--threshold", type=float, default=0.20, help="relative change counted as a regression")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    names = args.workloads.split(",") if args.workloads else None
+    report = run_benchmarks(names, args.repeat, args.latency, args.throughput_runs, args.concurrency)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    regressed = False
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold)
+        regressed = any(row[5] for row in rows)
+        if not args.json:
+            print_comparison(rows, baseline)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save_baseline), "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if regressed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Benchmark workloads: the examples, run unmodified against the mock server, and
+synthetic stress cases
+"""
+
+import abc
+import contextlib
+import io
+import os
+import runpy
+
+from dollarslice import solve, final_answer, create_simple_llm, use_hooks
+
+EXAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'examples')
+
+class Workload(abc.ABC):
+    """A scripted task; run(hooks) performs one solve with the mock server answering"""
+
+    name = None
+    script = None
+
+    @abc.abstractmethod
+    def run(self, hooks):
+        pass
+
+class ExampleWorkload(Workload):
+    """Runs an examples/ script as __main__, its own solve call and settings included"""
+
+    def __init__(self, name: str, file_name: str, script: list):
+        self.name = name
+        self.path = os.path.join(EXAMPLES_DIR, file_name)
+        self.script = script
+
+    def run(self, hooks):
+        with use_hooks(hooks), contextlib.redirect_stdout(io.StringIO()):
+            runpy.run_path(self.path, run_name='__main__')
+
+def make_tool(name: str, doc: str, output: str = None):
+    def tool(query: str) -> str:
+        return output if output is not None else f"{name} looked at {query}"
+    tool.__name__ = tool.__qualname__ = name
+    tool.__doc__ = doc
+    return tool
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+class SyntheticWorkload(Workload):
+    def __init__(self, name: str, functions: list, script: list, **options):
+        self.name = name
+        self.functions = functions + [answer]
+        self.script = script
+        self.options = dict(options, call_limit=len(script) + 1)
+
+    def task_args(self) -> dict:
+        return {"task_id": f"benchmark_{self.name}", "task": f"Benchmark task {self.name} for {{subject}}",
+                "functions": self.functions}
+
+    def run(self, hooks):
+        solve(inputs={"subject": "x"}, llm_call=create_simple_llm(), save=True, hooks=hooks,
+              **self.task_args(), **self.options)
+
+def _rounds(calls_per_round: list) -> list:
+    return calls_per_round + [[("answer", {"result": "done"})]]
+
+def many_tools(count: int = 500) -> SyntheticWorkload:
+    tools = [make_tool(f"tool_{i}", f"Look up fact number {i} about the subject, useful for category {i % 17}")
+             for i in range(count)]
+    script = _rounds([[(f"tool_{(i * 37) % count}", {"query": f"q{i}"}), (f"tool_{(i * 91) % count}", {"query": f"q{i}"})]
+                      for i in range(5)])
+    return SyntheticWorkload("many_tools", tools, script)
+
+def long_run(rounds: int = 100) -> SyntheticWorkload:
+    script = _rounds([[("step", {"query": f"round {i}"})] for i in range(rounds)])
+    return SyntheticWorkload("long_run", [make_tool("step", "Take one step")], script)
+
+def large_outputs(megabytes: int = 2, rounds: int = 4) -> SyntheticWorkload:
+    output = "x" * (megabytes * 1024 * 1024)
+    script = _rounds([[("dump", {"query": f"part {i}"})] for i in range(rounds)])
+    return SyntheticWorkload("large_outputs", [make_tool("dump", "Dump a large document", output)], script)
+
+def fan_out() -> SyntheticWorkload:
+    """Small three round task used for the concurrent throughput measurement"""
+    tools = [make_tool(f"probe_{i}", f"Probe sensor {i}") for i in range(4)]
+    script = _rounds([[("probe_0", {"query": "a"})], [(f"probe_{i}", {"query": "b"}) for i in range(4)]])
+    return SyntheticWorkload("fan_out", tools, script)
+
+def all_workloads() -> list:
+    return [
+        ExampleWorkload("hungry_box", "hungry_box_example.py", [
+            [("get_boxes", {})],
+            [("check_box", {"box": "box1"}), ("check_box", {"box": "box2"}), ("check_box", {"box": "box3"})],
+            [("answer_box", {"box": "box2", "reason": "it has a sandwich"})]
+        ]),
+        ExampleWorkload("escape_dungeon", "escape_dungeon_example.py", [
+            [("look_ahead", {})], [("move_forward", {})], [("move_forward", {})], [("turn_left", {})],
+            [("look_ahead", {})], [("move_forward", {})],
+            [("final_answer", {"action_sequence": ["move_forward", "move_forward", "turn_left", "move_forward"],
+                               "reason": "escaped"})]
+        ]),
+        ExampleWorkload("sell_motorcycle", "sell_motorcycle_example.py", [
+            [("max_price", {}), ("min_price", {})],
+            [("final_answer", {"amount": 450, "reason": "between the minimum and maximum"})]
+        ]),
+        many_tools(),
+        long_run(),
+        large_outputs(),
+        fan_out()
+    ]
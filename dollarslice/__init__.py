@@ -1,26 +1,115 @@
 """
 DollarSlice - A framework for solving problems with LLMs and function calls
+
+Exports are imported on first access, so importing a submodule (or running the
+dollarslice command) does not load the solver, asyncio and httpx.
 """
 
-from .core import solve, final_answer
-from .llm import create_simple_llm, create_from_ollama, LLMCall
-from .utils import (
-    describe_function,
-    func_to_tool_json,
-    func_to_one_liner,
-    func_map,
-    format_for_openai_tool
-)
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .core import solve, asolve, final_answer, concurrent_safe, pure, cacheable, isolated
+    from .isolation import ToolProcessPool, ToolFailure, configure_tool_pool, close_tool_pool
+    from .memo import ToolMemo, configure_memo, get_memo
+    from .speculation import Speculator, configure_speculator, get_speculator
+    from .loopguard import LoopGuard
+    from .toolselect import ToolSelector
+    from .replay import replay_stats
+    from .hooks import Hooks, use_hooks
+    from .context import ContextBudget, TruncateOutputs, KeepLastK, SummarizeOutputs, estimate_tokens
+    from .batch import solve_many, asolve_many, BatchStats
+    from .ratelimit import configure_rate_limit
+    from .resilience import Resilience, RetryPolicy, configure_resilience, get_resilience
+    from .trajectory import step_messages, step_added_messages
+    from .cache import ResponseCache, configure_cache, get_cache, cache_bypass
+    from .llm import (create_simple_llm, create_from_ollama, acreate_simple_llm, acreate_from_ollama,
+                      create_from_ollama_chat, acreate_from_ollama_chat, create_from_anthropic, acreate_from_anthropic,
+                      LLMCall, AsyncLLMCall)
+    from .transport import Transport, AsyncTransport, configure_transport, close_transport, close_async_transport
+    from .utils import (
+        describe_function,
+        func_to_tool_json,
+        func_to_one_liner,
+        schema_of,
+        func_map,
+        format_for_openai_tool
+    )
+
+_EXPORTS = {
+    'solve': 'core',
+    'asolve': 'core',
+    'final_answer': 'core',
+    'concurrent_safe': 'core',
+    'pure': 'core',
+    'cacheable': 'core',
+    'isolated': 'core',
+    'ToolProcessPool': 'isolation',
+    'ToolFailure': 'isolation',
+    'configure_tool_pool': 'isolation',
+    'close_tool_pool': 'isolation',
+    'ToolMemo': 'memo',
+    'configure_memo': 'memo',
+    'get_memo': 'memo',
+    'Speculator': 'speculation',
+    'configure_speculator': 'speculation',
+    'get_speculator': 'speculation',
+    'LoopGuard': 'loopguard',
+    'ToolSelector': 'toolselect',
+    'replay_stats': 'replay',
+    'Hooks': 'hooks',
+    'use_hooks': 'hooks',
+    'ContextBudget': 'context',
+    'TruncateOutputs': 'context',
+    'KeepLastK': 'context',
+    'SummarizeOutputs': 'context',
+    'estimate_tokens': 'context',
+    'solve_many': 'batch',
+    'asolve_many': 'batch',
+    'BatchStats': 'batch',
+    'configure_rate_limit': 'ratelimit',
+    'Resilience': 'resilience',
+    'RetryPolicy': 'resilience',
+    'configure_resilience': 'resilience',
+    'get_resilience': 'resilience',
+    'step_messages': 'trajectory',
+    'step_added_messages': 'trajectory',
+    'ResponseCache': 'cache',
+    'configure_cache': 'cache',
+    'get_cache': 'cache',
+    'cache_bypass': 'cache',
+    'create_simple_llm': 'llm',
+    'create_from_ollama': 'llm',
+    'acreate_simple_llm': 'llm',
+    'acreate_from_ollama': 'llm',
+    'create_from_ollama_chat': 'llm',
+    'acreate_from_ollama_chat': 'llm',
+    'create_from_anthropic': 'llm',
+    'acreate_from_anthropic': 'llm',
+    'LLMCall': 'llm',
+    'AsyncLLMCall': 'llm',
+    'Transport': 'transport',
+    'AsyncTransport': 'transport',
+    'configure_transport': 'transport',
+    'close_transport': 'transport',
+    'close_async_transport': 'transport',
+    'describe_function': 'utils',
+    'func_to_tool_json': 'utils',
+    'func_to_one_liner': 'utils',
+    'schema_of': 'utils',
+    'func_map': 'utils',
+    'format_for_openai_tool': 'utils'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
 
-__all__ = [
-    'solve',
-    'final_answer',
-    'create_simple_llm',
-    'create_from_ollama',
-    'LLMCall',
-    'describe_function',
-    'func_to_tool_json',
-    'func_to_one_liner',
-    'func_map',
-    'format_for_openai_tool'
-]
\ No newline at end of file
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -1,17 +1,11 @@
 #!/usr/bin/env python3
 """
-CLI entry point for dollarslice command
+CLI entry point for dollarslice command, see dollarslice.cli
 """
 
 import sys
-import os
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-
-def main():
-    """Main entry point - import print_slice directly to avoid heavy dependencies"""
-    from print_slice import main as print_main
-    print_main()
+from .cli import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Batch solving of one task template over many inputs
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import TypedDict, Any, Iterable, Iterator, AsyncIterator, Optional
+
+from .core import run_solve, arun_solve
+from .ratelimit import rate_limits
+from .trajectory import steps_tokens
+
+class BatchResult(TypedDict):
+    index: int
+    inputs: dict
+    result: Any
+    answer_generated: bool
+    error: Optional[BaseException]
+    total_tokens: int
+    duration: float
+
+class BatchStats:
+    """
+    Live counters of a solve_many run, safe to read from another thread. queue_depth
+    is the batch's inputs not submitted yet (None when inputs has no len, e.g. a
+    generator), limiter_waiting the requests of every solve in the process waiting on
+    a provider rate limit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = None
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.total_tokens = 0
+        self.start_time = None
+
+    def _expect(self, inputs):
+        with self._lock:
+            self.total = len(inputs) if hasattr(inputs, '__len__') else None
+
+    def _run_submitted(self):
+        with self._lock:
+            self.submitted += 1
+
+    def _run_started(self):
+        with self._lock:
+            if self.start_time is None:
+                self.start_time = time.perf_counter()
+            self.started += 1
+            self.in_flight += 1
+
+    def _run_finished(self, result: BatchResult):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.failed += result["error"] is not None
+            self.total_tokens += result["total_tokens"]
+
+    def report(self) -> dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self.start_time if self.start_time is not None else 0.0
+            return {
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "queue_depth": self.total - self.submitted if self.total is not None else None,
+                "limiter_waiting": rate_limits.waiting(),
+                "total_tokens": self.total_tokens,
+                "elapsed": elapsed,
+                "runs_per_sec": self.completed / elapsed if elapsed else 0.0,
+                "tokens_per_sec": self.total_tokens / elapsed if elapsed else 0.0
+            }
+
+def _batch_result(index, inputs, outcome, error, start) -> BatchResult:
+    final_result, answer_generated, steps = outcome
+    return {
+        "index": index,
+        "inputs": inputs,
+        "result": final_result,
+        "answer_generated": answer_generated,
+        "error": error,
+        "total_tokens": steps_tokens(steps),
+        "duration": time.perf_counter() - start
+    }
+
+def _solve_one(index, task_id, task, inputs, functions, llm_call, save, stats, kwargs) -> BatchResult:
+    stats._run_started()
+    start = time.perf_counter()
+    try:
+        result = _batch_result(index, inputs, run_solve(task_id, task, inputs, functions, llm_call, save, **kwargs), None, start)
+    except Exception as e:
+        result = _batch_result(index, inputs, (None, False, []), e, start)
+    stats._run_finished(result)
+    return result
+
+def solve_many(task_id: str, task: str, inputs: Iterable[dict], functions: list, llm_call, save=False,
+               concurrency: int = 8, stats: BatchStats = None, **kwargs) -> Iterator[BatchResult]:
+    """
+    Run solve for every inputs dict on a pool of `concurrency` threads, yielding
+    BatchResults in completion order. Inputs are read lazily, a failing run only
+    sets its own result's error. Provider limits come from configure_rate_limit
+    and the providers' rate limit headers. Pass a BatchStats to watch progress.
+    """
+    stats = stats if stats is not None else BatchStats()
+    stats._expect(inputs)
+    pending_inputs = enumerate(inputs)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        in_flight = set()
+
+        def submit_next():
+            for index, run_inputs in pending_inputs:
+                stats._run_submitted()
+                in_flight.add(executor.submit(_solve_one, index, task_id, task, run_inputs,
+                                              functions, llm_call, save, stats, kwargs))
+                return True
+            return False
+
+        for _ in range(concurrency):
+            if not submit_next():
+                break
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.discard(future)
+                submit_next()
+                yield future.result()
+
+async def _asolve_one(index, task_id, task, inputs, functions, llm_call, save, stats, kwargs) -> BatchResult:
+    stats._run_started()
+    start = time.perf_counter()
+    try:
+        outcome = await arun_solve(task_id, task, inputs, functions, llm_call, save, **kwargs)
+        result = _batch_result(index, inputs, outcome, None, start)
+    except Exception as e:
+        result = _batch_result(index, inputs, (None, False, []), e, start)
+    stats._run_finished(result)
+    return result
+
+async def asolve_many(task_id: str, task: str, inputs: Iterable[dict], functions: list, llm_call, save=False,
+                      concurrency: int = 64, stats: BatchStats = None, **kwargs) -> AsyncIterator[BatchResult]:
+    """asyncio version of solve_many, llm_call must be async"""
+    stats = stats if stats is not None else BatchStats()
+    stats._expect(inputs)
+    pending_inputs = enumerate(inputs)
+    in_flight = set()
+
+    def submit_next():
+        for index, run_inputs in pending_inputs:
+            stats._run_submitted()
+            in_flight.add(asyncio.ensure_future(_asolve_one(index, task_id, task, run_inputs,
+                                                            functions, llm_call, save, stats, kwargs)))
+            return True
+        return False
+
+    for _ in range(concurrency):
+        if not submit_next():
+            break
+    try:
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task_future in done:
+                in_flight.discard(task_future)
+                submit_next()
+                yield task_future.result()
+    finally:
+        for task_future in in_flight:
+            task_future.cancel()
@@ -0,0 +1,188 @@
+"""
+Content-addressed blobs shared by the runs of a save location
+
+Runs saved with save_format='blobs' move large strings (prompts, tool outputs) and
+tool schema sets out of their segment file into DOLLAR_SLICE_SAVE_LOC/blobs, named by
+the sha256 of their content, leaving {"$blob": digest} in their place. A blob is
+written once however many runs reference it, compressed with zstd when the
+zstandard package is installed and zlib otherwise. Readers resolve the references
+transparently; `dollarslice gc` removes blobs no run references anymore.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BLOB_DIR = "blobs"
+BLOB_TAG = "$blob"
+# values of shared fields smaller than this stay inline, a reference would not be much smaller
+SHARED_MIN_BYTES = 128
+# blobs looked up more recently than this are assumed to still exist
+_REFRESH_SECONDS = 600
+_MAX_KNOWN = 100000
+# the same prompt or tool output is referenced by several records, remember their digests
+_RECENT_STRINGS = 512
+
+def _compress(data: bytes) -> bytes:
+    """Codec byte followed by the body: Z zstd, D zlib, R stored as is"""
+    if zstandard is not None:
+        body, codec = zstandard.ZstdCompressor(level=3).compress(data), b'Z'
+    else:
+        body, codec = zlib.compress(data, 6), b'D'
+    return codec + body if len(body) < len(data) else b'R' + data
+
+def _decompress(blob: bytes) -> bytes:
+    codec, body = blob[:1], blob[1:]
+    if codec == b'Z':
+        if zstandard is None:
+            raise RuntimeError("blob is zstd compressed, install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if codec == b'D':
+        return zlib.decompress(body)
+    if codec == b'R':
+        return body
+    raise ValueError(f"Unknown blob codec {codec!r}")
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode("utf-8")
+
+class BlobStore:
+    """
+    The blobs of one save location. Values put in are already encoded records
+    (see recorder.encode_value), stored as compact JSON. cache_entries bounds the
+    decoded blobs kept in memory for readers.
+    """
+
+    def __init__(self, base_dir: str, cache_entries: int = 256):
+        self.root = os.path.join(base_dir, BLOB_DIR)
+        self.cache_entries = cache_entries
+        self._known = {}
+        self._cache = OrderedDict()
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"puts": 0, "written": 0, "deduplicated": 0, "bytes_in": 0, "bytes_written": 0}
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, data: bytes) -> str:
+        """Store data unless a blob with the same content exists, returns its digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            self.stats["puts"] += 1
+            self.stats["bytes_in"] += len(data)
+            checked = self._known.get(digest)
+            if checked is not None and now - checked < _REFRESH_SECONDS:
+                self.stats["deduplicated"] += 1
+                return digest
+        path = self.path(digest)
+        try:
+            # a fresh mtime keeps gc's grace period covering runs still being written
+            os.utime(path)
+            written = 0
+        except FileNotFoundError:
+            written = self._write(path, _compress(data))
+        with self._lock:
+            if len(self._known) >= _MAX_KNOWN:
+                self._known.clear()
+            self._known[digest] = now
+            self.stats["written" if written else "deduplicated"] += 1
+            self.stats["bytes_written"] += written
+        return digest
+
+    def _write(self, path: str, blob: bytes) -> int:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(blob)
+        # concurrent writers of the same content race harmlessly, both write the same bytes
+        os.replace(temp_path, path)
+        return len(blob)
+
+    def get(self, digest: str) -> bytes:
+        with self._lock:
+            data = self._cache.get(digest)
+            if data is not None:
+                self._cache.move_to_end(digest)
+                return data
+        with open(self.path(digest), "rb") as f:
+            data = _decompress(f.read())
+        with self._lock:
+            self._cache[digest] = data
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        return data
+
+    def ref(self, value) -> dict:
+        if not isinstance(value, str):
+            return {BLOB_TAG: self.put(_dumps(value))}
+        with self._lock:
+            entry = self._recent.get(value)
+            if entry is not None and time.time() - entry[1] < _REFRESH_SECONDS:
+                self._recent.move_to_end(value)
+                self.stats["puts"] += 1
+                self.stats["deduplicated"] += 1
+                return {BLOB_TAG: entry[0]}
+        digest = self.put(_dumps(value))
+        with self._lock:
+            self._recent[value] = (digest, time.time())
+            while len(self._recent) > _RECENT_STRINGS:
+                self._recent.popitem(last=False)
+        return {BLOB_TAG: digest}
+
+    def load(self, digest: str):
+        return json.loads(self.get(digest))
+
+    def share(self, value):
+        """A whole value as a blob, e.g. a run's tool schemas, unless it is small"""
+        data = _dumps(value)
+        return {BLOB_TAG: self.put(data)} if len(data) >= SHARED_MIN_BYTES else value
+
+    def forget(self):
+        """Drop what this process knows about the store, after blobs were removed"""
+        with self._lock:
+            self._known.clear()
+            self._recent.clear()
+            self._cache.clear()
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["ratio"] = stats["bytes_in"] / stats["bytes_written"] if stats["bytes_written"] else None
+        return stats
+
+def internalize(value, store: BlobStore):
+    """value with its blob references replaced by what they point to"""
+    if isinstance(value, list):
+        return [internalize(v, store) for v in value]
+    if isinstance(value, dict):
+        if len(value) == 1 and BLOB_TAG in value:
+            return store.load(value[BLOB_TAG])
+        return {k: internalize(v, store) for k, v in value.items()}
+    return value
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_blob_store(base_dir: str = None) -> BlobStore:
+    """Process wide store of a save location, DOLLAR_SLICE_SAVE_LOC by default"""
+    base_dir = os.path.abspath(base_dir or os.environ.get("DOLLAR_SLICE_SAVE_LOC", '.dollar_slice'))
+    with _stores_lock:
+        store = _stores.get(base_dir)
+        if store is None:
+            store = _stores[base_dir] = BlobStore(base_dir)
+        return store
+
+def blob_store_of(file_path: str) -> BlobStore:
+    """Store of the save location a run file lives in"""
+    return get_blob_store(os.path.dirname(os.path.dirname(os.path.abspath(file_path))))
@@ -0,0 +1,299 @@
+"""
+Interactive browser of saved runs, `dollarslice browse` (or just `dollarslice`)
+"""
+
+import os
+import pickle
+import json
+import time
+from datetime import datetime
+
+class Colors:
+    RED = '\033[91m'
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    MAGENTA = '\033[95m'
+    CYAN = '\033[96m'
+    WHITE = '\033[97m'
+    BOLD = '\033[1m'
+    DIM = '\033[2m'
+    RESET = '\033[0m'
+    
+    @staticmethod
+    def colored(text, color):
+        return f"{color}{text}{Colors.RESET}"
+
+PAGE_SIZE = 20
+
+def list_tasks():
+    """List all task ids in the run catalog of .dollar_slice"""
+    base_dir = os.environ.get("DOLLAR_SLICE_SAVE_LOC", ".dollar_slice")
+    if not os.path.exists(base_dir):
+        return []
+    
+    from .catalog import task_ids
+    try:
+        return [task_id for task_id, _ in task_ids()]
+    except (OSError, PermissionError):
+        return []
+
+def list_task_files(task_id: str, limit: int = PAGE_SIZE, offset: int = 0, success: bool = None,
+                    since: float = None, order_by: str = 'timestamp', descending: bool = True):
+    """One page of a problem's saved runs with timestamps, newest first by default"""
+    from .catalog import query_runs
+    try:
+        rows = query_runs(task_id=task_id, success=success, since=since, order_by=order_by,
+                          descending=descending, limit=limit, offset=offset)
+    except (OSError, PermissionError):
+        return []
+    return [(row['run_id'], datetime.fromtimestamp(row['timestamp']).strftime('%Y-%m-%d %H:%M:%S')) for row in rows]
+
+def select_task_file(task_id: str):
+    """Page through a problem's runs; returns the chosen run id or None to go back"""
+    offset, failed_only, last_hour = 0, False, False
+    while True:
+        since = time.time() - 3600 if last_hour else None
+        files = list_task_files(task_id, offset=offset, success=False if failed_only else None, since=since)
+        filters = ", ".join(name for name, on in (("failed", failed_only), ("last hour", last_hour)) if on) or "all"
+        print(f"\n{Colors.colored(f'Files for {task_id} ({filters}, from #{offset + 1}):', Colors.GREEN + Colors.BOLD)}")
+        if not files:
+            print(Colors.colored("  (no runs)", Colors.DIM))
+        for i, (file_id, timestamp) in enumerate(files, offset + 1):
+            print(f"{i}. {Colors.colored(file_id, Colors.CYAN)} {Colors.colored(f'({timestamp})', Colors.DIM)}")
+        
+        choice = input("Select file number ([n]ext, [p]rev, [f]ailed only, last [h]our, Enter to go back): ").strip().lower()
+        if not choice:
+            return None
+        if choice == 'n' and len(files) == PAGE_SIZE:
+            offset += PAGE_SIZE
+        elif choice == 'p':
+            offset = max(offset - PAGE_SIZE, 0)
+        elif choice == 'f':
+            failed_only, offset = not failed_only, 0
+        elif choice == 'h':
+            last_hour, offset = not last_hour, 0
+        elif choice.isdigit() and 0 <= int(choice) - 1 - offset < len(files):
+            return files[int(choice) - 1 - offset][0]
+        else:
+            print(Colors.colored("Invalid file selection", Colors.RED))
+
+
+def interactive_mode():
+    """Interactive mode for browsing and viewing problem data"""
+    # Fast check - exit immediately if no problems
+    problems = list_tasks()
+    if not problems:
+        print(Colors.colored("No problems available", Colors.RED))
+        return
+    
+    while True:
+        print(Colors.colored("Saved Solutions:", Colors.GREEN + Colors.BOLD))
+        for i, problem in enumerate(problems, 1):
+            print(f"{i}. {Colors.colored(problem, Colors.CYAN)}")
+        
+        try:
+            choice = int(input("Select problem number: ")) - 1
+            if 0 <= choice < len(problems):
+                selected_problem = problems[choice]
+                file_id = select_task_file(selected_problem)
+                if file_id is not None:
+                    browse_run(selected_problem, file_id)
+            else:
+                print(Colors.colored("Invalid problem selection", Colors.RED))
+        except KeyboardInterrupt:
+            print()  # Print newline before exit
+            break
+        except ValueError:
+            print(Colors.colored("Please enter a valid number", Colors.RED))
+        
+        # Refresh problems list for next iteration
+        problems = list_tasks()
+
+def open_run(task_id: str, id: str):
+    """RunView of a saved run, or None after printing why it cannot be shown"""
+    from .recorder import find_run
+    from .viewer import RunView
+    base_dir = os.environ.get("DOLLAR_SLICE_SAVE_LOC", ".dollar_slice")
+    file_path = find_run(task_id, id)
+    
+    if file_path is None:
+        print(Colors.colored(f"File not found: {os.path.join(base_dir, task_id, id)}", Colors.RED))
+        return None
+
+    try:
+        # a run the user picked, so legacy pickles are loaded too
+        view = RunView(file_path, allow_pickle=True)
+    except (OSError, PermissionError, pickle.PickleError, ValueError) as e:
+        print(Colors.colored(f"Error loading file: {e}", Colors.RED))
+        return None
+    if 'task' not in view.header:
+        print(Colors.colored(f"Run has no header yet: {file_path}", Colors.RED))
+        return None
+    return view
+
+def print_run_header(view):
+    # Get file timestamp
+    mtime = os.path.getmtime(view.path)
+    timestamp = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+    header = view.header
+
+    # Print header info
+    print(f"\n{Colors.colored('=' * 60, Colors.BLUE)}")
+    print(f"{Colors.colored('Task ID:', Colors.GREEN + Colors.BOLD)} {header['task_id']}")
+    print(f"{Colors.colored('ID:', Colors.CYAN + Colors.BOLD)} {header['id']}")
+    print(f"{Colors.colored('Timestamp:', Colors.MAGENTA + Colors.BOLD)} {timestamp}")
+    print(f"{Colors.colored('Task:', Colors.YELLOW + Colors.BOLD)} {header['task']}")
+    print(f"{Colors.colored('Steps:', Colors.BLUE + Colors.BOLD)} {len(view)}")
+    if not view.complete:
+        print(Colors.colored('(incomplete: run in progress or interrupted)', Colors.RED))
+    print(f"{Colors.colored('=' * 60, Colors.BLUE)}")
+    
+    # Print inputs
+    print(f"\n{Colors.colored('INPUTS:', Colors.MAGENTA + Colors.BOLD)}")
+    print(format_data(header['inputs']))
+    
+    # Print functions
+    print(f"\n{Colors.colored('FUNCTIONS:', Colors.BLUE + Colors.BOLD)}")
+    print(format_data(header['functions']))
+
+def load_and_print(task_id: str, id: str, max_chars: int = None):
+    """Print a whole run, decoding one step at a time"""
+    view = open_run(task_id, id)
+    if view is None:
+        return
+    print_run_header(view)
+    for idx in range(len(view)):
+        print_step(idx, view.step(idx), view.schemas, max_chars)
+
+def browse_run(task_id: str, id: str, max_chars: int = 2000):
+    """Page through a run one step at a time, long values clipped to max_chars until expanded"""
+    view = open_run(task_id, id)
+    if view is None:
+        return
+    print_run_header(view)
+    if not len(view):
+        return
+    idx, expanded = 0, False
+    while True:
+        print_step(idx, view.step(idx), view.schemas, None if expanded else max_chars)
+        choice = input(f"Step {idx + 1}/{len(view)} ([n]ext, [p]rev, step number, [e]xpand, [q]uit): ").strip().lower()
+        expanded = False
+        if choice in ('', 'n'):
+            if idx + 1 >= len(view):
+                return
+            idx += 1
+        elif choice == 'p':
+            idx = max(idx - 1, 0)
+        elif choice == 'e':
+            expanded = True
+        elif choice == 'q':
+            return
+        elif choice.isdigit() and 1 <= int(choice) <= len(view):
+            idx = int(choice) - 1
+        else:
+            print(Colors.colored("Invalid choice", Colors.RED))
+
+def clip(value, max_chars: int = None) -> str:
+    text = str(value)
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    return text[:max_chars] + Colors.colored(f" ... [{len(text) - max_chars} more chars, 'e' to expand]", Colors.DIM)
+
+def format_data(data):
+    """Format data structures for readable display"""
+    if isinstance(data, dict):
+        if not data:
+            return Colors.colored("  (empty)", Colors.DIM)
+        result = ""
+        for key, value in data.items():
+            result += f"  {Colors.colored(str(key), Colors.CYAN)}: {str(value)}\n"
+        return result.rstrip()
+    elif isinstance(data, list):
+        if not data:
+            return Colors.colored("  (empty)", Colors.DIM)
+        result = ""
+        for i, item in enumerate(data):
+            if isinstance(item, (tuple, list)) and len(item) >= 4:
+                # Function signature format: name, params, ret_type, desc
+                name, params, ret_type, desc = item[:4]
+                result += f"  {Colors.colored(name, Colors.BOLD)}({params}) -> {ret_type}\n"
+                result += f"    {Colors.colored(desc, Colors.DIM)}\n"
+            else:
+                result += f"  {i+1}. {str(item)}\n"
+        return result.rstrip()
+    else:
+        return f"  {str(data)}"
+
+def print_steps(steps, schemas=None, max_chars=None):
+    """
+    Print every step. LLM steps show only the messages they added; schemas maps
+    the schema ids newer LLM steps store to describe_function tuples.
+    """
+    previous = None
+    for idx, step in enumerate(steps):
+        if step[0] == "llm":
+            messages = step[1]
+            if hasattr(messages, "added"):
+                added = messages.added()
+            else:
+                added = messages[len(previous):] if previous is not None and len(previous) <= len(messages) else messages
+                previous = messages
+            step = ("llm", added) + tuple(step[2:])
+        print_step(idx, step, schemas, max_chars)
+
+def print_step(idx, step, schemas=None, max_chars=None):
+    """Print one step; for LLM steps step[1] holds the messages that step added"""
+    schemas = schemas or {}
+    step_type = step[0]
+    print(f"\n{Colors.colored('─' * 60, Colors.MAGENTA)}")
+    print(f"{Colors.colored(f'Step {idx + 1}: {step_type.upper()}', Colors.MAGENTA + Colors.BOLD)}")
+    print(f"{Colors.colored('─' * 60, Colors.MAGENTA)}")
+
+    if step_type == "llm":
+        messages, functions, trace = step[1:]
+        
+        print(f"\n{Colors.colored('New LLM Messages:', Colors.CYAN + Colors.BOLD)}")
+        for msg in messages:
+            role = msg.get("role", "system")
+            content = msg.get("content", "")
+            tool_calls = msg.get("tool_calls", [])
+            
+            role_color = Colors.GREEN if role == "user" else Colors.BLUE if role == "assistant" else Colors.YELLOW
+            print(f"{Colors.colored(f'({role}):', role_color + Colors.BOLD)} {clip(content, max_chars)}")
+            
+            if tool_calls:
+                for t in tool_calls:
+                    func_name = t['function']['name']
+                    func_args = t['function']['arguments']
+                    print(f"  {Colors.colored('Tool Call:', Colors.DIM)} [{func_name}] {clip(func_args, max_chars)}")
+
+        print(f"\n{Colors.colored('Function Signatures:', Colors.GREEN + Colors.BOLD)}")
+        for func in functions:
+            name, params, ret_type, desc = schemas.get(func, (func, {}, '?', '')) if isinstance(func, str) else func
+            print(f"  {Colors.colored(name, Colors.BOLD)}({params}) -> {ret_type}")
+            print(f"    {Colors.colored(desc, Colors.DIM)}")
+
+        print(f"\n{Colors.colored('Trace Info:', Colors.YELLOW + Colors.BOLD)}")
+        print(format_data(trace))
+
+    elif step_type == "function":
+        _, name, args, result, trace = step
+        
+        print(f"\n{Colors.colored(f'Function Call: {name}', Colors.BLUE + Colors.BOLD)}")
+        
+        if args:
+            print(f"{Colors.colored('Arguments:', Colors.CYAN)}")
+            for k, v in args.items():
+                print(f"  {Colors.colored(k, Colors.CYAN)}: {clip(v, max_chars)}")
+        
+        print(f"\n{Colors.colored('Returned:', Colors.GREEN + Colors.BOLD)} {clip(result, max_chars)}")
+        
+        if trace and 'start_time' in trace and 'end_time' in trace:
+            print(f"{Colors.colored('Timing:', Colors.DIM)} {trace['start_time']} → {trace['end_time']}")
+    else:
+        print(format_data(step))
+
+def main():
+    """Main function - always starts in interactive mode"""
+    interactive_mode()
@@ -0,0 +1,212 @@
+"""
+Content-addressed cache of LLM responses, with an in-process LRU tier and a SQLite disk tier
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_bypass = contextvars.ContextVar('dollarslice_cache_bypass', default=False)
+
+@contextlib.contextmanager
+def cache_bypass():
+    """Skip cache lookups inside the block; fresh responses are still stored"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+def request_key(url: str, data: dict) -> str:
+    """
+    sha256 of the provider endpoint and the request body (model, messages, tools and
+    sampling settings) serialized with sorted keys, so dict ordering does not matter
+    """
+    payload = json.dumps({"url": url, "body": data}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """
+    Memory tier: LRU bounded by max_entries and max_memory_bytes.
+    Disk tier: SQLite file bounded by max_disk_bytes, least recently used rows evicted
+    first; disk_path=None keeps the cache in memory only.
+    Entries older than ttl seconds are ignored and dropped.
+    The disk tier uses one connection, created with its schema on first use and
+    shared by the process's threads under a lock. Its size is kept as a running
+    total, counted again from the table only when it goes over max_disk_bytes
+    (other processes may share the file).
+    """
+
+    def __init__(self, max_entries: int = 1024, max_memory_bytes: int = 64 * 1024 * 1024,
+                 disk_path: str = None, max_disk_bytes: int = 1024 * 1024 * 1024, ttl: float = None):
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_path = disk_path
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self._disk_bytes = None
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        """The disk tier's connection, call with _disk_lock held"""
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+        # a connection inherited through fork is not used, the parent still owns it
+        os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+        connection = sqlite3.connect(self.disk_path, timeout=30, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body TEXT NOT NULL, "
+                           "size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        connection.commit()
+        self._connection, self._connection_pid = connection, os.getpid()
+        self._disk_bytes = self._table_bytes(connection)
+        return connection
+
+    def _table_bytes(self, connection) -> int:
+        return connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._disk_lock:
+            if self._connection is not None and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str):
+        """(response body, tier) or None"""
+        if _bypass.get():
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                body, created, size = entry
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return json.loads(body), 'memory'
+                del self._memory[key]
+                self._memory_bytes -= size
+        if self.disk_path:
+            with self._disk_lock:
+                connection = self._connect()
+                row = connection.execute("SELECT body, created, size FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._disk_bytes -= row[2]
+                    row = None
+                elif row is not None:
+                    connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                connection.commit()
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                return json.loads(row[0]), 'disk'
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _remember(self, key: str, body: str, created: float):
+        size = len(body)
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous[2]
+            self._memory[key] = (body, created, size)
+            self._memory_bytes += size
+            while len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes:
+                _, (_, _, evicted_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                self.stats["evictions"] += 1
+
+    def put(self, key: str, response: dict):
+        body = json.dumps(response, separators=(',', ':'))
+        now = time.time()
+        self._remember(key, body, now)
+        with self._lock:
+            self.stats["stores"] += 1
+        if self.disk_path:
+            with self._disk_lock:
+                connection = self._connect()
+                previous = connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)", (key, body, len(body), now, now))
+                self._disk_bytes += len(body) - (previous[0] if previous else 0)
+                evicted = self._evict_disk(connection) if self._disk_bytes > self.max_disk_bytes else 0
+                connection.commit()
+            if evicted:
+                with self._lock:
+                    self.stats["evictions"] += evicted
+
+    def _evict_disk(self, connection) -> int:
+        """Drop expired rows, then the least recently used ones until under max_disk_bytes; rows evicted"""
+        if self.ttl is not None:
+            connection.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        # other processes may have written or evicted rows since the total was counted
+        total, evicted = self._table_bytes(connection), 0
+        while total > self.max_disk_bytes:
+            rows = connection.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+                if total <= self.max_disk_bytes:
+                    break
+        self._disk_bytes = total
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.disk_path and os.path.exists(self.disk_path):
+            with self._disk_lock:
+                connection = self._connect()
+                connection.execute("DELETE FROM responses")
+                connection.commit()
+                self._disk_bytes = 0
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, memory_entries=len(self._memory), memory_bytes=self._memory_bytes)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+def default_cache_path() -> str:
+    return os.path.join(os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice'), "llm_cache.sqlite3")
+
+_default_cache = None
+
+def get_cache() -> ResponseCache:
+    """Process wide cache with a disk tier under DOLLAR_SLICE_SAVE_LOC, created on first use"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache(disk_path=default_cache_path())
+    return _default_cache
+
+def configure_cache(**kwargs) -> ResponseCache:
+    """Replace the process wide cache, e.g. configure_cache(ttl=3600, disk_path=None)"""
+    global _default_cache
+    kwargs.setdefault('disk_path', default_cache_path())
+    _default_cache = ResponseCache(**kwargs)
+    return _default_cache
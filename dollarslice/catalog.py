@@ -0,0 +1,239 @@
+"""
+SQLite catalog of saved runs, so browsing does not have to open every run file
+
+Lives at DOLLAR_SLICE_SAVE_LOC/catalog.sqlite3. solve updates it as runs are saved;
+`python -m dollarslice.catalog [--full]` indexes runs saved before it existed, which
+browsing also does once for a save directory whose catalog was never fully indexed.
+"""
+
+import contextlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import warnings
+
+from .recorder import is_pickled, read_run, split_run_name
+from .trajectory import steps_duration, steps_start, steps_tokens
+
+CATALOG_NAME = "catalog.sqlite3"
+# bump when the runs table changes, catalogs indexed by an older version are indexed again
+SCHEMA_VERSION = 1
+ORDER_COLUMNS = ('timestamp', 'duration', 'total_tokens', 'step_count', 'run_id')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    task_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    file TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    success INTEGER,
+    complete INTEGER NOT NULL,
+    step_count INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    PRIMARY KEY (task_id, run_id)
+);
+CREATE INDEX IF NOT EXISTS runs_task_time ON runs (task_id, timestamp);
+CREATE INDEX IF NOT EXISTS runs_success_time ON runs (success, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_connections = {}
+_connections_lock = threading.Lock()
+
+def _base_dir():
+    return os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice')
+
+def catalog_path(base_dir: str = None) -> str:
+    return os.path.join(base_dir or _base_dir(), CATALOG_NAME)
+
+def connect(base_dir: str = None) -> sqlite3.Connection:
+    base_dir = base_dir or _base_dir()
+    os.makedirs(base_dir, exist_ok=True)
+    connection = sqlite3.connect(catalog_path(base_dir), timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+def _file_identity(base_dir: str):
+    try:
+        stat = os.stat(catalog_path(base_dir))
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+@contextlib.contextmanager
+def shared_connection(base_dir: str = None):
+    """
+    The process' connection to a save directory's catalog, created with its schema
+    on first use; held under a lock for the block, which commits on success
+    """
+    key = os.path.abspath(base_dir or _base_dir())
+    with _connections_lock:
+        entry = _connections.get(key)
+        # a connection inherited through fork is left to the parent, one to a catalog
+        # file that was removed or replaced is opened again
+        if entry is not None and entry[1] == os.getpid() and entry[3] != _file_identity(key):
+            entry[0].close()
+            entry = None
+        if entry is None or entry[1] != os.getpid():
+            connection = connect(key)
+            entry = _connections[key] = (connection, os.getpid(), threading.Lock(), _file_identity(key))
+    connection, _, lock, _ = entry
+    with lock:
+        with connection:
+            yield connection
+
+def close_connections():
+    """Close the shared connections, e.g. before removing a save directory"""
+    with _connections_lock:
+        entries = list(_connections.values())
+        _connections.clear()
+    for connection, pid, lock, _ in entries:
+        if pid == os.getpid():
+            with lock:
+                connection.close()
+
+def run_summary(task_id: str, run_id: str, file_path: str, data: dict) -> dict:
+    steps = data.get('steps', [])
+    started = data.get('started') or steps_start(steps)
+    try:
+        stat = os.stat(file_path)
+        size, mtime = stat.st_size, stat.st_mtime
+    except OSError:
+        size, mtime = None, time.time()
+    return {
+        "task_id": task_id,
+        "run_id": run_id,
+        "file": os.path.basename(file_path),
+        "timestamp": started.timestamp() if started else mtime,
+        "success": None if data.get('answer_generated') is None else int(bool(data['answer_generated'])),
+        "complete": int(bool(data.get('complete', True))),
+        "step_count": len(steps),
+        "total_tokens": steps_tokens(steps),
+        "duration": steps_duration(steps),
+        "size": size,
+        "mtime": mtime
+    }
+
+def _upsert(connection, summary: dict):
+    columns = ', '.join(summary)
+    connection.execute(f"INSERT OR REPLACE INTO runs ({columns}) VALUES ({', '.join('?' * len(summary))})",
+                       tuple(summary.values()))
+
+def record_run(task_id: str, run_id: str, file_path: str, data: dict):
+    """Add or update one run. Catalog errors only warn, the run file is the source of truth"""
+    try:
+        with shared_connection() as connection:
+            _upsert(connection, run_summary(task_id, run_id, file_path, data))
+    except sqlite3.Error as e:
+        warnings.warn(f"Could not update run catalog: {e}")
+
+def reindex(base_dir: str = None, full: bool = False) -> dict:
+    """
+    Bring the catalog in line with the run files on disk. Files whose size and
+    mtime match their row are skipped unless full=True, rows of deleted files are dropped.
+    Pickled runs are not loaded, they keep the row recorded when they were saved.
+    """
+    base_dir = base_dir or _base_dir()
+    stats = {"indexed": 0, "unchanged": 0, "removed": 0, "unreadable": 0, "pickled": 0}
+    connection = connect(base_dir)
+    try:
+        known = {(row['task_id'], row['file']): (row['size'], row['mtime'])
+                 for row in connection.execute("SELECT task_id, file, size, mtime FROM runs")}
+        present = set()
+        for task_id in sorted(os.listdir(base_dir)):
+            task_dir = os.path.join(base_dir, task_id)
+            if not os.path.isdir(task_dir):
+                continue
+            for name in os.listdir(task_dir):
+                run = split_run_name(name)
+                if not run:
+                    continue
+                file_path = os.path.join(task_dir, name)
+                present.add((task_id, name))
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                if not full and known.get((task_id, name)) == (stat.st_size, stat.st_mtime):
+                    stats["unchanged"] += 1
+                    continue
+                if is_pickled(name):
+                    # not unpickled here, the row recorded when the run was saved is kept
+                    stats["pickled"] += 1
+                    continue
+                try:
+                    data = read_run(file_path)
+                except Exception:
+                    stats["unreadable"] += 1
+                    continue
+                _upsert(connection, run_summary(task_id, run[0], file_path, data))
+                stats["indexed"] += 1
+        for task_id, name in set(known) - present:
+            connection.execute("DELETE FROM runs WHERE task_id = ? AND file = ?", (task_id, name))
+            stats["removed"] += 1
+        connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                               [("indexed_at", str(time.time())), ("schema_version", str(SCHEMA_VERSION))])
+        connection.commit()
+    finally:
+        connection.close()
+    return stats
+
+def indexed_version(base_dir: str = None):
+    """Schema version of the catalog's last full reindex, None if it never had one"""
+    with shared_connection(base_dir) as connection:
+        row = connection.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    return int(row[0]) if row else None
+
+def ensure_catalog(base_dir: str = None):
+    """
+    Index the run files once for a catalog that was never reindexed: save directories
+    that predate it hold runs solve did not record
+    """
+    if os.path.isdir(base_dir or _base_dir()) and indexed_version(base_dir) != SCHEMA_VERSION:
+        reindex(base_dir)
+
+def task_ids(base_dir: str = None) -> list:
+    """(task_id, run count) pairs, alphabetically"""
+    ensure_catalog(base_dir)
+    with shared_connection(base_dir) as connection:
+        return [(row[0], row[1]) for row in
+                connection.execute("SELECT task_id, COUNT(*) FROM runs GROUP BY task_id ORDER BY task_id")]
+
+def query_runs(task_id: str = None, success: bool = None, complete: bool = None, since: float = None,
+               until: float = None, order_by: str = 'timestamp', descending: bool = True,
+               limit: int = 50, offset: int = 0, base_dir: str = None) -> list:
+    """
+    Catalog rows as dicts, filtered, sorted and paged in SQLite.
+    since/until are unix timestamps, e.g. failed runs in the last hour:
+    query_runs(success=False, since=time.time() - 3600)
+    """
+    if order_by not in ORDER_COLUMNS:
+        raise ValueError(f"order_by must be one of {ORDER_COLUMNS}")
+    conditions, params = [], []
+    for column, value in (("task_id = ?", task_id), ("success = ?", success), ("complete = ?", complete),
+                          ("timestamp >= ?", since), ("timestamp < ?", until)):
+        if value is not None:
+            conditions.append(column)
+            params.append(int(value) if isinstance(value, bool) else value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"SELECT * FROM runs {where} ORDER BY {order_by} {'DESC' if descending else 'ASC'} LIMIT ? OFFSET ?"
+    ensure_catalog(base_dir)
+    with shared_connection(base_dir) as connection:
+        return [dict(row) for row in connection.execute(sql, params + [limit, offset])]
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    print(reindex(full='--full' in argv))
+
+if __name__ == "__main__":
+    main()
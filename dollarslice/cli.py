@@ -0,0 +1,270 @@
+"""
+The dollarslice command
+
+    dollarslice                       interactive browser (same as `dollarslice browse`)
+    dollarslice list [--task T]       saved runs from the catalog, newest first
+    dollarslice show TASK_ID RUN_ID   one run, step by step
+    dollarslice stats [--task T]      success rate, latency, tokens and slowest tools per task
+    dollarslice export [--task T]     runs as JSON lines
+    dollarslice migrate [--segments]  rewrite saved runs to use the blob store
+    dollarslice gc [--dry-run]        remove blobs no saved run references
+
+Every subcommand but browse takes --json for machine readable output, export always
+writes JSON. Subcommands import what they need when they run, so the command starts
+without loading the solver or httpx.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+_SINCE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+def parse_since(value: str) -> float:
+    """Unix timestamp from an age like 30m, 2h or 7d, an ISO date(time) or a timestamp"""
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhdw])', value.strip())
+    if match:
+        return time.time() - float(match.group(1)) * _SINCE_UNITS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an age like 30m, 2h, 7d, an ISO date or a timestamp, got {value!r}")
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return repr(value)
+
+def _dump(value, stream=None, indent: int = 2):
+    stream = stream or sys.stdout
+    stream.write(json.dumps(value, default=_json_default, indent=indent) + "\n")
+
+def _base_dir():
+    return os.environ.get("DOLLAR_SLICE_SAVE_LOC", '.dollar_slice')
+
+def _step_json(step) -> dict:
+    if step[0] == 'llm':
+        _, messages, schema_ids, trace = step
+        return {"type": "llm", "messages": messages, "schemas": schema_ids,
+                "tool_results": trace[1], "metrics": trace[2]}
+    if step[0] == 'function':
+        _, name, args, output, trace = step
+        return {"type": "function", "name": name, "args": args, "output": output, "trace": trace}
+    return {"type": "other", "step": step}
+
+def run_json(view) -> dict:
+    """A RunView as one JSON-able dict; LLM steps hold only the messages they added"""
+    run = {k: v for k, v in view.header.items() if k != "type"}
+    run["complete"] = view.complete
+    for key in ("answer_generated", "final_result", "ended"):
+        if view.footer and key in view.footer:
+            run[key] = view.footer[key]
+    run["schemas"] = view.schemas
+    run["steps"] = [_step_json(view.step(index)) for index in range(len(view))]
+    return run
+
+def cmd_list(args) -> int:
+    from .catalog import query_runs, reindex, task_ids
+    if args.reindex:
+        reindex()
+    if args.tasks:
+        tasks = [{"task_id": task_id, "runs": runs} for task_id, runs in task_ids()]
+        if args.json:
+            _dump(tasks)
+        else:
+            for task in tasks:
+                print(f"{task['task_id']}\t{task['runs']}")
+        return 0
+    success = True if args.succeeded else False if args.failed else None
+    rows = query_runs(task_id=args.task, success=success, complete=False if args.incomplete else None,
+                      since=args.since, order_by=args.order_by, descending=not args.ascending,
+                      limit=args.limit, offset=args.offset)
+    if args.json:
+        _dump(rows)
+        return 0
+    for row in rows:
+        when = datetime.fromtimestamp(row['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+        outcome = "incomplete" if not row['complete'] else "ok" if row['success'] else "failed"
+        print(f"{row['task_id']}\t{row['run_id']}\t{when}\t{outcome}\t{row['step_count']} steps\t"
+              f"{row['total_tokens']} tokens\t{row['duration']:.2f}s")
+    return 0
+
+def cmd_show(args) -> int:
+    from .recorder import find_run
+    file_path = find_run(args.task_id, args.run_id)
+    if file_path is None:
+        print(f"No run {args.run_id} for task {args.task_id} in {_base_dir()}", file=sys.stderr)
+        return 1
+    if args.json:
+        from .viewer import RunView
+        _dump(run_json(RunView(file_path, allow_pickle=True)))
+    else:
+        from .browse import load_and_print
+        load_and_print(args.task_id, args.run_id, args.max_chars)
+    return 0
+
+def _print_stats(task_id: str, report: dict):
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f}s"
+    rate = "-" if report["success_rate"] is None else f"{report['success_rate']:.1%}"
+    latency, tokens = report["latency"], report["tokens_per_run"]
+    print(f"{task_id}: {report['runs']} runs, {rate} success "
+          f"({report['succeeded']} ok, {report['failed']} failed, {report['incomplete']} incomplete"
+          + (f", {report['unreadable']} unreadable" if report['unreadable'] else "") + ")")
+    print(f"  latency   p50 {seconds(latency['p50'])}  p95 {seconds(latency['p95'])}  "
+          f"p99 {seconds(latency['p99'])}  max {seconds(latency['max'])}")
+    print(f"  tokens    mean {tokens['mean'] or 0:.0f}  p50 {tokens['p50'] or 0:.0f}  "
+          f"p95 {tokens['p95'] or 0:.0f}  total {report['tokens_total']:.0f}")
+    print("  llm calls " + "  ".join(f"{calls}: {runs}" for calls, runs in report["llm_calls"].items()))
+    for tool in report["slowest_tools"]:
+        print(f"  tool      {tool['name']}: {tool['calls']} calls, mean {seconds(tool['mean'])}, max {seconds(tool['max'])}")
+
+def cmd_stats(args) -> int:
+    from .recorder import run_files
+    from .runstats import aggregate
+    stats = aggregate(run_files(_base_dir(), args.task, args.since), jobs=args.jobs, top_tools=args.top)
+    if args.json:
+        _dump(stats)
+        return 0
+    for task_id, report in stats["tasks"].items():
+        _print_stats(task_id, report)
+    if len(stats["tasks"]) != 1:
+        _print_stats("all tasks", stats["overall"])
+    return 0
+
+def cmd_export(args) -> int:
+    from .recorder import run_files
+    from .viewer import RunView
+    stream = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    exported, failed = 0, 0
+    try:
+        # one run decoded at a time, one line per run
+        for file_path in run_files(_base_dir(), args.task, args.since):
+            try:
+                run = run_json(RunView(file_path))
+            except Exception as e:
+                print(f"Skipping {file_path}: {e!r}", file=sys.stderr)
+                failed += 1
+                continue
+            _dump(run, stream, indent=None)
+            exported += 1
+    finally:
+        if args.output:
+            stream.close()
+    if args.output:
+        print(f"Exported {exported} runs to {args.output}" + (f", {failed} unreadable" if failed else ""), file=sys.stderr)
+    return 0
+
+def _print_counts(stats: dict):
+    for key, value in stats.items():
+        if key == "errors":
+            for error in value:
+                print(f"  {error}", file=sys.stderr)
+        else:
+            print(f"{key.replace('_', ' ')}: {value}")
+
+def cmd_migrate(args) -> int:
+    from .storage import migrate_runs
+    stats = migrate_runs(task_id=args.task, segments=args.segments, keep_source=args.keep,
+                         compress=args.compress, blob_threshold=args.blob_threshold, min_age=args.min_age)
+    if args.json:
+        _dump(stats)
+    else:
+        _print_counts(stats)
+    return 1 if stats["failed"] else 0
+
+def cmd_gc(args) -> int:
+    from .storage import collect_garbage
+    try:
+        stats = collect_garbage(grace=args.grace, dry_run=args.dry_run)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if args.json:
+        _dump(stats)
+    else:
+        _print_counts(stats)
+    return 0
+
+def cmd_browse(args) -> int:
+    from .browse import interactive_mode
+    interactive_mode()
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="dollarslice", description="Browse and analyze saved dollarslice runs")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    listing = commands.add_parser("list", help="saved runs from the catalog, newest first")
+    listing.add_argument("--task", help="only runs of this task_id")
+    outcome = listing.add_mutually_exclusive_group()
+    outcome.add_argument("--failed", action="store_true", help="only runs that ended without an answer")
+    outcome.add_argument("--succeeded", action="store_true", help="only runs that produced an answer")
+    outcome.add_argument("--incomplete", action="store_true", help="only runs in progress or interrupted")
+    listing.add_argument("--since", type=parse_since, help="age like 30m, 2h, 7d, or an ISO date")
+    listing.add_argument("--order-by", default="timestamp", choices=('timestamp', 'duration', 'total_tokens', 'step_count', 'run_id'))
+    listing.add_argument("--ascending", action="store_true")
+    listing.add_argument("--limit", type=int, default=50)
+    listing.add_argument("--offset", type=int, default=0)
+    listing.add_argument("--tasks", action="store_true", help="list task ids with their run counts instead")
+    listing.add_argument("--reindex", action="store_true", help="bring the catalog up to date with the run files first")
+    listing.set_defaults(handler=cmd_list)
+
+    show = commands.add_parser("show", help="print one run")
+    show.add_argument("task_id")
+    show.add_argument("run_id")
+    show.add_argument("--max-chars", type=int, default=None, help="clip long values in text output")
+    show.set_defaults(handler=cmd_show)
+
+    stats = commands.add_parser("stats", help="aggregate statistics per task_id")
+    stats.add_argument("--task", help="only runs of this task_id")
+    stats.add_argument("--since", type=parse_since, help="only runs written after this age or date")
+    stats.add_argument("--jobs", type=int, default=None, help="worker processes, defaults to the CPU count")
+    stats.add_argument("--top", type=int, default=5, help="slowest tools to report per task")
+    stats.set_defaults(handler=cmd_stats)
+
+    export = commands.add_parser("export", help="runs as JSON lines, one run per line")
+    export.add_argument("--task", help="only runs of this task_id")
+    export.add_argument("--since", type=parse_since, help="only runs written after this age or date")
+    export.add_argument("-o", "--output", help="file to write instead of stdout")
+    export.set_defaults(handler=cmd_export)
+
+    migrate = commands.add_parser("migrate", help="rewrite saved runs to use the blob store")
+    migrate.add_argument("--task", help="only runs of this task_id")
+    migrate.add_argument("--segments", action="store_true", help="rewrite .jsonl(.gz) runs too, not only .pkl")
+    migrate.add_argument("--keep", action="store_true", help="keep the original files")
+    migrate.add_argument("--compress", default="best", choices=("best", "zstd", "gzip"))
+    migrate.add_argument("--blob-threshold", type=int, default=1024, help="strings at least this long become blobs")
+    migrate.add_argument("--min-age", type=float, default=600, help="skip segments modified in the last N seconds")
+    migrate.set_defaults(handler=cmd_migrate)
+
+    gc = commands.add_parser("gc", help="remove blobs no saved run references")
+    gc.add_argument("--grace", type=float, default=3600, help="keep blobs used in the last N seconds")
+    gc.add_argument("--dry-run", action="store_true", help="only report what would be removed")
+    gc.set_defaults(handler=cmd_gc)
+
+    browse = commands.add_parser("browse", help="interactive browser (the default)")
+    browse.set_defaults(handler=cmd_browse)
+
+    for command in (listing, show, stats, migrate, gc):
+        command.add_argument("--json", action="store_true", help="machine readable output")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    if args.command is None:
+        return cmd_browse(args)
+    try:
+        return args.handler(args)
+    except BrokenPipeError:
+        # output piped into head and the like
+        sys.stderr.close()
+        return 0
@@ -0,0 +1,303 @@
+"""
+Context budget: keeps the prompt sent each round under a token budget
+
+solve(..., context_budget=ContextBudget(max_tokens=8000)) puts a stage between
+blind_solve and the adapter. The recorded conversation keeps growing as before, but
+the adapter is handed a compacted view of it:
+
+- tool outputs over offload_tokens are moved out of band as soon as they are
+  returned, the model sees a preview and a handle instead (the recorded
+  conversation keeps the whole output)
+- when a round's estimated prompt goes over max_tokens, the policy compacts older
+  tool outputs until it is back under headroom * max_tokens. Compacted messages stay
+  compacted, so the prompt prefix only changes on those rounds.
+
+Out-of-band outputs can be read again through the recall_output tool, which is
+added to the run's functions. Token counts are local estimates (see estimate_tokens).
+"""
+
+import asyncio
+import json
+import threading
+from typing import Callable
+
+from .utils import schema_of
+
+# outputs this small are not worth replacing with a handle
+_MIN_COMPACT_TOKENS = 64
+
+def estimate_tokens(text: str) -> int:
+    """About four characters per token, good enough to budget without a tokenizer"""
+    return (len(text) + 3) // 4
+
+def _content_text(message: dict) -> str:
+    content = message.get('content')
+    if isinstance(content, str):
+        return content
+    return json.dumps(content) if content is not None else ''
+
+class TruncateOutputs:
+    """Replace the oldest tool outputs with their first keep_chars characters and a handle"""
+
+    blocking = False
+
+    def __init__(self, keep_chars: int = 300):
+        self.keep_chars = keep_chars
+
+    def compact(self, window: 'ContextWindow', candidates: list, tokens_to_free: int) -> dict:
+        replacements, freed = {}, 0
+        for index, message, tokens in candidates:
+            if freed >= tokens_to_free:
+                break
+            content = _content_text(message)
+            handle = window.offload(content)
+            replacement = dict(message, content=window.stub(handle, content, content[:self.keep_chars]))
+            replacements[index] = replacement
+            freed += tokens - window.message_tokens(replacement)
+        return replacements
+
+class KeepLastK:
+    """Keep the last k tool outputs in context and move every older one out of band"""
+
+    blocking = False
+
+    def __init__(self, k: int = 4):
+        self.k = k
+
+    def compact(self, window: 'ContextWindow', candidates: list, tokens_to_free: int) -> dict:
+        tool_messages = [c for c in candidates if c[1].get('role') == 'tool']
+        older = tool_messages[:-self.k] if self.k else tool_messages
+        replacements = {}
+        for index, message, _ in older:
+            content = _content_text(message)
+            replacements[index] = dict(message, content=window.stub(window.offload(content), content))
+        return replacements
+
+class SummarizeOutputs:
+    """
+    Replace the oldest tool outputs with a summary written by another, cheaper LLMCall
+    (e.g. create_from_ollama_chat with a small model). Outputs the summarizer fails
+    on are truncated instead.
+    """
+
+    blocking = True
+
+    def __init__(self, llm_call, max_summary_chars: int = 600, fallback=None):
+        self.llm_call = llm_call
+        self.max_summary_chars = max_summary_chars
+        self.fallback = fallback or TruncateOutputs()
+
+    def summarize(self, text: str) -> str:
+        prompt = (f"Summarize this tool output in at most {self.max_summary_chars} characters, "
+                  f"keeping every name, number and identifier an agent may need later:\n\n{text}")
+        messages, _, _ = self.llm_call(messages=[{'role': 'user', 'content': prompt}], functions=[], function_results=[])
+        return _content_text(messages[-1])[:self.max_summary_chars]
+
+    def compact(self, window: 'ContextWindow', candidates: list, tokens_to_free: int) -> dict:
+        replacements, freed = {}, 0
+        for index, message, tokens in candidates:
+            if freed >= tokens_to_free:
+                break
+            content = _content_text(message)
+            try:
+                summary = self.summarize(content)
+            except Exception:
+                replacements.update(self.fallback.compact(window, [(index, message, tokens)], tokens_to_free - freed))
+            else:
+                handle = window.offload(content)
+                replacements[index] = dict(message, content=window.stub(handle, content, summary, "summary"))
+            if index in replacements:
+                freed += tokens - window.message_tokens(replacements[index])
+        return replacements
+
+class ContextBudget:
+    """
+    max_tokens: budget for each call's estimated prompt (messages and tool schemas).
+    policy: TruncateOutputs (default), KeepLastK or SummarizeOutputs, or any object with
+    compact(window, candidates, tokens_to_free) returning {message index: replacement}.
+    offload_tokens: tool outputs larger than this are always moved out of band.
+    keep_recent: the newest messages are never compacted.
+    One ContextBudget can be shared by many solves, each gets its own ContextWindow.
+    """
+
+    def __init__(self, max_tokens: int = 8000, policy=None, offload_tokens: int = 2000,
+                 headroom: float = 0.7, keep_recent: int = 2, estimator: Callable[[str], int] = estimate_tokens):
+        self.max_tokens = max_tokens
+        self.policy = policy or TruncateOutputs()
+        self.offload_tokens = offload_tokens
+        self.headroom = headroom
+        self.keep_recent = keep_recent
+        self.estimator = estimator
+        self._schema_tokens = {}
+        self._lock = threading.Lock()
+        self.stats = {"runs": 0, "calls": 0, "tokens_sent": 0, "tokens_saved": 0, "offloaded": 0,
+                      "compactions": 0, "recalls": 0, "over_budget": 0}
+
+    def schema_tokens(self, function) -> int:
+        """Estimated tokens of a tool's schema, counted once per schema id"""
+        schema = schema_of(function)
+        tokens = self._schema_tokens.get(schema.id)
+        if tokens is None:
+            tokens = self.estimator(json.dumps(schema.tool_json))
+            with self._lock:
+                self._schema_tokens[schema.id] = tokens
+        return tokens
+
+    def open(self) -> 'ContextWindow':
+        with self._lock:
+            self.stats["runs"] += 1
+        return ContextWindow(self)
+
+    def _add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def report(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+class ContextWindow:
+    """The context budget state of one run"""
+
+    def __init__(self, budget: ContextBudget):
+        self.budget = budget
+        self.store = {}
+        self._compacted = {}
+        self._saved = 0
+        self._tokens = {}
+        self._offloaded = {}
+        self.stats = {"calls": 0, "tokens_sent": 0, "tokens_saved": 0, "offloaded": 0,
+                      "compactions": 0, "recalls": 0, "over_budget": 0}
+        self.recall_output = self._make_recall_tool()
+
+    def _count(self, **counts):
+        for key, value in counts.items():
+            self.stats[key] += value
+        self.budget._add(**counts)
+
+    def offload(self, text: str) -> str:
+        handle = f"out{len(self.store) + 1}"
+        self.store[handle] = text
+        self._count(offloaded=1)
+        return handle
+
+    def stub(self, handle: str, text: str, preview: str = '', kind: str = "preview") -> str:
+        tokens = self.budget.estimator(text)
+        note = f"[{len(text)} characters (~{tokens} tokens) moved out of context as {handle}; call recall_output(handle=\"{handle}\") to read it]"
+        return f"{kind}: {preview}\n{note}" if preview else note
+
+    def text_tokens(self, text: str) -> int:
+        # keyed on the text, an estimator may be a real tokenizer
+        tokens = self._tokens.get(text)
+        if tokens is None:
+            tokens = self._tokens[text] = self.budget.estimator(text)
+        return tokens
+
+    def message_tokens(self, message: dict) -> int:
+        tokens = 4 + self.text_tokens(_content_text(message))
+        for tool_call in message.get('tool_calls') or []:
+            tokens += self.text_tokens(json.dumps(tool_call.get('function', tool_call)))
+        return tokens
+
+    def _make_recall_tool(self):
+        window = self
+        def recall_output(handle: str, offset: int = 0) -> str:
+            '''Read a tool output that was moved out of context, by its handle, from a character offset'''
+            text = window.store.get(handle)
+            if text is None:
+                return f"Unknown handle {handle}, known handles: {', '.join(window.store) or 'none'}"
+            window._count(recalls=1)
+            size = window.budget.offload_tokens * 4
+            chunk = text[offset:offset + size]
+            if offset + size < len(text):
+                chunk += f"\n[{len(text) - offset - size} more characters, call recall_output(handle=\"{handle}\", offset={offset + size})]"
+            return chunk
+        return recall_output
+
+    def _offload_results(self, function_results: list) -> list:
+        """The results to send, outputs over offload_tokens replaced by stubs; _merge records the whole outputs"""
+        results, self._offloaded = [], {}
+        for function_result in function_results:
+            output = function_result["output"]
+            text = output if isinstance(output, str) else json.dumps(output) if isinstance(output, (list, dict)) else str(output)
+            tokens = self.budget.estimator(text)
+            if tokens > self.budget.offload_tokens and function_result["name"] != "recall_output":
+                handle = self.offload(text)
+                stub = self.stub(handle, text, text[:self.budget.offload_tokens])
+                self._saved += tokens - self.budget.estimator(stub)
+                self._offloaded[stub] = text
+                function_result = dict(function_result, output=stub)
+            results.append(function_result)
+        return results
+
+    def prepare(self, messages: list, functions: list, function_results: list) -> tuple:
+        """(view of messages to send, function results to send, estimated prompt tokens)"""
+        budget = self.budget
+        function_results = self._offload_results(function_results)
+        view = [self._compacted.get(index, message) for index, message in enumerate(messages)]
+        fixed = sum(budget.schema_tokens(f) for f in functions)
+        fixed += sum(4 + budget.estimator(str(r["output"])) for r in function_results)
+        total = fixed + sum(self.message_tokens(m) for m in view)
+        if total > budget.max_tokens:
+            protected = max(len(view) - budget.keep_recent, 1)
+            candidates = [(index, view[index], self.message_tokens(view[index])) for index in range(1, protected)
+                          if index not in self._compacted and view[index].get('role') == 'tool'
+                          and self.message_tokens(view[index]) > _MIN_COMPACT_TOKENS]
+            target = int(budget.max_tokens * budget.headroom)
+            replacements = budget.policy.compact(self, candidates, total - target) if candidates else {}
+            for index, replacement in replacements.items():
+                saved = self.message_tokens(view[index]) - self.message_tokens(replacement)
+                self._compacted[index] = view[index] = replacement
+                self._saved += saved
+                total -= saved
+            if replacements:
+                self._count(compactions=1)
+            if total > budget.max_tokens:
+                self._count(over_budget=1)
+        self._count(calls=1, tokens_sent=total, tokens_saved=self._saved)
+        return view, function_results, total
+
+    def _merge(self, messages: list, sent: int, view: list) -> list:
+        # the adapter appended this round's tool results and its response to the view;
+        # offloaded outputs are recorded whole and stay stubs in later views
+        for message in view[sent:]:
+            content = message.get('content')
+            text = self._offloaded.get(content) if message.get('role') == 'tool' and isinstance(content, str) else None
+            if text is not None:
+                self._compacted[len(messages)] = message
+                message = dict(message, content=text)
+            messages.append(message)
+        self._offloaded = {}
+        return messages
+
+    def _annotate(self, metrics: dict, total: int):
+        metrics["context_tokens"] = total
+        metrics["context_tokens_saved"] = self._saved
+
+    def wrap(self, llm_call):
+        def call(messages: list, functions: list, function_results: list, **kwargs):
+            view, function_results, total = self.prepare(messages, functions, function_results)
+            sent = len(view)
+            view, tool_results, metrics = llm_call(messages=view, functions=functions, function_results=function_results, **kwargs)
+            self._annotate(metrics, total)
+            return self._merge(messages, sent, view), tool_results, metrics
+        call.streams_tool_calls = getattr(llm_call, 'streams_tool_calls', False)
+        return call
+
+    def wrap_async(self, llm_call):
+        async def call(messages: list, functions: list, function_results: list, **kwargs):
+            if getattr(self.budget.policy, 'blocking', False):
+                view, function_results, total = await asyncio.get_running_loop().run_in_executor(
+                    None, self.prepare, messages, functions, function_results)
+            else:
+                view, function_results, total = self.prepare(messages, functions, function_results)
+            sent = len(view)
+            view, tool_results, metrics = await llm_call(messages=view, functions=functions, function_results=function_results, **kwargs)
+            self._annotate(metrics, total)
+            return self._merge(messages, sent, view), tool_results, metrics
+        call.streams_tool_calls = getattr(llm_call, 'streams_tool_calls', False)
+        return call
+
+    def report(self) -> dict:
+        return dict(self.stats, stored=len(self.store))
@@ -1,22 +1,75 @@
-import copy
+import asyncio
+import functools
+import inspect
 import os
 import pickle
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from .utils import func_map, describe_function
+from .utils import func_map, schema_of, schema_by_id
+from .replay import replay_index
+from .trajectory import Trajectory
+from .recorder import StreamRecorder
+from .blobstore import get_blob_store
+from .catalog import record_run
+from .hooks import resolve_hooks
+from .context import ContextBudget
+from .memo import resolve_memo, MISSING
+from .isolation import ToolFailure, isolate, get_tool_pool
+from .speculation import resolve_speculator
+from .loopguard import LoopGuard, stop_reason
+from .toolselect import ToolSelector
 
 def final_answer(func):
     func._is_final_answer = True
     return func
 
-def solution_already_baked(name) -> bool:
-    return False
+def concurrent_safe(func):
+    """Marks a tool as safe to run at the same time as other concurrent_safe tools"""
+    func._is_concurrent_safe = True
+    return func
+
+def pure(func=None, *, ttl : float = None, max_entries : int = None):
+    """
+    Marks a tool as deterministic, so its results are memoized across calls and solves
+    (see memo.ToolMemo). Use as @pure, or @pure(ttl=60, max_entries=1000) to expire
+    results after ttl seconds and keep at most max_entries of this tool's results.
+    """
+    def mark(func):
+        func._is_pure = True
+        func._memo_ttl = ttl
+        func._memo_max_entries = max_entries
+        return func
+    return mark(func) if func is not None else mark
+
+cacheable = pure
+
+def isolated(func=None, *, timeout : float = None, memory_mb : int = None):
+    """
+    Runs the tool in a worker process of the tool_pool option (see isolation.ToolProcessPool)
+    instead of the solver's thread. Past timeout seconds the worker is killed and the LLM
+    gets a ToolFailure as the output; memory_mb caps the worker's address space while the
+    tool runs. Use as @isolated or @isolated(timeout=30, memory_mb=512).
+    """
+    def mark(func):
+        func._is_isolated = True
+        func._isolation_timeout = timeout
+        func._isolation_memory = memory_mb * 1024 * 1024 if memory_mb else None
+        return func
+    return mark(func) if func is not None else mark
 
-def execute_baked_solution(task : str,inputs : dict, functions : list, llms : list,*args, **kwargs) -> tuple[str,str]:
-    return 'Oh','Pizza'
+def solution_already_baked(task_id : str, task : str, inputs : dict, functions : list):
+    return replay_index.lookup(task_id, task, inputs, functions)
 
-def save_steps(task_id: str, id: str, task: str, inputs: dict, functions: list, steps: list):
+def execute_baked_solution(baked_run : dict, functions : list,*args, **kwargs):
+    return replay_index.replay(baked_run, functions, kwargs.get('replay') == 'unverified')
+
+async def aexecute_baked_solution(baked_run : dict, functions : list,*args, **kwargs):
+    return await replay_index.areplay(baked_run, functions, kwargs.get('replay') == 'unverified')
+
+def save_steps(task_id: str, id: str, task: str, inputs: dict, functions: list, steps: list, answer_generated=None):
     base_dir = os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice')
     os.makedirs(base_dir, exist_ok=True)
     task_dir = os.path.join(base_dir, task_id)
@@ -28,19 +81,112 @@ def save_steps(task_id: str, id: str, task: str, inputs: dict, functions: list,
             "id": id,
             "task": task,
             "inputs": inputs,
-            "functions": [describe_function(f) for f in functions],
-            "steps": steps
+            "functions": [schema_of(f).description for f in functions],
+            "schemas": {schema_id: schema_by_id(schema_id) for step in steps if step[0] == 'llm' for schema_id in step[2]},
+            "steps": steps,
+            "answer_generated": answer_generated
         }, f)
+    record_run(task_id, id, file_path, {"steps": steps, "answer_generated": answer_generated})
 
 def solve(task_id : str, task : str,inputs : dict, functions : list, llm_call, save=False,*args, **kwargs) -> tuple[str,str]:
+    final_result,answer_generated,_ = run_solve(task_id,task,inputs,functions,llm_call,save,**kwargs)
+    return final_result,answer_generated
+
+def run_solve(task_id : str, task : str,inputs : dict, functions : list, llm_call, save=False,*args, **kwargs) -> tuple[str,str,list]:
+    """solve, also returning the recorded steps (empty for replayed runs)"""
+    clock = time.perf_counter()
+    kwargs['hooks'] = resolve_hooks(kwargs.get('hooks'))
     id = uuid.uuid4().hex
-    if solution_already_baked(task):
-        return execute_baked_solution(task,inputs,functions,llm_call,args,kwargs)
-    final_result,answer_generated,steps = blind_solve(task,inputs,functions,llm_call)
-    if save:
-        save_steps(task_id, id,task,inputs,functions,steps)
+    if kwargs.get('replay',False):
+        baked_run = solution_already_baked(task_id,task,inputs,functions)
+        if baked_run:
+            replayed = execute_baked_solution(baked_run,functions,replay=kwargs['replay'])
+            if replayed is not None:
+                solve_ended(kwargs['hooks'],replayed + ([],),clock,0.0,replayed=True)
+                return replayed + ([],)
+    recorder = start_recorder(task_id,id,task,inputs,functions,**kwargs) if save else None
+    steps,answer_generated = [],None
+    try:
+        final_result,answer_generated,steps = blind_solve(task,inputs,functions,llm_call,recorder=recorder,task_id=task_id,**kwargs)
+        if recorder:
+            recorder.footer(answer_generated,final_result,stopped=stop_reason(steps))
+    finally:
+        if recorder:
+            finish_recorder(recorder,steps,answer_generated)
+    save_clock = time.perf_counter()
+    if save and not recorder:
+        save_steps(task_id, id,task,inputs,functions,steps,answer_generated)
+    save_time = time.perf_counter() - save_clock + (recorder.write_time if recorder else 0.0)
+    solve_ended(kwargs['hooks'],(final_result,answer_generated,steps),clock,save_time)
+    return final_result,answer_generated,steps
+
+def solve_ended(hooks, result : tuple, clock : float, save_time : float, replayed : bool = False):
+    if hooks:
+        hooks.emit('on_solve_end',*result,{"duration":time.perf_counter() - clock,"save_time":save_time,"replayed":replayed,
+                                           "stopped":stop_reason(result[2])})
+
+def start_recorder(task_id : str, id : str, task : str, inputs : dict, functions : list,*args, **kwargs):
+    """
+    StreamRecorder for a run, or None when save_format='pickle' asks for the
+    end-of-run pickle from save_steps instead (pickled runs are not replayed, see
+    recorder). save_format='blobs' moves large
+    strings and tool schemas to the save location's blob store and compresses
+    the segment with the best codec available
+    """
+    save_format = kwargs.get('save_format','jsonl')
+    if save_format == 'pickle':
+        return None
+    blobs = get_blob_store() if save_format == 'blobs' else None
+    recorder = StreamRecorder(task_id,id,compress=kwargs.get('compress','best' if blobs else False),
+                              fsync=kwargs.get('fsync','end'),flush_every=kwargs.get('flush_every',1),
+                              blobs=blobs,blob_threshold=kwargs.get('blob_threshold',1024))
+    recorder.header(task,inputs,[schema_of(f).description for f in functions])
+    record_run(task_id,id,recorder.path,{"steps":[],"complete":False,"started":datetime.now()})
+    return recorder
+
+def finish_recorder(recorder : StreamRecorder, steps : list, answer_generated):
+    recorder.close()
+    record_run(recorder.task_id,recorder.id,recorder.path,
+               {"steps":steps,"answer_generated":answer_generated,"complete":recorder.completed})
+
+async def asolve(task_id : str, task : str,inputs : dict, functions : list, llm_call, save=False,*args, **kwargs) -> tuple[str,str]:
+    """
+    asyncio version of solve. llm_call must be async (see acreate_simple_llm),
+    functions may be plain or async def, plain ones run in the default executor.
+    """
+    final_result,answer_generated,_ = await arun_solve(task_id,task,inputs,functions,llm_call,save,**kwargs)
     return final_result,answer_generated
 
+async def arun_solve(task_id : str, task : str,inputs : dict, functions : list, llm_call, save=False,*args, **kwargs) -> tuple[str,str,list]:
+    """asolve, also returning the recorded steps (empty for replayed runs)"""
+    clock = time.perf_counter()
+    kwargs['hooks'] = resolve_hooks(kwargs.get('hooks'))
+    id = uuid.uuid4().hex
+    if kwargs.get('replay',False):
+        baked_run = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(solution_already_baked, task_id, task, inputs, functions))
+        if baked_run:
+            replayed = await aexecute_baked_solution(baked_run,functions,replay=kwargs['replay'])
+            if replayed is not None:
+                solve_ended(kwargs['hooks'],replayed + ([],),clock,0.0,replayed=True)
+                return replayed + ([],)
+    recorder = start_recorder(task_id,id,task,inputs,functions,**kwargs) if save else None
+    steps,answer_generated = [],None
+    try:
+        final_result,answer_generated,steps = await ablind_solve(task,inputs,functions,llm_call,recorder=recorder,task_id=task_id,**kwargs)
+        if recorder:
+            recorder.footer(answer_generated,final_result,stopped=stop_reason(steps))
+    finally:
+        if recorder:
+            finish_recorder(recorder,steps,answer_generated)
+    save_clock = time.perf_counter()
+    if save and not recorder:
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(save_steps, task_id, id, task, inputs, functions, steps, answer_generated))
+    save_time = time.perf_counter() - save_clock + (recorder.write_time if recorder else 0.0)
+    solve_ended(kwargs['hooks'],(final_result,answer_generated,steps),clock,save_time)
+    return final_result,answer_generated,steps
+
 def is_final_answer_function(function):
     return getattr(function, '_is_final_answer', False)
 
@@ -48,35 +194,339 @@ def is_final_answer_function(function):
 def filter_final_functions(functions):
     return [f for f in functions if is_final_answer_function(f)]
 
+def is_pure_function(function):
+    return getattr(function, '_is_pure', False) and not is_final_answer_function(function)
+
+def is_isolated_function(function):
+    return getattr(function, '_is_isolated', False)
+
+def isolate_functions(function_map : dict, pool=None) -> dict:
+    """
+    function_map with @isolated tools running in pool: the tool_pool option, the process
+    wide pool when it is None or True, and inline when it is False
+    """
+    marked = [name for name,function in function_map.items() if is_isolated_function(function)]
+    if not marked or pool is False:
+        return function_map
+    pool = get_tool_pool() if pool is None or pool is True else pool
+    return dict(function_map,**{name:isolate(function_map[name],pool) for name in marked})
+
+def is_concurrent_safe_function(function):
+    return getattr(function, '_is_concurrent_safe', False) and not is_final_answer_function(function)
+
+def plan_tool_batches(tool_results : list, function_map : dict, parallel : bool) -> list:
+    """
+    Split one turn's tool calls into ordered batches. Consecutive concurrent_safe
+    calls share a batch when running in parallel, every other call is a batch of its own.
+    Calls after the first final_answer call are dropped, as they never ran before.
+    """
+    batches = []
+    for call in tool_results:
+        function = function_map[call[0]]
+        if parallel and is_concurrent_safe_function(function) and batches and batches[-1][-1][3]:
+            batches[-1].append(call + (True,))
+        else:
+            batches.append([call + (parallel and is_concurrent_safe_function(function),)])
+        if is_final_answer_function(function):
+            break
+    return [[call[:3] for call in batch] for batch in batches]
+
+def timed_call(function, args : dict, hooks=None, name : str = None, id : str = None, memo=None) -> tuple:
+    """(output, start datetime, end datetime, monotonic duration, whether the memo answered)"""
+    if hooks:
+        hooks.emit('on_tool_start',name,args,id)
+    start,clock = datetime.now(),time.perf_counter()
+    memoized = memo is not None and is_pure_function(function)
+    tool_output = memo.get(function,args) if memoized else MISSING
+    cached = tool_output is not MISSING
+    if not cached:
+        tool_output = function(**args)
+        if memoized and not isinstance(tool_output,ToolFailure):
+            memo.put(function,args,tool_output)
+    result = tool_output,start,datetime.now(),time.perf_counter() - clock,cached
+    if hooks:
+        hooks.emit('on_tool_end',name,args,id,tool_output,tool_trace(result))
+    return result
+
+def tool_trace(result : tuple) -> dict:
+    output,start,end,duration,cached = result
+    trace = {"start_time":start,"end_time":end,"duration":duration,"cached":cached}
+    if isinstance(output,ToolFailure):
+        trace["failure"] = output.kind
+    return trace
+
+def run_tool_batch(batch : list, function_map : dict, executor, started : dict = None, hooks=None, memo=None) -> list:
+    """Outputs of a batch; calls already started by an EarlyDispatcher are waited for"""
+    started = started or {}
+    if len(batch) == 1 or executor is None:
+        return [started[id].result() if id in started else timed_call(function_map[name],args,hooks,name,id,memo) for name,args,id in batch]
+    futures = [started.get(id) or executor.submit(timed_call,function_map[name],args,hooks,name,id,memo) for name,args,id in batch]
+    return [future.result() for future in futures]
+
+class EarlyDispatcher:
+    """
+    on_tool_call hook for streaming adapters (see create_simple_llm(stream=True)): starts
+    each tool call as soon as the model has finished writing it, while the rest of the
+    response is still streaming. Calls run in the order they were made, except that
+    consecutive concurrent_safe calls overlap when tools run in parallel, like
+    plan_tool_batches. Calls after a final_answer call are not started.
+    """
+
+    def __init__(self, function_map : dict, parallel=None, hooks=None, memo=None):
+        self.function_map = function_map
+        self.parallel = parallel
+        self.hooks = hooks
+        self.memo = memo
+        self.started = {}
+        self._exclusive = None
+        self._since_exclusive = []
+        self._stopped = False
+        self._serial = None
+
+    def __call__(self, name : str, args : dict, id : str):
+        function = self.function_map.get(name)
+        if self._stopped or function is None or id in self.started:
+            return
+        self._stopped = is_final_answer_function(function)
+        safe = self.parallel is not None and is_concurrent_safe_function(function)
+        if safe:
+            wait_for = [self._exclusive] if self._exclusive else []
+        else:
+            wait_for = ([self._exclusive] if self._exclusive else []) + self._since_exclusive
+        started = self.started[id] = self._start(wait_for,function,(args,self.hooks,name,id,self.memo),safe)
+        if safe:
+            self._since_exclusive.append(started)
+        else:
+            self._exclusive,self._since_exclusive = started,[]
+
+    def _start(self, wait_for : list, function, call : tuple, safe : bool):
+        if safe:
+            return self.parallel.submit(self._run,wait_for,function,call)
+        if self._serial is None:
+            self._serial = ThreadPoolExecutor(max_workers=1)
+        return self._serial.submit(self._run,wait_for,function,call)
+
+    @staticmethod
+    def _run(wait_for : list, function, call : tuple) -> tuple:
+        # an earlier call failing stops the ones after it, as in sequential execution
+        for future in wait_for:
+            future.result()
+        return timed_call(function,*call)
+
+    def take(self) -> dict:
+        """Calls started during the last LLM call, by call id, and reset for the next one"""
+        started,self.started = self.started,{}
+        self._exclusive,self._since_exclusive,self._stopped = None,[],False
+        return started
+
+    def close(self):
+        if self._serial is not None:
+            self._serial.shutdown(wait=False)
+
+class AsyncEarlyDispatcher(EarlyDispatcher):
+    """EarlyDispatcher for ablind_solve, parallel is its semaphore"""
+
+    def _start(self, wait_for : list, function, call : tuple, safe : bool):
+        return asyncio.ensure_future(self._run_async(wait_for,function,call,self.parallel if safe else None))
+
+    @staticmethod
+    async def _run_async(wait_for : list, function, call : tuple, semaphore) -> tuple:
+        for task in wait_for:
+            await task
+        args,hooks,name,id,memo = call
+        return await timed_call_async(function,args,semaphore,hooks,name,id,memo)
+
+    def close(self):
+        for task in self.started.values():
+            task.cancel()
+
+def early_dispatch_hooks(dispatcher) -> dict:
+    return {'on_tool_call':dispatcher} if dispatcher is not None else {}
+
+def wants_early_dispatch(llm_call, **kwargs) -> bool:
+    """Streaming adapters mark themselves with streams_tool_calls; early_dispatch=False opts out"""
+    return getattr(llm_call,'streams_tool_calls',False) and kwargs.get('early_dispatch',True)
+
+def open_context_window(budget : ContextBudget):
+    """Per-run window of the context_budget option; the run's llm_call is wrapped with it"""
+    return budget.open() if budget is not None else None
+
+def open_speculation(speculate, task_id : str, function_map : dict, memo, blocking : bool = True):
+    """Per-run state of the speculate option; it answers the run's pure calls ahead of the memo"""
+    speculator = resolve_speculator(speculate)
+    return speculator.open(task_id,function_map,memo,blocking) if speculator is not None else None
+
+def open_loop_watch(guard : LoopGuard, functions : list, call_limit : int):
+    """Per-run watch of the loop_guard option, True for a LoopGuard with the default settings"""
+    guard = LoopGuard() if guard is True else guard
+    return guard.open(functions,call_limit) if guard else None
+
+def open_tool_selection(selector : ToolSelector, functions : list, pinned : list = ()):
+    """Per-run selection of the tool_selector option; its find_tools tool joins the run's functions"""
+    return selector.open(functions,pinned) if selector is not None else None
+
+class SolveRun:
+    """
+    The state of one blind_solve or ablind_solve run and the work of each round
+    around the LLM call and the tool calls, which only the two loops wait on
+    """
+
+    def __init__(self, task : str, inputs : dict, functions : list, llm_call, asynchronous : bool = False, **kwargs):
+        for key in inputs:
+            task = task.replace('{'+key+'}', inputs[key])
+        self.window = open_context_window(kwargs.get('context_budget'))
+        if self.window is not None:
+            llm_call = self.window.wrap_async(llm_call) if asynchronous else self.window.wrap(llm_call)
+            functions = functions + [self.window.recall_output]
+        self.selection = open_tool_selection(kwargs.get('tool_selector'),functions,[self.window.recall_output] if self.window is not None else [])
+        if self.selection is not None:
+            functions = functions + self.selection.tools
+        self.llm_call = llm_call
+        self.functions = functions
+        self.function_map = isolate_functions(dict([func_map(f) for f in functions]),kwargs.get('tool_pool'))
+        self.messages = [{'role':'user','content':task}]
+        self.calls_so_far = 1
+        self.call_limit = kwargs.get('call_limit',10)
+        self.answer_generated = False
+        self.final_result = None
+        self.function_results = []
+        self.steps = []
+        self.trajectory = Trajectory()
+        self.recorder = kwargs.get('recorder')
+        self.parallel_tools = kwargs.get('parallel_tools',0)
+        self.hooks = resolve_hooks(kwargs.get('hooks'))
+        memo = resolve_memo(kwargs.get('memo'))
+        self.speculation = open_speculation(kwargs.get('speculate'),kwargs.get('task_id'),self.function_map,memo,blocking=not asynchronous)
+        self.memo = self.speculation or memo
+        self.watch = open_loop_watch(kwargs.get('loop_guard'),functions,self.call_limit)
+        self.early_dispatch = wants_early_dispatch(llm_call,**kwargs)
+
+    def running(self) -> bool:
+        return self.calls_so_far <= self.call_limit and not self.answer_generated
+
+    def start_round(self) -> list:
+        """The functions to offer the LLM this round"""
+        input_functions = self.selection.functions(self.messages,self.function_results) if self.selection is not None else self.functions
+        if self.watch is not None:
+            input_functions = self.watch.functions(input_functions)
+        if self.speculation is not None:
+            self.speculation.launch()
+        if self.hooks:
+            self.hooks.emit('on_llm_start',self.messages,input_functions)
+        return input_functions
+
+    def llm_done(self, input_functions : list, messages : list, tool_results : list, metrics : dict) -> list:
+        """Record the LLM call; the batches of tool calls to run"""
+        self.messages = messages
+        if self.watch is not None:
+            self.watch.annotate(metrics)
+        if self.selection is not None:
+            self.selection.annotate(metrics)
+        if self.hooks:
+            self.hooks.emit('on_llm_end',messages,tool_results,metrics)
+        self.steps += [('llm',self.trajectory.record(messages),[schema_of(f).id for f in input_functions],([],tool_results,metrics))]
+        if self.recorder:
+            self.recorder.record(self.steps[-1])
+        self.function_results = []
+        return plan_tool_batches(tool_results or [],self.function_map,bool(self.parallel_tools))
+
+    def batch_done(self, batch : list, outputs : list, started : dict):
+        for (name,args,id),output in zip(batch,outputs):
+            function,tool_output = self.function_map[name],output[0]
+            self.steps += [('function',name,args,tool_output,dict(tool_trace(output),concurrent=len(batch) > 1,early=id in started))]
+            if self.recorder:
+                self.recorder.record(self.steps[-1])
+            self.function_results += [{"id":id,"name":name,"output":tool_output,"arguments":args}]
+            if self.speculation is not None:
+                self.speculation.observe(name,args)
+            if self.selection is not None:
+                self.selection.observe(name)
+            if is_final_answer_function(function):
+                self.answer_generated = True
+                self.final_result = tool_output
+
+    def end_round(self, metrics : dict) -> bool:
+        """True when the loop guard stops the run"""
+        self.calls_so_far += 1
+        return self.watch is not None and not self.answer_generated and self.watch.check(self.messages,self.function_results,metrics)
+
+    def close(self):
+        if self.watch is not None:
+            self.watch.close(self.answer_generated)
+        if self.speculation is not None:
+            self.speculation.close()
+
+    def result(self) -> tuple:
+        return self.final_result,self.answer_generated,self.steps
+
 def blind_solve(task : str,inputs : dict, functions : list, llm_call,*args, **kwargs) -> tuple[str,str]:
 
-    for key in inputs:
-        task = task.replace('{'+key+'}', inputs[key])
-    function_map = dict([func_map(f) for f in functions])
-    messages = [{'role':'user','content':task}]
-    calls_so_far = 1
-    call_limit = kwargs.get('call_limit',10)
-    answer_generated = False
-    final_result = None
-    function_results = []
-    steps = []
-    while calls_so_far <= call_limit and not answer_generated:
-        input_functions = functions
-        messages,tool_results,metrics = llm_call(messages=messages,functions=input_functions,function_results=function_results)
-        steps += [('llm',copy.deepcopy(messages),[describe_function(f) for f in input_functions],([],tool_results,metrics))]
-        function_results = []
-        if tool_results:
-            for name,args,id in tool_results:
-                start = datetime.now()
-                function = function_map[name]
-                tool_output = function(**args)
-                end = datetime.now()
-                steps += [('function',name,args,tool_output,{"start_time":start,"end_time":end})]
-                function_results += [{"id":id,"name":name,"output":tool_output,"arguments":args}]
-                if is_final_answer_function(function):
-                    answer_generated = True
-                    final_result = tool_output
-                    break
-        calls_so_far += 1
-
-    return final_result,answer_generated,steps
\ No newline at end of file
+    run = SolveRun(task,inputs,functions,llm_call,**kwargs)
+    executor = ThreadPoolExecutor(max_workers=run.parallel_tools) if run.parallel_tools else None
+    dispatcher = EarlyDispatcher(run.function_map,executor,run.hooks,run.memo) if run.early_dispatch else None
+    try:
+        while run.running():
+            input_functions = run.start_round()
+            messages,tool_results,metrics = run.llm_call(messages=run.messages,functions=input_functions,function_results=run.function_results,
+                                                         **early_dispatch_hooks(dispatcher))
+            started = dispatcher.take() if dispatcher else {}
+            for batch in run.llm_done(input_functions,messages,tool_results,metrics):
+                run.batch_done(batch,run_tool_batch(batch,run.function_map,executor,started,run.hooks,run.memo),started)
+            if run.end_round(metrics):
+                break
+    finally:
+        if dispatcher is not None:
+            dispatcher.close()
+        run.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    return run.result()
+
+async def call_tool_async(function, args: dict):
+    if inspect.iscoroutinefunction(function):
+        return await function(**args)
+    return await asyncio.get_running_loop().run_in_executor(None, functools.partial(function, **args))
+
+async def timed_call_async(function, args : dict, semaphore=None, hooks=None, name : str = None, id : str = None, memo=None) -> tuple:
+    if semaphore is not None:
+        async with semaphore:
+            return await timed_call_async(function,args,None,hooks,name,id,memo)
+    if hooks:
+        hooks.emit('on_tool_start',name,args,id)
+    start,clock = datetime.now(),time.perf_counter()
+    memoized = memo is not None and is_pure_function(function)
+    tool_output = memo.get(function,args) if memoized else MISSING
+    cached = tool_output is not MISSING
+    if not cached:
+        tool_output = await call_tool_async(function,args)
+        if memoized and not isinstance(tool_output,ToolFailure):
+            memo.put(function,args,tool_output)
+    result = tool_output,start,datetime.now(),time.perf_counter() - clock,cached
+    if hooks:
+        hooks.emit('on_tool_end',name,args,id,tool_output,tool_trace(result))
+    return result
+
+async def ablind_solve(task : str,inputs : dict, functions : list, llm_call,*args, **kwargs) -> tuple[str,str]:
+
+    run = SolveRun(task,inputs,functions,llm_call,asynchronous=True,**kwargs)
+    semaphore = asyncio.Semaphore(run.parallel_tools) if run.parallel_tools else None
+    dispatcher = AsyncEarlyDispatcher(run.function_map,semaphore,run.hooks,run.memo) if run.early_dispatch else None
+    try:
+        while run.running():
+            input_functions = run.start_round()
+            messages,tool_results,metrics = await run.llm_call(messages=run.messages,functions=input_functions,function_results=run.function_results,
+                                                               **early_dispatch_hooks(dispatcher))
+            started = dispatcher.take() if dispatcher else {}
+            for batch in run.llm_done(input_functions,messages,tool_results,metrics):
+                outputs = await asyncio.gather(*[started[id] if id in started else timed_call_async(run.function_map[name],args,semaphore,run.hooks,name,id,run.memo)
+                                                 for name,args,id in batch])
+                run.batch_done(batch,outputs,started)
+            if run.end_round(metrics):
+                break
+    finally:
+        if dispatcher is not None:
+            dispatcher.close()
+        run.close()
+
+    return run.result()
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Instrumentation hooks for solve runs
+
+Pass hooks=MyHooks() (or a list of hook objects) to solve/asolve, or install them
+for every solve started inside a block with `with use_hooks(MyHooks()):`. A hook object
+defines any of the methods below; missing ones are skipped. Tool hooks are called
+where the tool runs, which is a worker thread when tools run in parallel or are
+started early, so hooks that keep state must be thread safe. Durations are
+perf_counter seconds.
+"""
+
+import contextlib
+import contextvars
+import warnings
+
+class Hooks:
+    """No-op base class to subclass, overriding only the events of interest"""
+
+    def on_llm_start(self, messages: list, functions: list):
+        pass
+
+    def on_llm_end(self, messages: list, tool_results: list, metrics: dict):
+        pass
+
+    def on_tool_start(self, name: str, args: dict, id: str):
+        pass
+
+    def on_tool_end(self, name: str, args: dict, id: str, output, trace: dict):
+        """trace has start_time/end_time datetimes and the monotonic duration"""
+        pass
+
+    def on_solve_end(self, final_result, answer_generated: bool, steps: list, timings: dict):
+        """
+        timings: duration of the whole solve, save_time, whether it was replayed and
+        stopped, why the loop guard ended it early (None otherwise)
+        """
+        pass
+
+HOOK_EVENTS = ('on_llm_start', 'on_llm_end', 'on_tool_start', 'on_tool_end', 'on_solve_end')
+
+class HookSet:
+    """
+    The hook objects of one solve. A hook raising only warns, instrumentation
+    must not be able to fail a run.
+    """
+
+    def __init__(self, hooks):
+        self.handlers = {event: [getattr(hook, event) for hook in hooks if callable(getattr(hook, event, None))]
+                         for event in HOOK_EVENTS}
+
+    def emit(self, event: str, *args):
+        for handler in self.handlers[event]:
+            try:
+                handler(*args)
+            except Exception as e:
+                warnings.warn(f"{event} hook failed: {e!r}")
+
+_active_hooks = contextvars.ContextVar('dollarslice_hooks', default=None)
+
+@contextlib.contextmanager
+def use_hooks(*hooks):
+    """
+    Hooks for solves started in this block (in this thread or asyncio task) that are
+    not given hooks= themselves, e.g. to profile code that calls solve
+    """
+    token = _active_hooks.set(HookSet(hooks))
+    try:
+        yield
+    finally:
+        _active_hooks.reset(token)
+
+def resolve_hooks(hooks):
+    """HookSet for the hooks option of solve, None when there are none"""
+    if hooks is None:
+        return _active_hooks.get()
+    if isinstance(hooks, HookSet):
+        return hooks
+    hooks = list(hooks) if isinstance(hooks, (list, tuple)) else [hooks]
+    return HookSet(hooks) if hooks else None
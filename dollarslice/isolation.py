@@ -0,0 +1,320 @@
+"""
+Process-isolated tool execution
+
+Tools marked with @isolated run in a warm pool of worker processes instead of the
+solver's thread, so a CPU-heavy tool does not hold the GIL and a hung or crashing one
+cannot take the run down with it. A call past its timeout kills the worker, a worker
+that dies is replaced on the next call, and both come back to the LLM as a ToolFailure output
+instead of an exception. Exceptions raised by the tool itself are re-raised, as
+when it runs inline.
+
+Functions and arguments are pickled (with cloudpickle when it is installed, so
+closures work too), payloads over shm_threshold bytes travel through shared memory.
+"""
+
+import asyncio
+import atexit
+import functools
+import inspect
+import multiprocessing
+import os
+import pickle
+import threading
+import traceback
+from collections import deque
+from multiprocessing import shared_memory
+
+try:
+    import cloudpickle
+except ImportError:
+    cloudpickle = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class ToolFailure(str):
+    """Output of an isolated tool that timed out, ran out of memory or crashed its worker"""
+
+    def __new__(cls, kind: str, message: str):
+        failure = super().__new__(cls, f"Tool error ({kind}): {message}")
+        failure.kind = kind
+        return failure
+
+    def __reduce__(self):
+        return ToolFailure._restore, (str(self), self.kind)
+
+    @staticmethod
+    def _restore(text: str, kind: str) -> 'ToolFailure':
+        failure = str.__new__(ToolFailure, text)
+        failure.kind = kind
+        return failure
+
+def _dumps(obj) -> bytes:
+    if cloudpickle is not None:
+        return cloudpickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _send(conn, obj, shm_threshold: int):
+    _send_bytes(conn, _dumps(obj), shm_threshold)
+
+def _send_bytes(conn, data: bytes, shm_threshold: int):
+    """
+    Small payloads go through the pipe, larger ones through a shared memory block the
+    receiver unlinks; returns the block's name, None for the pipe
+    """
+    if len(data) <= shm_threshold:
+        conn.send_bytes(b'i' + data)
+        return None
+    block = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        block.buf[:len(data)] = data
+        conn.send_bytes(b's' + pickle.dumps((block.name, len(data))))
+    except BaseException:
+        block.unlink()
+        raise
+    finally:
+        block.close()
+    return block.name
+
+def _unlink_block(name: str):
+    """Unlink a block sent to a receiver that may not have read it"""
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+def _receive(conn):
+    message = conn.recv_bytes()
+    if message[:1] == b'i':
+        return pickle.loads(memoryview(message)[1:])
+    name, size = pickle.loads(message[1:])
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return pickle.loads(block.buf[:size])
+    finally:
+        block.close()
+        block.unlink()
+
+def _limit_memory(limit_bytes):
+    """Lower this process' address space limit, returns the previous one to restore"""
+    if resource is None or limit_bytes is None:
+        return None
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    hard = previous[1]
+    soft = limit_bytes if hard == resource.RLIM_INFINITY else min(limit_bytes, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+    return previous
+
+def _worker_main(conn, shm_threshold: int):
+    while True:
+        try:
+            function, args, memory_limit = _receive(conn)
+        except (EOFError, OSError):
+            return
+        previous = None
+        try:
+            previous = _limit_memory(memory_limit)
+            output = function(**args)
+            reply = ('ok', asyncio.run(output) if inspect.iscoroutine(output) else output)
+        except MemoryError:
+            reply = ('failure', 'memory', f"exceeded its memory limit of {memory_limit} bytes")
+        except BaseException as e:
+            try:
+                pickle.dumps(e)
+                reply = ('raise', e)
+            except Exception:
+                reply = ('raise', RuntimeError(''.join(traceback.format_exception(e))))
+        finally:
+            if previous is not None:
+                resource.setrlimit(resource.RLIMIT_AS, previous)
+        try:
+            _send(conn, reply, shm_threshold)
+        except Exception as e:
+            _send(conn, ('raise', RuntimeError(f"tool output could not be sent back: {e!r}")), shm_threshold)
+
+class _Worker:
+    def __init__(self, context, shm_threshold: int):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, shm_threshold), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.calls = 0
+
+    def stop(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+
+class ToolProcessPool:
+    """
+    workers: processes kept warm, started on first use or by start(); defaults to the CPU count.
+    timeout: default seconds per call, a tool's own @isolated(timeout=...) wins.
+    start_method: multiprocessing start method, forkserver where available since the
+    solver is multithreaded. max_calls_per_worker recycles workers after that many calls.
+    """
+
+    def __init__(self, workers: int = None, timeout: float = None, shm_threshold: int = 1024 * 1024,
+                 start_method: str = None, max_calls_per_worker: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.shm_threshold = shm_threshold
+        self.max_calls_per_worker = max_calls_per_worker
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = deque()
+        self._started = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"calls": 0, "timeouts": 0, "crashes": 0, "memory_errors": 0, "restarts": 0}
+
+    def start(self) -> 'ToolProcessPool':
+        """Start every worker now instead of on first use"""
+        while True:
+            worker = self._acquire_new()
+            if worker is None:
+                return self
+            self._release(worker, True)
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("ToolProcessPool is closed")
+                if self._idle:
+                    return self._idle.popleft()
+                if self._started < self.workers:
+                    self._started += 1
+                    break
+                self._cond.wait()
+        try:
+            return _Worker(self._context, self.shm_threshold)
+        except BaseException:
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, worker: _Worker, healthy: bool):
+        recycle = self.max_calls_per_worker and worker.calls >= self.max_calls_per_worker
+        if not healthy or recycle:
+            worker.stop()
+            # the replacement is started by the next _acquire that needs it, not by this call
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            self._count(restarts=1)
+            return
+        with self._cond:
+            if self._closed:
+                worker.stop()
+                return
+            self._idle.append(worker)
+            self._cond.notify()
+
+    def _acquire_new(self):
+        with self._cond:
+            if self._closed or self._started >= self.workers:
+                return None
+            self._started += 1
+        try:
+            return _Worker(self._context, self.shm_threshold)
+        except Exception:
+            with self._cond:
+                self._started -= 1
+                self._cond.notify()
+            return None
+
+    def _count(self, **counts):
+        with self._cond:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def call(self, function, args: dict, timeout: float = None, memory_limit: int = None):
+        """Run function(**args) in a worker; its output, or a ToolFailure"""
+        timeout = timeout if timeout is not None else self.timeout
+        # pickling problems surface here, before a worker is involved
+        payload = _dumps((function, args, memory_limit))
+        worker = self._acquire()
+        worker.calls += 1
+        self._count(calls=1)
+        healthy, block = False, None
+        try:
+            block = _send_bytes(worker.conn, payload, self.shm_threshold)
+            if not worker.conn.poll(timeout):
+                self._count(timeouts=1)
+                return ToolFailure("timeout", f"{function.__name__} did not finish within {timeout}s and was stopped")
+            reply = _receive(worker.conn)
+            # a worker that replied has read and unlinked the payload's block
+            block = None
+            # a worker that ran out of memory is replaced rather than reused
+            healthy = reply[0] != 'failure'
+        except (EOFError, OSError) as e:
+            self._count(crashes=1)
+            worker.process.join(timeout=1)
+            return ToolFailure("crash", f"{function.__name__} crashed its worker process (exit code {worker.process.exitcode}): {e!r}")
+        finally:
+            self._release(worker, healthy)
+            if block is not None:
+                _unlink_block(block)
+        if reply[0] == 'ok':
+            return reply[1]
+        if reply[0] == 'failure':
+            self._count(memory_errors=1)
+            return ToolFailure(reply[1], f"{function.__name__} {reply[2]}")
+        raise reply[1]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for worker in idle:
+            worker.stop()
+
+    def report(self) -> dict:
+        with self._cond:
+            return dict(self.stats, workers=self._started, idle=len(self._idle))
+
+def isolate(function, pool: ToolProcessPool):
+    """function as a tool that runs in pool, with the limits given to @isolated"""
+    timeout = getattr(function, '_isolation_timeout', None)
+    memory_limit = getattr(function, '_isolation_memory', None)
+    @functools.wraps(function)
+    def run_isolated(**args):
+        return pool.call(function, args, timeout, memory_limit)
+    return run_isolated
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+def get_tool_pool() -> ToolProcessPool:
+    """Process wide pool, created on first use"""
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = ToolProcessPool()
+        return _default_pool
+
+def configure_tool_pool(**kwargs) -> ToolProcessPool:
+    """Replace the process wide pool, e.g. configure_tool_pool(workers=2, timeout=60)"""
+    global _default_pool
+    with _default_lock:
+        previous, _default_pool = _default_pool, ToolProcessPool(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _default_pool
+
+def close_tool_pool():
+    global _default_pool
+    with _default_lock:
+        previous, _default_pool = _default_pool, None
+    if previous is not None:
+        previous.close()
+
+atexit.register(close_tool_pool)
@@ -1,10 +1,15 @@
 import os
 import json
-import httpx
+import time
 from datetime import datetime
-from typing import TypedDict, List, Callable, Any, Dict
+from typing import TypedDict, List, Callable, Any, Dict, Awaitable
 
 from .utils import func_to_tool_json, func_to_one_liner
+from .transport import Transport, AsyncTransport, get_transport, get_async_transport
+from .ratelimit import rate_limits
+from .cache import ResponseCache, get_cache, request_key
+from .streaming import OpenAIStreamParser, AnthropicStreamParser, OllamaStreamParser, OllamaChatStreamParser, TIMINGS_KEY
+from .resilience import ATTEMPTS_KEY, PartialResponseError, resolve_resilience
 
 try:
     from dotenv import load_dotenv
@@ -20,25 +25,299 @@ class FunctionResult(TypedDict):
     arguments: Dict
 
 class CallMetrics(TypedDict):
+    """
+    Besides these, adapters record prompt_tokens, completion_tokens, cached_tokens and
+    monotonic timings in seconds: schema_time, serialization_time, rate_limit_wait,
+    time_to_first_byte, network_time, parse_time and duration (the whole call).
+    Streamed calls add time_to_first_token and time_to_first_tool_call, Anthropic calls
+    add the prompt cache's cache_creation_tokens and cache_read_tokens. Calls made
+    through a Resilience add provider and attempts (one dict per request sent).
+    """
     total_tokens: int
     start_time: datetime
     end_time: datetime
 
 LLMCall = Callable[[List, List[Callable], List[FunctionResult]], tuple[list, list, CallMetrics]]
+AsyncLLMCall = Callable[[List, List[Callable], List[FunctionResult]], Awaitable[tuple[list, list, CallMetrics]]]
 
-def make_llm_call(messages: List[Dict], functions: List = None) -> Dict:
-    """Auto-detect provider from env vars and make LLM call"""
+def provider_request(messages: List[Dict], functions: List = None) -> tuple[str, Dict, Dict]:
+    """Auto-detect provider from env vars and build its (url, headers, body)"""
     if os.getenv('OPENAI_API_KEY'):
-        return openai_call(messages, functions)
+        return openai_request(messages, functions)
     elif os.getenv('GROQ_API_KEY'):  
-        return groq_call(messages, functions)
+        return groq_request(messages, functions)
     elif os.getenv('ANTHROPIC_API_KEY'):
-        return anthropic_call(messages, functions)
+        return anthropic_request(messages, functions)
     else:
         raise ValueError("No API key found")
 
-def openai_call(messages: List[Dict], functions: List = None) -> Dict:
-    """Direct HTTP call to OpenAI API"""
+def stream_parser(url: str, on_tool_call=None):
+    """Parser for the streamed response of the provider behind url"""
+    if url.endswith('/messages'):
+        return AnthropicStreamParser(on_tool_call)
+    return OpenAIStreamParser(on_tool_call)
+
+def make_llm_call(messages: List[Dict], functions: List = None, transport: Transport = None, cache: ResponseCache = None,
+                  stream: bool = False, on_tool_call=None, resilience=None) -> Dict:
+    """
+    Auto-detect provider from env vars and make LLM call.
+    stream=True reads the response as it is generated, reporting each complete tool call
+    to on_tool_call(name, arguments, id) before the response has finished.
+    resilience: a Resilience (or True for the process wide one) retries, hedges and
+    fails over across its providers instead of making a single attempt.
+    """
+    if resilience is not None:
+        plan = [(name, _sender(request, transport, cache, stream, on_tool_call), not stream)
+                for name, request in _provider_plan(resilience, messages, functions)]
+        body, attempts = resilience.run(plan)
+        return _tag_attempts(body, attempts)
+    request = provider_request(messages, functions)
+    if stream:
+        return _post_stream(request, stream_parser(request[0], on_tool_call), transport, cache)
+    return _post(request, transport, cache)
+
+async def amake_llm_call(messages: List[Dict], functions: List = None, transport: AsyncTransport = None, cache: ResponseCache = None,
+                         stream: bool = False, on_tool_call=None, resilience=None) -> Dict:
+    """Async version of make_llm_call"""
+    if resilience is not None:
+        plan = [(name, _asender(request, transport, cache, stream, on_tool_call), not stream)
+                for name, request in _provider_plan(resilience, messages, functions)]
+        body, attempts = await resilience.arun(plan)
+        return _tag_attempts(body, attempts)
+    request = provider_request(messages, functions)
+    if stream:
+        return await _apost_stream(request, stream_parser(request[0], on_tool_call), transport, cache)
+    return await _apost(request, transport, cache)
+
+def _provider_plan(resilience, messages: List[Dict], functions: List) -> list:
+    """(provider, request) for each provider of the resilience list that has an API key"""
+    return [(name, PROVIDERS[name][1](messages, functions)) for name in resilience.providers
+            if os.getenv(PROVIDERS[name][0])]
+
+def _sender(request: tuple, transport: Transport, cache: ResponseCache, stream: bool, on_tool_call):
+    """One attempt at request; each attempt at a streamed call gets a fresh parser"""
+    def send(timeout: float = None) -> Dict:
+        if not stream:
+            return _post(request, transport, cache, timeout)
+        parser = stream_parser(request[0], on_tool_call)
+        try:
+            return _post_stream(request, parser, transport, cache, timeout)
+        except Exception as e:
+            if parser.first_tool_call is not None:
+                raise PartialResponseError(f"stream failed after its first tool call: {e!r}") from e
+            raise
+    return send
+
+def _asender(request: tuple, transport: AsyncTransport, cache: ResponseCache, stream: bool, on_tool_call):
+    async def send(timeout: float = None) -> Dict:
+        if not stream:
+            return await _apost(request, transport, cache, timeout)
+        parser = stream_parser(request[0], on_tool_call)
+        try:
+            return await _apost_stream(request, parser, transport, cache, timeout)
+        except Exception as e:
+            if parser.first_tool_call is not None:
+                raise PartialResponseError(f"stream failed after its first tool call: {e!r}") from e
+            raise
+    return send
+
+def _tag_attempts(body: Dict, attempts: list) -> Dict:
+    body[ATTEMPTS_KEY] = attempts
+    return body
+
+CACHE_HIT_KEY = '_dollarslice_cache_hit'
+
+def _resolve_cache(cache) -> ResponseCache:
+    """True selects the process wide cache, None/False disables caching"""
+    if cache is True:
+        return get_cache()
+    return cache or None
+
+def _cached(request: tuple, cache: ResponseCache):
+    """(cache key, cached body or None); cached bodies are tagged with the tier they came from"""
+    if cache is None:
+        return None, None
+    key = request_key(request[0], request[2])
+    hit = cache.get(key)
+    if hit is None:
+        return key, None
+    body, tier = hit
+    body[CACHE_HIT_KEY] = tier
+    return key, body
+
+def usage_tokens(body: Dict) -> int:
+    """Total tokens of an OpenAI, Anthropic or Ollama response body"""
+    usage = body.get('usage') or {}
+    if 'total_tokens' in usage:
+        return usage['total_tokens']
+    if usage:
+        return (usage.get('input_tokens', 0) + usage.get('output_tokens', 0)
+                + (usage.get('cache_creation_input_tokens') or 0) + (usage.get('cache_read_input_tokens') or 0))
+    return body.get('prompt_eval_count', 0) + body.get('eval_count', 0)
+
+def usage_breakdown(body: Dict) -> Dict:
+    """
+    prompt_tokens, completion_tokens and cached_tokens (prompt tokens the provider
+    served from its prompt cache) of an OpenAI, Anthropic or Ollama response body
+    """
+    usage = body.get('usage') or {}
+    if 'prompt_tokens' in usage:
+        cached = (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+        return {"prompt_tokens": usage['prompt_tokens'], "completion_tokens": usage.get('completion_tokens', 0), "cached_tokens": cached}
+    if usage:
+        cached = usage.get('cache_read_input_tokens') or 0
+        prompt = usage.get('input_tokens', 0) + cached + (usage.get('cache_creation_input_tokens') or 0)
+        return {"prompt_tokens": prompt, "completion_tokens": usage.get('output_tokens', 0), "cached_tokens": cached}
+    return {"prompt_tokens": body.get('prompt_eval_count', 0), "completion_tokens": body.get('eval_count', 0), "cached_tokens": 0}
+
+def _encode(data: Dict) -> tuple[bytes, float]:
+    """Request body bytes and the time serializing it took"""
+    clock = time.perf_counter()
+    content = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return content, time.perf_counter() - clock
+
+def _json_headers(headers: Dict) -> Dict:
+    return {'Content-Type': 'application/json', **headers}
+
+def _timeout(timeout: float) -> Dict:
+    return {'timeout': timeout} if timeout is not None else {}
+
+def _post(request: tuple, transport: Transport = None, cache: ResponseCache = None, timeout: float = None) -> Dict:
+    """
+    POST a request built by one of the *_request functions. The body is tagged with
+    monotonic timings: serialization_time, rate_limit_wait, time_to_first_byte
+    (response headers received), network_time and parse_time (JSON decoding).
+    timeout overrides the transport's timeout for this request.
+    """
+    key, cached = _cached(request, cache)
+    if cached is not None:
+        return cached
+    url, headers, data = request
+    content, serialization_time = _encode(data)
+    limiter = rate_limits.limiter(url)
+    clock = time.perf_counter()
+    limiter.acquire()
+    sent = time.perf_counter()
+    response, body = None, {}
+    try:
+        with (transport or get_transport()).stream(url, headers=_json_headers(headers), content=content, **_timeout(timeout)) as response:
+            first_byte = time.perf_counter()
+            response.read()
+        received = time.perf_counter()
+        response.raise_for_status()
+        body = response.json()
+        if cache is not None:
+            cache.put(key, body)
+        body[TIMINGS_KEY] = {"serialization_time": serialization_time, "rate_limit_wait": sent - clock,
+                             "time_to_first_byte": first_byte - sent, "network_time": received - sent,
+                             "parse_time": time.perf_counter() - received}
+        return body
+    finally:
+        limiter.release(response.headers if response is not None else None, usage_tokens(body))
+
+async def _apost(request: tuple, transport: AsyncTransport = None, cache: ResponseCache = None, timeout: float = None) -> Dict:
+    key, cached = _cached(request, cache)
+    if cached is not None:
+        return cached
+    url, headers, data = request
+    content, serialization_time = _encode(data)
+    limiter = rate_limits.limiter(url)
+    clock = time.perf_counter()
+    await limiter.aacquire()
+    sent = time.perf_counter()
+    response, body = None, {}
+    try:
+        async with (transport or get_async_transport()).stream(url, headers=_json_headers(headers), content=content, **_timeout(timeout)) as response:
+            first_byte = time.perf_counter()
+            await response.aread()
+        received = time.perf_counter()
+        response.raise_for_status()
+        body = response.json()
+        if cache is not None:
+            cache.put(key, body)
+        body[TIMINGS_KEY] = {"serialization_time": serialization_time, "rate_limit_wait": sent - clock,
+                             "time_to_first_byte": first_byte - sent, "network_time": received - sent,
+                             "parse_time": time.perf_counter() - received}
+        return body
+    finally:
+        limiter.release(response.headers if response is not None else None, usage_tokens(body))
+
+def _store_streamed(key: str, body: Dict, cache: ResponseCache):
+    if cache is not None:
+        cache.put(key, {k: v for k, v in body.items() if k != TIMINGS_KEY})
+
+def _post_stream(request: tuple, parser, transport: Transport = None, cache: ResponseCache = None, timeout: float = None) -> Dict:
+    """
+    _post with the response fed line by line through a streaming parser. The stream flags
+    are added after the cache key is taken, so streamed and plain calls share cache
+    entries; a cache hit reports no tool calls early. parse_time is the time spent in
+    the parser, which overlaps network_time.
+    """
+    key, cached = _cached(request, cache)
+    if cached is not None:
+        return cached
+    url, headers, data = request
+    content, serialization_time = _encode(dict(data, **parser.stream_fields))
+    limiter = rate_limits.limiter(url)
+    clock = time.perf_counter()
+    limiter.acquire()
+    sent = parser.start = time.perf_counter()
+    response_headers, body, parse_time = None, {}, 0.0
+    try:
+        with (transport or get_transport()).stream(url, headers=_json_headers(headers), content=content, **_timeout(timeout)) as response:
+            first_byte = time.perf_counter()
+            response_headers = response.headers
+            if response.is_error:
+                response.read()
+            response.raise_for_status()
+            for line in response.iter_lines():
+                line_clock = time.perf_counter()
+                parser.feed_line(line)
+                parse_time += time.perf_counter() - line_clock
+        received = time.perf_counter()
+        body = parser.finish()
+        _store_streamed(key, body, cache)
+        body[TIMINGS_KEY].update(serialization_time=serialization_time, rate_limit_wait=sent - clock,
+                                 time_to_first_byte=first_byte - sent, network_time=received - sent,
+                                 parse_time=parse_time + time.perf_counter() - received)
+        return body
+    finally:
+        limiter.release(response_headers, usage_tokens(body))
+
+async def _apost_stream(request: tuple, parser, transport: AsyncTransport = None, cache: ResponseCache = None, timeout: float = None) -> Dict:
+    key, cached = _cached(request, cache)
+    if cached is not None:
+        return cached
+    url, headers, data = request
+    content, serialization_time = _encode(dict(data, **parser.stream_fields))
+    limiter = rate_limits.limiter(url)
+    clock = time.perf_counter()
+    await limiter.aacquire()
+    sent = parser.start = time.perf_counter()
+    response_headers, body, parse_time = None, {}, 0.0
+    try:
+        async with (transport or get_async_transport()).stream(url, headers=_json_headers(headers), content=content, **_timeout(timeout)) as response:
+            first_byte = time.perf_counter()
+            response_headers = response.headers
+            if response.is_error:
+                await response.aread()
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                line_clock = time.perf_counter()
+                parser.feed_line(line)
+                parse_time += time.perf_counter() - line_clock
+        received = time.perf_counter()
+        body = parser.finish()
+        _store_streamed(key, body, cache)
+        body[TIMINGS_KEY].update(serialization_time=serialization_time, rate_limit_wait=sent - clock,
+                                 time_to_first_byte=first_byte - sent, network_time=received - sent,
+                                 parse_time=parse_time + time.perf_counter() - received)
+        return body
+    finally:
+        limiter.release(response_headers, usage_tokens(body))
+
+def openai_request(messages: List[Dict], functions: List = None) -> tuple[str, Dict, Dict]:
+    """Request for the OpenAI API"""
     api_key = os.getenv('OPENAI_API_KEY')
     base_url = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
     model = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
@@ -58,18 +337,10 @@ def openai_call(messages: List[Dict], functions: List = None) -> Dict:
         data['tools'] = functions
         data['tool_choice'] = 'auto'
     
-    with httpx.Client() as client:
-        response = client.post(
-            f'{base_url}/chat/completions',
-            headers=headers,
-            json=data,
-            timeout=30.0
-        )
-        response.raise_for_status()
-        return response.json()
+    return f'{base_url}/chat/completions', headers, data
 
-def groq_call(messages: List[Dict], functions: List = None) -> Dict:
-    """Direct HTTP call to Groq API (OpenAI-compatible)"""
+def groq_request(messages: List[Dict], functions: List = None) -> tuple[str, Dict, Dict]:
+    """Request for the Groq API (OpenAI-compatible)"""
     api_key = os.getenv('GROQ_API_KEY')
     base_url = os.getenv('GROQ_BASE_URL', 'https://api.groq.com/openai/v1')
     model = os.getenv('GROQ_MODEL', 'llama3-8b-8192')
@@ -89,21 +360,76 @@ def groq_call(messages: List[Dict], functions: List = None) -> Dict:
         data['tools'] = functions
         data['tool_choice'] = 'auto'
     
-    with httpx.Client() as client:
-        response = client.post(
-            f'{base_url}/chat/completions',
-            headers=headers,
-            json=data,
-            timeout=30.0
-        )
-        response.raise_for_status()
-        return response.json()
+    return f'{base_url}/chat/completions', headers, data
 
-def anthropic_call(messages: List[Dict], functions: List = None) -> Dict:
-    """Direct HTTP call to Anthropic API"""
+CACHE_CONTROL = {"type": "ephemeral"}
+
+def anthropic_tools(tools: List[Dict]) -> List[Dict]:
+    """OpenAI tool schemas as Anthropic tool definitions"""
+    return [{
+        "name": tool['function']['name'],
+        "description": tool['function'].get('description', ''),
+        "input_schema": tool['function'].get('parameters') or {"type": "object", "properties": {}}
+    } for tool in tools]
+
+def _text_blocks(content) -> List[Dict]:
+    if isinstance(content, list):
+        return list(content)
+    return [{"type": "text", "text": content}] if content else []
+
+def anthropic_messages(messages: List[Dict]) -> tuple[list, list]:
+    """
+    (system blocks, messages) of an OpenAI-format conversation in the Messages API
+    format: assistant tool_calls become tool_use blocks and tool messages become
+    tool_result blocks of a user turn, consecutive turns of one role are merged.
+    """
+    system, converted = [], []
+    for message in messages:
+        role = message['role']
+        if role == 'system':
+            system += _text_blocks(message['content'])
+            continue
+        if role == 'tool':
+            role, blocks = 'user', [{"type": "tool_result", "tool_use_id": message['tool_call_id'], "content": message['content']}]
+        elif role == 'assistant':
+            blocks = _text_blocks(message.get('content'))
+            for tool_call in message.get('tool_calls') or []:
+                arguments = tool_call['function']['arguments']
+                blocks.append({"type": "tool_use", "id": tool_call['id'], "name": tool_call['function']['name'],
+                               "input": json.loads(arguments) if isinstance(arguments, str) else arguments})
+            # the API rejects empty assistant turns
+            blocks = blocks or [{"type": "text", "text": "(no output)"}]
+        else:
+            blocks = _text_blocks(message.get('content'))
+        if converted and converted[-1]['role'] == role:
+            converted[-1]['content'] += blocks
+        else:
+            converted.append({"role": role, "content": blocks})
+    return system, converted
+
+def _cache_breakpoint(blocks: List[Dict]):
+    if blocks:
+        blocks[-1] = dict(blocks[-1], cache_control=CACHE_CONTROL)
+
+def add_cache_breakpoints(data: Dict):
+    """
+    Mark the tool list, the system prompt and the end of the conversation as prompt
+    cache breakpoints. The conversation only grows between rounds, so each round reads
+    the prefix the previous one wrote. The end of the previous round is marked as well,
+    the cache is only looked up a limited number of blocks back from a breakpoint.
+    """
+    _cache_breakpoint(data.get('tools'))
+    _cache_breakpoint(data.get('system'))
+    user_turns = [message for message in data['messages'] if message['role'] == 'user']
+    for message in user_turns[-2:]:
+        _cache_breakpoint(message['content'])
+
+def anthropic_request(messages: List[Dict], functions: List = None, model: str = None, max_tokens: int = 1024,
+                      prompt_caching: bool = True) -> tuple[str, Dict, Dict]:
+    """Request for the Anthropic API, from OpenAI-format messages and tools"""
     api_key = os.getenv('ANTHROPIC_API_KEY')
     base_url = os.getenv('ANTHROPIC_BASE_URL', 'https://api.anthropic.com/v1')
-    model = os.getenv('ANTHROPIC_MODEL', 'claude-3-haiku-20240307')
+    model = model or os.getenv('ANTHROPIC_MODEL', 'claude-3-haiku-20240307')
     
     headers = {
         'x-api-key': api_key,
@@ -111,92 +437,216 @@ def anthropic_call(messages: List[Dict], functions: List = None) -> Dict:
         'anthropic-version': '2023-06-01'
     }
     
-    # Convert OpenAI format to Anthropic format
-    system_message = None
-    anthropic_messages = []
-    
-    for msg in messages:
-        if msg['role'] == 'system':
-            system_message = msg['content']
-        else:
-            anthropic_messages.append(msg)
-    
+    system, converted = anthropic_messages(messages)
     data = {
         'model': model,
-        'max_tokens': 1024,
-        'messages': anthropic_messages
+        'max_tokens': max_tokens,
+        'messages': converted
     }
     
-    if system_message:
-        data['system'] = system_message
+    if system:
+        data['system'] = system
     
     if functions:
-        data['tools'] = functions
+        data['tools'] = anthropic_tools(functions)
     
-    with httpx.Client() as client:
-        response = client.post(
-            f'{base_url}/messages',
-            headers=headers,
-            json=data,
-            timeout=30.0
-        )
-        response.raise_for_status()
-        return response.json()
-
-def create_simple_llm() -> LLMCall:
-    def call(messages : List, functions : List[Callable], function_results : List[FunctionResult]) -> tuple[list,list,CallMetrics]:
-        start = datetime.now()
-        for function_result in function_results:
-            function_output = function_result["output"]
-            if type(function_output) not in (list,dict):
-                formatted_output = str(function_output)
-            else:
-                formatted_output = json.dumps(function_output)
-            message = {
-                "tool_call_id": function_result["id"],
-                "role": "tool",
-                "name": function_result["name"],
-                "content": formatted_output
-            }
-            messages += [message]
-        tools = [func_to_tool_json(fn) for fn in functions]
-        response = make_llm_call(messages, tools)
-        response_message = response['choices'][0]['message']
-        tool_calls = response_message.get('tool_calls')
-        updated_messages = messages
-        if response_message:
-            updated_messages += [response_message]
-        tool_results = []
-        if tool_calls:
-            for tool_call in tool_calls:
-                tool_results+=[(tool_call['function']['name'],json.loads(tool_call['function']['arguments']),tool_call['id'])]
-        end = datetime.now()
-        call_metrics: CallMetrics = {
-            "total_tokens": response['usage']['total_tokens'],
-            "start_time": start,
-            "end_time": end
+    if prompt_caching:
+        add_cache_breakpoints(data)
+    
+    return f'{base_url}/messages', headers, data
+
+# provider name: (API key variable, request builder taking OpenAI-format messages and tools)
+PROVIDERS = {
+    'openai': ('OPENAI_API_KEY', openai_request),
+    'groq': ('GROQ_API_KEY', groq_request),
+    'anthropic': ('ANTHROPIC_API_KEY', anthropic_request)
+}
+
+def anthropic_to_chat(body: Dict) -> Dict:
+    """An Anthropic Messages API response as an OpenAI chat completion, tool_use blocks as tool_calls"""
+    content = body.get('content') or []
+    text = ''.join(block.get('text', '') for block in content if block.get('type') == 'text')
+    tool_calls = [{"id": block['id'], "type": "function",
+                   "function": {"name": block['name'], "arguments": json.dumps(block.get('input') or {})}}
+                  for block in content if block.get('type') == 'tool_use']
+    message = {"role": "assistant", "content": text or None}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    usage = body.get('usage') or {}
+    breakdown = usage_breakdown(body)
+    chat = {
+        "choices": [{"index": 0, "message": message, "finish_reason": body.get('stop_reason')}],
+        "usage": {
+            "prompt_tokens": breakdown["prompt_tokens"],
+            "completion_tokens": breakdown["completion_tokens"],
+            "total_tokens": breakdown["prompt_tokens"] + breakdown["completion_tokens"],
+            "prompt_tokens_details": {"cached_tokens": breakdown["cached_tokens"]},
+            "cache_creation_input_tokens": usage.get('cache_creation_input_tokens') or 0,
+            "cache_read_input_tokens": usage.get('cache_read_input_tokens') or 0
         }
-        return updated_messages,tool_results,call_metrics
+    }
+    # request timings and cache tags travel with the body
+    chat.update((key, value) for key, value in body.items() if key.startswith('_dollarslice'))
+    return chat
+
+def openai_call(messages: List[Dict], functions: List = None, transport: Transport = None) -> Dict:
+    """Direct HTTP call to OpenAI API"""
+    return _post(openai_request(messages, functions), transport)
+
+def groq_call(messages: List[Dict], functions: List = None, transport: Transport = None) -> Dict:
+    """Direct HTTP call to Groq API (OpenAI-compatible)"""
+    return _post(groq_request(messages, functions), transport)
+
+def anthropic_call(messages: List[Dict], functions: List = None, transport: Transport = None) -> Dict:
+    """Direct HTTP call to Anthropic API"""
+    return _post(anthropic_request(messages, functions), transport)
+
+def _append_function_results(messages: List, function_results: List[FunctionResult]):
+    for function_result in function_results:
+        function_output = function_result["output"]
+        if type(function_output) not in (list,dict):
+            formatted_output = str(function_output)
+        else:
+            formatted_output = json.dumps(function_output)
+        message = {
+            "tool_call_id": function_result["id"],
+            "role": "tool",
+            "name": function_result["name"],
+            "content": formatted_output
+        }
+        messages += [message]
+
+def _add_timings(call_metrics: CallMetrics, body: Dict, parse_clock: float, clock: float = None, schema_time: float = None):
+    """Move the request timings _post tagged the body with into the metrics, adding the adapter's own"""
+    now = time.perf_counter()
+    timings = body.pop(TIMINGS_KEY, None) or {}
+    call_metrics.update(timings)
+    attempts = body.pop(ATTEMPTS_KEY, None)
+    if attempts is not None:
+        call_metrics["attempts"] = attempts
+        call_metrics["provider"] = attempts[-1]["provider"]
+    call_metrics["parse_time"] = timings.get("parse_time", 0.0) + now - parse_clock
+    if schema_time is not None:
+        call_metrics["schema_time"] = schema_time
+    if clock is not None:
+        call_metrics["duration"] = now - clock
+
+def _parse_chat_response(messages: List, response: Dict, start: datetime, clock: float = None, schema_time: float = None) -> tuple[list,list,CallMetrics]:
+    parse_clock = time.perf_counter()
+    if response.get('type') == 'message':
+        response = anthropic_to_chat(response)
+    response_message = response['choices'][0]['message']
+    tool_calls = response_message.get('tool_calls')
+    updated_messages = messages
+    if response_message:
+        updated_messages += [response_message]
+    tool_results = []
+    if tool_calls:
+        for tool_call in tool_calls:
+            tool_results+=[(tool_call['function']['name'],json.loads(tool_call['function']['arguments']),tool_call['id'])]
+    end = datetime.now()
+    cache_hit = response.pop(CACHE_HIT_KEY, None)
+    call_metrics: CallMetrics = {
+        "total_tokens": 0 if cache_hit else response['usage']['total_tokens'],
+        "start_time": start,
+        "end_time": end
+    }
+    call_metrics.update(usage_breakdown({} if cache_hit else response))
+    if cache_hit:
+        call_metrics["cache_hit"] = cache_hit
+        call_metrics["cached_total_tokens"] = response['usage']['total_tokens']
+    elif 'cache_creation_input_tokens' in response['usage']:
+        call_metrics["cache_creation_tokens"] = response['usage']['cache_creation_input_tokens']
+        call_metrics["cache_read_tokens"] = response['usage']['cache_read_input_tokens']
+    _add_timings(call_metrics, response, parse_clock, clock, schema_time)
+    return updated_messages,tool_results,call_metrics
+
+def create_simple_llm(transport: Transport = None, cache=None, stream: bool = False, resilience=None) -> LLMCall:
+    """
+    Pass a Transport to use dedicated connection pools, otherwise the shared one is used.
+    cache: a ResponseCache, or True for the process wide one (see configure_cache).
+    stream: stream responses, so solve can start each tool call as soon as it is complete.
+    resilience: a Resilience, or True for the process wide one (see configure_resilience),
+    to retry failed calls and fail over to the next provider with an API key.
+    """
+    def call(messages : List, functions : List[Callable], function_results : List[FunctionResult], on_tool_call=None) -> tuple[list,list,CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        _append_function_results(messages, function_results)
+        tools = [func_to_tool_json(fn) for fn in functions]
+        schema_time = time.perf_counter() - clock
+        response = make_llm_call(messages, tools, transport, _resolve_cache(cache), stream, on_tool_call, resolve_resilience(resilience))
+        return _parse_chat_response(messages, response, start, clock, schema_time)
+    call.streams_tool_calls = stream
+    return call
+
+def acreate_simple_llm(transport: AsyncTransport = None, cache=None, stream: bool = False, resilience=None) -> AsyncLLMCall:
+    """Async version of create_simple_llm, for use with asolve"""
+    async def call(messages : List, functions : List[Callable], function_results : List[FunctionResult], on_tool_call=None) -> tuple[list,list,CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        _append_function_results(messages, function_results)
+        tools = [func_to_tool_json(fn) for fn in functions]
+        schema_time = time.perf_counter() - clock
+        response = await amake_llm_call(messages, tools, transport, _resolve_cache(cache), stream, on_tool_call, resolve_resilience(resilience))
+        return _parse_chat_response(messages, response, start, clock, schema_time)
+    call.streams_tool_calls = stream
     return call
 
-def create_from_ollama(model, url="http://localhost:11434/api/generate") -> LLMCall:
-    def call(messages: List, functions: List[Callable], function_results: List[FunctionResult]) -> tuple[list, list, CallMetrics]:
-        start = datetime.now()
-        
-        user_query = None
-        tool_calls = []
-        for message in messages:
-            if message['role'] == 'user':
-                user_query = message['content']
-            if message['role'] == 'tool':
-                tool_calls.append(f"{len(tool_calls)+1} {message['name']}{message.get('arguments', '')} -> {message['content']}")
-        
-        for function_result in function_results:
-            function_output = function_result["output"]
-            formatted_output = str(function_output) if type(function_output) not in (list, dict) else json.dumps(function_output)
-            tool_calls.append(f"{len(tool_calls)+1} {function_result['name']}{function_result.get('arguments', '')} -> {formatted_output}")
-        
-        prompt = f"""### User: {user_query}
+def create_from_anthropic(model: str = None, transport: Transport = None, cache=None, stream: bool = False,
+                          max_tokens: int = 1024, prompt_caching: bool = True) -> LLMCall:
+    """
+    Anthropic Messages API with native tool use, whichever other provider keys are set.
+    The conversation is kept in the OpenAI format and translated on each request.
+    prompt_caching marks the tools and the conversation so far as cache breakpoints,
+    later rounds are then billed and served as cache reads.
+    """
+    def call(messages: List, functions: List[Callable], function_results: List[FunctionResult], on_tool_call=None) -> tuple[list, list, CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        _append_function_results(messages, function_results)
+        tools = [func_to_tool_json(fn) for fn in functions]
+        schema_time = time.perf_counter() - clock
+        request = anthropic_request(messages, tools, model, max_tokens, prompt_caching)
+        if stream:
+            body = _post_stream(request, AnthropicStreamParser(on_tool_call), transport, _resolve_cache(cache))
+        else:
+            body = _post(request, transport, _resolve_cache(cache))
+        return _parse_chat_response(messages, body, start, clock, schema_time)
+
+    call.streams_tool_calls = stream
+    return call
+
+def acreate_from_anthropic(model: str = None, transport: AsyncTransport = None, cache=None, stream: bool = False,
+                           max_tokens: int = 1024, prompt_caching: bool = True) -> AsyncLLMCall:
+    """Async version of create_from_anthropic, for use with asolve"""
+    async def call(messages: List, functions: List[Callable], function_results: List[FunctionResult], on_tool_call=None) -> tuple[list, list, CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        _append_function_results(messages, function_results)
+        tools = [func_to_tool_json(fn) for fn in functions]
+        schema_time = time.perf_counter() - clock
+        request = anthropic_request(messages, tools, model, max_tokens, prompt_caching)
+        if stream:
+            body = await _apost_stream(request, AnthropicStreamParser(on_tool_call), transport, _resolve_cache(cache))
+        else:
+            body = await _apost(request, transport, _resolve_cache(cache))
+        return _parse_chat_response(messages, body, start, clock, schema_time)
+
+    call.streams_tool_calls = stream
+    return call
+
+def _ollama_request(model, messages: List, functions: List[Callable], function_results: List[FunctionResult]) -> Dict:
+    user_query = None
+    tool_calls = []
+    for message in messages:
+        if message['role'] == 'user':
+            user_query = message['content']
+        if message['role'] == 'tool':
+            tool_calls.append(f"{len(tool_calls)+1} {message['name']}{message.get('arguments', '')} -> {message['content']}")
+    
+    for function_result in function_results:
+        function_output = function_result["output"]
+        formatted_output = str(function_output) if type(function_output) not in (list, dict) else json.dumps(function_output)
+        tool_calls.append(f"{len(tool_calls)+1} {function_result['name']}{function_result.get('arguments', '')} -> {formatted_output}")
+    
+    prompt = f"""### User: {user_query}
 
 ### System:
 
@@ -205,36 +655,164 @@ Previous function calls:
 
 Produce JSON OUTPUT ONLY! Adhere to this format {{"name": "function_name", "arguments":{{"argument_name": "argument_value"}}}} The following functions are available to you:
 {chr(10).join([func_to_one_liner(function) for function in functions])}"""
-        
-        data = {
-            "model": model,
-            "raw": True,
-            "prompt": prompt,
-            "options": {'temperature': 0.1},
-            "stream": False,
-            "format": "json"
-        }
-        
-        with httpx.Client() as client:
-            http_response = client.post(url, json=data, timeout=30.0)
-        raw_input = http_response.json()['response']
-        
-        decoder = json.JSONDecoder()
-        try:
-            response, _ = decoder.raw_decode(raw_input, raw_input.find('{'))
-        except (json.JSONDecodeError, ValueError):
-            start_idx = raw_input.find('{')
-            end_idx = raw_input.rfind('}') + 1
-            response = json.loads(raw_input[start_idx:end_idx])
-        tool_results = [(response['name'], response['arguments'], 'ollama_call')]
-        
-        end = datetime.now()
-        call_metrics: CallMetrics = {
-            "total_tokens": 0,
-            "start_time": start,
-            "end_time": end
-        }
-        
-        return messages, tool_results, call_metrics
     
+    return {
+        "model": model,
+        "raw": True,
+        "prompt": prompt,
+        "options": {'temperature': 0.1},
+        "stream": False,
+        "format": "json"
+    }
+
+def _parse_ollama_response(messages: List, body: Dict, start: datetime, clock: float = None, schema_time: float = None) -> tuple[list, list, CallMetrics]:
+    parse_clock = time.perf_counter()
+    raw_input = body['response']
+    decoder = json.JSONDecoder()
+    try:
+        response, _ = decoder.raw_decode(raw_input, raw_input.find('{'))
+    except (json.JSONDecodeError, ValueError):
+        start_idx = raw_input.find('{')
+        end_idx = raw_input.rfind('}') + 1
+        response = json.loads(raw_input[start_idx:end_idx])
+    tool_results = [(response['name'], response['arguments'], 'ollama_call')]
+    
+    end = datetime.now()
+    cache_hit = body.pop(CACHE_HIT_KEY, None)
+    call_metrics: CallMetrics = {
+        "total_tokens": 0 if cache_hit else usage_tokens(body),
+        "start_time": start,
+        "end_time": end
+    }
+    call_metrics.update(usage_breakdown({} if cache_hit else body))
+    if cache_hit:
+        call_metrics["cache_hit"] = cache_hit
+        call_metrics["cached_total_tokens"] = usage_tokens(body)
+    _add_timings(call_metrics, body, parse_clock, clock, schema_time)
+    
+    return messages, tool_results, call_metrics
+
+def create_from_ollama(model, url="http://localhost:11434/api/generate", transport: Transport = None, cache=None, stream: bool = False) -> LLMCall:
+    def call(messages: List, functions: List[Callable], function_results: List[FunctionResult], on_tool_call=None) -> tuple[list, list, CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        data = _ollama_request(model, messages, functions, function_results)
+        schema_time = time.perf_counter() - clock
+        if stream:
+            body = _post_stream((url, {}, data), OllamaStreamParser(on_tool_call), transport, _resolve_cache(cache))
+        else:
+            body = _post((url, {}, data), transport, _resolve_cache(cache))
+        return _parse_ollama_response(messages, body, start, clock, schema_time)
+    
+    call.streams_tool_calls = stream
+    return call
+
+def acreate_from_ollama(model, url="http://localhost:11434/api/generate", transport: AsyncTransport = None, cache=None, stream: bool = False) -> AsyncLLMCall:
+    """Async version of create_from_ollama, for use with asolve"""
+    async def call(messages: List, functions: List[Callable], function_results: List[FunctionResult], on_tool_call=None) -> tuple[list, list, CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        data = _ollama_request(model, messages, functions, function_results)
+        schema_time = time.perf_counter() - clock
+        if stream:
+            body = await _apost_stream((url, {}, data), OllamaStreamParser(on_tool_call), transport, _resolve_cache(cache))
+        else:
+            body = await _apost((url, {}, data), transport, _resolve_cache(cache))
+        return _parse_ollama_response(messages, body, start, clock, schema_time)
+    
+    call.streams_tool_calls = stream
+    return call
+
+def _append_ollama_results(messages: List, function_results: List[FunctionResult]):
+    for function_result in function_results:
+        function_output = function_result["output"]
+        formatted_output = str(function_output) if type(function_output) not in (list, dict) else json.dumps(function_output)
+        messages += [{"role": "tool", "tool_name": function_result["name"], "content": formatted_output}]
+
+def _ollama_chat_request(model, messages: List, tools: List, keep_alive, options: Dict) -> Dict:
+    """
+    Everything before the newest messages stays byte for byte what the server saw on the
+    previous round: the tool list comes first in the rendered prompt and its JSON is
+    precompiled per function, and messages are only ever appended. That lets Ollama
+    reuse its KV cache instead of evaluating the whole prompt again.
+    """
+    data = {
+        "model": model,
+        "messages": messages,
+        "stream": False,
+        "keep_alive": keep_alive,
+        "options": options
+    }
+    if tools:
+        data["tools"] = tools
+    return data
+
+_OLLAMA_DURATIONS = (('load_duration', 'load_time'), ('prompt_eval_duration', 'prompt_eval_time'), ('eval_duration', 'eval_time'))
+
+def _parse_ollama_chat_response(messages: List, body: Dict, start: datetime, clock: float = None, schema_time: float = None) -> tuple[list, list, CallMetrics]:
+    parse_clock = time.perf_counter()
+    message = body['message']
+    messages += [message]
+    tool_results = []
+    for index, tool_call in enumerate(message.get('tool_calls') or []):
+        arguments = tool_call['function'].get('arguments') or {}
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments)
+        tool_results += [(tool_call['function']['name'], arguments, tool_call.get('id') or f"call_{index}")]
+    cache_hit = body.pop(CACHE_HIT_KEY, None)
+    call_metrics: CallMetrics = {
+        "total_tokens": 0 if cache_hit else usage_tokens(body),
+        "start_time": start,
+        "end_time": datetime.now()
+    }
+    call_metrics.update(usage_breakdown({} if cache_hit else body))
+    if cache_hit:
+        call_metrics["cache_hit"] = cache_hit
+        call_metrics["cached_total_tokens"] = usage_tokens(body)
+    else:
+        # prompt_eval_count only counts the tokens the server had to evaluate, a reused prefix is not included
+        for key, metric in _OLLAMA_DURATIONS:
+            if key in body:
+                call_metrics[metric] = body[key] / 1e9
+    _add_timings(call_metrics, body, parse_clock, clock, schema_time)
+    return messages, tool_results, call_metrics
+
+def create_from_ollama_chat(model, url="http://localhost:11434/api/chat", transport: Transport = None, cache=None, stream: bool = False,
+                            keep_alive="30m", options: Dict = None) -> LLMCall:
+    """
+    Ollama /api/chat with native tool calling. keep_alive keeps the model loaded between
+    calls (a duration like "30m", or -1 for as long as the server runs); options are
+    Ollama model options, e.g. {"temperature": 0.1, "num_ctx": 8192}.
+    """
+    options = options if options is not None else {"temperature": 0.1}
+    def call(messages: List, functions: List[Callable], function_results: List[FunctionResult], on_tool_call=None) -> tuple[list, list, CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        _append_ollama_results(messages, function_results)
+        tools = [func_to_tool_json(fn) for fn in functions]
+        schema_time = time.perf_counter() - clock
+        request = (url, {}, _ollama_chat_request(model, messages, tools, keep_alive, options))
+        if stream:
+            body = _post_stream(request, OllamaChatStreamParser(on_tool_call), transport, _resolve_cache(cache))
+        else:
+            body = _post(request, transport, _resolve_cache(cache))
+        return _parse_ollama_chat_response(messages, body, start, clock, schema_time)
+
+    call.streams_tool_calls = stream
+    return call
+
+def acreate_from_ollama_chat(model, url="http://localhost:11434/api/chat", transport: AsyncTransport = None, cache=None, stream: bool = False,
+                             keep_alive="30m", options: Dict = None) -> AsyncLLMCall:
+    """Async version of create_from_ollama_chat, for use with asolve"""
+    options = options if options is not None else {"temperature": 0.1}
+    async def call(messages: List, functions: List[Callable], function_results: List[FunctionResult], on_tool_call=None) -> tuple[list, list, CallMetrics]:
+        start, clock = datetime.now(), time.perf_counter()
+        _append_ollama_results(messages, function_results)
+        tools = [func_to_tool_json(fn) for fn in functions]
+        schema_time = time.perf_counter() - clock
+        request = (url, {}, _ollama_chat_request(model, messages, tools, keep_alive, options))
+        if stream:
+            body = await _apost_stream(request, OllamaChatStreamParser(on_tool_call), transport, _resolve_cache(cache))
+        else:
+            body = await _apost(request, transport, _resolve_cache(cache))
+        return _parse_ollama_chat_response(messages, body, start, clock, schema_time)
+
+    call.streams_tool_calls = stream
     return call
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Loop and stall detection: stops a stuck model from using up call_limit
+
+solve(..., loop_guard=LoopGuard()) looks at the tool calls of every round, with their
+outputs, and steps in when the run is going nowhere:
+
+- repeat: the same call returned the same output `repeats` times in a row
+- cycle: the last calls went around a short cycle (A-B-A-B...) `cycles` times,
+  with the same outputs each time
+- no_progress: `stall_rounds` rounds in a row made no call, or only calls with
+  outputs the run had seen before
+
+Each detection takes the next of `actions`: 'hint' adds a note to what the model
+reads next, 'final_only' leaves it only the final_answer tools, 'abort' ends the run
+without an answer. The round after a detection has it in metrics["loop_guard"], an
+abort is in the metrics of the last round, with the reason; saved runs have the
+reason in their footer as "stopped" and on_solve_end hooks get it in their timings.
+
+Calls are compared by their outputs, so a stateful tool that makes progress while
+returning the same text (walking down a long corridor) can look like a loop; that
+is why the default actions start with a hint.
+"""
+
+import json
+import threading
+
+from .memo import args_key
+
+ACTIONS = ('hint', 'final_only', 'abort')
+KINDS = ('repeat', 'cycle', 'no_progress')
+
+_FINDINGS = {
+    "repeat": "{call} returned the same result {count} times in a row",
+    "cycle": "the last {count} calls went around the same cycle ({call}) with the same results",
+    "no_progress": "the last {count} rounds produced no new results",
+}
+HINT = "Note: {finding}. Doing it again will not change the outcome, try something different or give your final answer."
+FINAL_ONLY_HINT = "You seem to be stuck, only the final answer tools are left: answer with what you know."
+_MAX_CALL_CHARS = 200
+
+def _describe(call: tuple) -> str:
+    name, args, _ = call
+    text = f"{name}({args[1:-1]})" if args.startswith('{') else f"{name}({args})"
+    return text if len(text) <= _MAX_CALL_CHARS else text[:_MAX_CALL_CHARS] + "...)"
+
+def _output_text(output) -> str:
+    # what the adapters send the model for this output
+    return json.dumps(output, default=repr) if isinstance(output, (list, dict)) else str(output)
+
+def _tell(text: str, messages: list, function_results: list):
+    """Add a note to what the model reads next: after the last tool output, or as a user message"""
+    if function_results:
+        last = function_results[-1]
+        function_results[-1] = dict(last, output=f"{_output_text(last['output'])}\n\n[{text}]")
+    else:
+        messages.append({'role': 'user', 'content': text})
+
+class LoopGuard:
+    """
+    repeats: identical calls in a row that count as a repeat.
+    cycles, max_cycle: turns around a cycle of 2 to max_cycle distinct calls that count as one.
+    stall_rounds: rounds in a row without a new result that count as no progress.
+    actions: what the first, second... detection of a run does, the last one repeats.
+    hint: note shown to the model, formatted with {finding}.
+    Rounds (and tokens, at the run's mean per round) are counted as saved when a run
+    that was stepped in on ends before call_limit, which a stuck model would have used up.
+    One LoopGuard can be shared by many solves, each gets its own LoopWatch.
+    """
+
+    def __init__(self, repeats: int = 3, cycles: int = 3, max_cycle: int = 3, stall_rounds: int = 5,
+                 actions: tuple = ACTIONS, hint: str = HINT):
+        unknown = [action for action in actions if action not in ACTIONS]
+        if unknown or not actions:
+            raise ValueError(f"actions must be a non-empty sequence of {ACTIONS}, got {actions!r}")
+        self.repeats = repeats
+        self.cycles = cycles
+        self.max_cycle = max_cycle
+        self.stall_rounds = stall_rounds
+        self.actions = tuple(actions)
+        self.hint = hint
+        self._lock = threading.Lock()
+        self.stats = dict({"runs": 0, "detections": 0, "rounds_saved": 0, "tokens_saved": 0},
+                          **{key: 0 for key in KINDS + ACTIONS})
+
+    def open(self, functions: list, call_limit: int) -> 'LoopWatch':
+        self._add(runs=1)
+        return LoopWatch(self, functions, call_limit)
+
+    def _add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def report(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+class LoopWatch:
+    """The loop guard state of one run"""
+
+    def __init__(self, guard: LoopGuard, functions: list, call_limit: int):
+        from .core import filter_final_functions
+        self.guard = guard
+        self.final_functions = filter_final_functions(functions)
+        self.call_limit = call_limit
+        self.calls = []
+        self.seen = set()
+        self.stalled = 0
+        self.rounds = 0
+        self.tokens = 0
+        self.detections = 0
+        self.final_only = False
+        self.reason = None
+        self._pending = None
+        self.stats = dict({"detections": 0, "rounds_saved": 0, "tokens_saved": 0},
+                          **{key: 0 for key in KINDS + ACTIONS})
+
+    def _count(self, **counts):
+        for key, value in counts.items():
+            self.stats[key] += value
+        self.guard._add(**counts)
+
+    def functions(self, functions: list) -> list:
+        """The tools to offer this round"""
+        return self.final_functions if self.final_only else functions
+
+    def annotate(self, metrics: dict):
+        """Count a finished LLM call, marking it when the model was told it is stuck"""
+        self.rounds += 1
+        if metrics is None:
+            return
+        self.tokens += metrics.get("total_tokens") or 0
+        if self._pending is not None:
+            metrics["loop_guard"], self._pending = self._pending, None
+
+    def _detect(self):
+        guard, calls = self.guard, self.calls
+        if len(calls) >= guard.repeats and len(set(calls[-guard.repeats:])) == 1:
+            return "repeat", guard.repeats, _describe(calls[-1])
+        for period in range(2, guard.max_cycle + 1):
+            span = period * guard.cycles
+            if (len(calls) >= span and len(set(calls[-period:])) == period
+                    and all(calls[-1 - i] == calls[-1 - i - period] for i in range(span - period))):
+                return "cycle", span, " -> ".join(_describe(call) for call in calls[-period:])
+        if self.stalled >= guard.stall_rounds:
+            return "no_progress", self.stalled, None
+        return None
+
+    def check(self, messages: list, function_results: list, metrics: dict = None) -> bool:
+        """
+        After a round's tools ran: steps in when the run is stuck, a hint goes into
+        messages or function_results. True when the run should stop, reason (and the
+        round's metrics) say why.
+        """
+        fresh = False
+        for function_result in function_results:
+            output = _output_text(function_result["output"])
+            call = (function_result["name"], args_key(function_result["arguments"]), hash(output))
+            fresh = fresh or call not in self.seen
+            self.seen.add(call)
+            self.calls.append(call)
+        self.stalled = 0 if fresh else self.stalled + 1
+        found = self._detect()
+        if found is None:
+            return False
+        kind, count, call = found
+        action = self.guard.actions[min(self.detections, len(self.guard.actions) - 1)]
+        if action == 'final_only' and not self.final_functions:
+            action = 'abort'
+        self.detections += 1
+        finding = _FINDINGS[kind].format(call=call, count=count)
+        self._pending = {"kind": kind, "action": action, "finding": finding, "round": self.rounds}
+        self._count(detections=1, **{kind: 1, action: 1})
+        # what led here does not count towards the next detection
+        self.calls, self.stalled = [], 0
+        if action == 'abort':
+            self.reason = f"Stopped after {self.rounds} of {self.call_limit} rounds, the model was stuck: {finding}"
+            if metrics is not None:
+                metrics["loop_guard"], self._pending = dict(self._pending, reason=self.reason), None
+            return True
+        text = self.guard.hint.format(finding=finding)
+        if action == 'final_only':
+            self.final_only = True
+            text = f"{text} {FINAL_ONLY_HINT}"
+        _tell(text, messages, function_results)
+        return False
+
+    def close(self, answer_generated: bool = False):
+        """At the end of the run; rounds count as saved when it answered or was stopped early"""
+        if self.detections and (answer_generated or self.reason) and self.rounds < self.call_limit:
+            saved = self.call_limit - self.rounds
+            self._count(rounds_saved=saved, tokens_saved=saved * self.tokens // max(self.rounds, 1))
+
+    def report(self) -> dict:
+        return dict(self.stats, rounds=self.rounds, reason=self.reason)
+
+def stop_reason(steps: list) -> str:
+    """Why the loop guard stopped a run, from the metrics of its last LLM step; None if it did not"""
+    for step in reversed(steps):
+        if step[0] == 'llm':
+            found = (step[3][2] or {}).get("loop_guard") if step[3] else None
+            return found.get("reason") if found and found.get("action") == 'abort' else None
+    return None
@@ -0,0 +1,153 @@
+"""
+Memoized results of pure tools, shared by every solve in the process
+
+Tools marked with @pure (or @cacheable) are assumed to return the same output for
+the same arguments. Their results are kept in a ToolMemo keyed on the tool and its
+canonicalized arguments, so repeated calls within a run and identical lookups across
+runs are answered without running the tool again.
+"""
+
+import copy
+import inspect
+import itertools
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from .utils import schema_of
+
+MISSING = object()
+
+_tool_numbers = weakref.WeakKeyDictionary()
+# callables that cannot be weakly referenced are kept alive, so their id is not reused
+_pinned_numbers = {}
+_tool_numbers_lock = threading.Lock()
+_next_tool_number = itertools.count(1)
+
+def _tool_number(function) -> int:
+    """A number per function object, never reused while the process runs"""
+    with _tool_numbers_lock:
+        try:
+            number = _tool_numbers.get(function)
+            if number is None:
+                number = _tool_numbers[function] = next(_next_tool_number)
+        except TypeError:
+            pinned = _pinned_numbers.get(id(function))
+            if pinned is None:
+                pinned = _pinned_numbers[id(function)] = (function, next(_next_tool_number))
+            number = pinned[1]
+        return number
+
+def tool_key(function) -> str:
+    """
+    Identity of a tool: the function object (closures from one factory are different
+    tools) and its compiled schema. Wrappers made with functools.wraps, like the ones
+    of @isolated tools, share the key of the function they wrap.
+    """
+    function = inspect.unwrap(function)
+    module = getattr(function, '__module__', None)
+    name = getattr(function, '__qualname__', function.__name__)
+    return f"{module}.{name}#{_tool_number(function)}:{schema_of(function).id}"
+
+def args_key(args: dict) -> str:
+    """Arguments serialized with sorted keys, so argument order does not matter"""
+    return json.dumps(args, sort_keys=True, separators=(',', ':'), default=repr)
+
+def _detached(output):
+    # callers may mutate what they get back, the memo keeps its own copy
+    return copy.deepcopy(output) if isinstance(output, (list, dict, set)) else output
+
+class ToolMemo:
+    """
+    LRU bounded by max_entries across all tools. A tool's own ttl (seconds) and
+    max_entries, given to @pure, apply on top: older results are ignored and dropped,
+    and a tool over its limit evicts its least recently used result first.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # tool key -> its args keys, least recently used first; tools without entries are dropped
+        self._per_tool = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def get(self, function, args: dict):
+        """The memoized output, or the MISSING sentinel"""
+        key = (tool_key(function), args_key(args))
+        ttl = getattr(function, '_memo_ttl', None)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and ttl is not None and time.time() - entry[1] > ttl:
+                self._drop(key)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._per_tool[key[0]].move_to_end(key[1])
+            self.stats["hits"] += 1
+        return _detached(entry[0])
+
+    def put(self, function, args: dict, output):
+        tool = tool_key(function)
+        key = (tool, args_key(args))
+        limit = getattr(function, '_memo_max_entries', None)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (_detached(output), time.time())
+            tool_entries = self._per_tool.setdefault(tool, OrderedDict())
+            tool_entries[key[1]] = None
+            self.stats["stores"] += 1
+            if limit is not None and len(tool_entries) > limit:
+                self._evict((tool, next(iter(tool_entries))))
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def _drop(self, key: tuple):
+        del self._entries[key]
+        tool_entries = self._per_tool[key[0]]
+        del tool_entries[key[1]]
+        if not tool_entries:
+            del self._per_tool[key[0]]
+
+    def _evict(self, key: tuple):
+        self._drop(key)
+        self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._per_tool.clear()
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+_default_memo = None
+
+def get_memo() -> ToolMemo:
+    """Process wide memo, created on first use"""
+    global _default_memo
+    if _default_memo is None:
+        _default_memo = ToolMemo()
+    return _default_memo
+
+def configure_memo(**kwargs) -> ToolMemo:
+    """Replace the process wide memo, e.g. configure_memo(max_entries=100000)"""
+    global _default_memo
+    _default_memo = ToolMemo(**kwargs)
+    return _default_memo
+
+def resolve_memo(memo):
+    """ToolMemo for the memo option of solve: the process wide one by default, False disables it"""
+    if memo is None or memo is True:
+        return get_memo()
+    return memo or None
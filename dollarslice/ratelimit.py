@@ -0,0 +1,197 @@
+"""
+Per-provider request, token and concurrency limits for LLM calls
+"""
+
+import asyncio
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+_DURATION_PART = re.compile(r'([\d.]+)(ms|h|m|s)')
+_UNIT_SECONDS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+def parse_reset(value: str):
+    """Seconds until a reset header fires. Accepts '1.5', '6m0s', '20ms' and RFC 3339 times"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and ''.join(n + u for n, u in parts) == value:
+        return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+    try:
+        reset = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if reset.tzinfo is None:
+        reset = reset.replace(tzinfo=timezone.utc)
+    return max((reset - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+# (remaining header, reset header) pairs sent by OpenAI/Groq and Anthropic
+_EXHAUSTION_HEADERS = [
+    ('x-ratelimit-remaining-requests', 'x-ratelimit-reset-requests'),
+    ('x-ratelimit-remaining-tokens', 'x-ratelimit-reset-tokens'),
+    ('anthropic-ratelimit-requests-remaining', 'anthropic-ratelimit-requests-reset'),
+    ('anthropic-ratelimit-tokens-remaining', 'anthropic-ratelimit-tokens-reset'),
+    ('anthropic-ratelimit-input-tokens-remaining', 'anthropic-ratelimit-input-tokens-reset'),
+    ('anthropic-ratelimit-output-tokens-remaining', 'anthropic-ratelimit-output-tokens-reset'),
+]
+
+class ProviderLimiter:
+    """
+    Token buckets for requests and tokens per minute plus a cap on in-flight requests.
+    Token usage is only known after a response, so it is debited on release and new
+    requests wait while the token bucket is empty. Exhaustion reported by the
+    provider's rate limit headers pauses new requests until the advertised reset.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None, max_concurrent: int = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrent = max_concurrent
+        self._request_level = requests_per_minute or 0.0
+        self._token_level = tokens_per_minute or 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.tokens = 0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._request_level = min(self.requests_per_minute, self._request_level + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._token_level = min(self.tokens_per_minute, self._token_level + elapsed * self.tokens_per_minute / 60)
+
+    def _delay(self) -> float:
+        """0 when a request may start now, seconds to wait otherwise, -1 to wait for a release"""
+        now = time.monotonic()
+        self._refill(now)
+        if self.max_concurrent and self.in_flight >= self.max_concurrent:
+            return -1
+        delays = [self._blocked_until - now]
+        if self.requests_per_minute and self._request_level < 1:
+            delays.append((1 - self._request_level) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute and self._token_level <= 0:
+            delays.append(-self._token_level * 60 / self.tokens_per_minute + 0.001)
+        delay = max(delays)
+        if delay > 0:
+            return delay
+        self._request_level -= 1
+        self.in_flight += 1
+        self.requests += 1
+        return 0
+
+    def acquire(self):
+        with self._cond:
+            delay = self._delay()
+            if delay == 0:
+                return
+            self.waiting += 1
+            try:
+                while delay != 0:
+                    self._cond.wait(timeout=delay if delay > 0 else None)
+                    delay = self._delay()
+            finally:
+                self.waiting -= 1
+
+    async def aacquire(self):
+        with self._cond:
+            delay = self._delay()
+            if delay == 0:
+                return
+            self.waiting += 1
+        try:
+            while delay != 0:
+                await asyncio.sleep(delay if delay > 0 else 0.01)
+                with self._cond:
+                    delay = self._delay()
+        finally:
+            with self._cond:
+                self.waiting -= 1
+
+    def release(self, headers=None, tokens: int = 0):
+        with self._cond:
+            self.in_flight -= 1
+            self.tokens += tokens
+            if self.tokens_per_minute:
+                self._token_level -= tokens
+            if headers is not None:
+                self._apply_headers(headers)
+            self._cond.notify_all()
+
+    def _apply_headers(self, headers):
+        waits = [parse_reset(headers.get('retry-after'))]
+        for remaining, reset in _EXHAUSTION_HEADERS:
+            if headers.get(remaining) == '0':
+                waits.append(parse_reset(headers.get(reset)))
+        waits = [w for w in waits if w]
+        if waits:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + max(waits))
+
+    def report(self) -> dict:
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "requests": self.requests,
+                "tokens": self.tokens,
+                "blocked_for": max(self._blocked_until - time.monotonic(), 0.0)
+            }
+
+class RateLimits:
+    """Limiters keyed by provider host, hosts without their own settings use the defaults"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters = {}
+        self._settings = {}
+        self._defaults = {}
+
+    def configure(self, provider: str = None, **limits):
+        with self._lock:
+            if provider is None:
+                self._defaults = limits
+                stale = [host for host in self._limiters if host not in self._settings]
+            else:
+                self._settings[provider] = limits
+                stale = [provider]
+            for host in stale:
+                self._limiters.pop(host, None)
+
+    def limiter(self, url: str) -> ProviderLimiter:
+        host = httpx.URL(url).host
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(host)
+                if limiter is None:
+                    limiter = ProviderLimiter(**self._settings.get(host, self._defaults))
+                    self._limiters[host] = limiter
+        return limiter
+
+    def waiting(self) -> int:
+        return sum(limiter.waiting for limiter in list(self._limiters.values()))
+
+    def report(self) -> dict:
+        return {host: limiter.report() for host, limiter in list(self._limiters.items())}
+
+rate_limits = RateLimits()
+
+def configure_rate_limit(provider: str = None, requests_per_minute: float = None,
+                         tokens_per_minute: float = None, max_concurrent: int = None):
+    """
+    Limit calls to one provider host (e.g. 'api.openai.com'), or every host
+    without its own settings when provider is None.
+    """
+    rate_limits.configure(provider, requests_per_minute=requests_per_minute,
+                          tokens_per_minute=tokens_per_minute, max_concurrent=max_concurrent)
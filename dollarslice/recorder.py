@@ -0,0 +1,350 @@
+"""
+Streaming, crash-safe JSONL recording of solve runs
+
+A run is written to DOLLAR_SLICE_SAVE_LOC/<task_id>/<id>.jsonl (or .jsonl.gz) as it
+happens: a header line, one line per step (plus schema lines the first time a tool
+schema is referenced) and a footer line once the run finished. A run without a
+footer is still in progress or was interrupted; everything up to the last complete
+line can be read. Values JSON cannot hold (tuples, datetimes, arbitrary objects)
+are tagged so they load back without pickle.
+
+Runs saved as pickles (save_format='pickle', and runs of older versions) can run
+arbitrary code when loaded, so they are only unpickled when a user asks for one
+(`dollarslice show`, `dollarslice migrate`); scans in the background skip them.
+
+With a BlobStore, large strings and tool schema sets are written to the save
+location's blob store once and referenced from the segment (see blobstore).
+Segments can be compressed with gzip, or zstd when zstandard is installed.
+"""
+
+import gzip
+import io
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+
+from .blobstore import BLOB_DIR, BLOB_TAG, blob_store_of, internalize, zstandard
+from .trajectory import MessageLog, MessageSlice, step_added_messages, steps_start
+from .utils import schema_by_id
+
+FORMAT_VERSION = 1
+PICKLE_EXTENSION = '.pkl'
+RUN_EXTENSIONS = ('.jsonl', '.jsonl.gz', '.jsonl.zst', PICKLE_EXTENSION)
+_TAGS = ('$tuple', '$datetime', '$repr', '$dict', BLOB_TAG)
+_SEGMENT_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+# what reading a segment cut off mid-write raises
+SEGMENT_ERRORS = (EOFError, gzip.BadGzipFile) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+def encode_value(value, blobs=None, threshold: int = 0):
+    """JSON-able form of value; with a BlobStore, strings of at least threshold characters become blob references"""
+    if isinstance(value, str):
+        return blobs.ref(value) if blobs is not None and len(value) >= threshold else value
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, list):
+        return [encode_value(v, blobs, threshold) for v in value]
+    if isinstance(value, tuple):
+        return {"$tuple": [encode_value(v, blobs, threshold) for v in value]}
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value) and not (len(value) == 1 and next(iter(value)) in _TAGS):
+            return {k: encode_value(v, blobs, threshold) for k, v in value.items()}
+        return {"$dict": [[encode_value(k, blobs, threshold), encode_value(v, blobs, threshold)] for k, v in value.items()]}
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    return {"$repr": encode_value(repr(value), blobs, threshold)}
+
+def decode_value(value):
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if len(value) == 1:
+        tag, inner = next(iter(value.items()))
+        if tag == "$tuple":
+            return tuple(decode_value(v) for v in inner)
+        if tag == "$datetime":
+            return datetime.fromisoformat(inner)
+        if tag == "$repr":
+            return inner
+        if tag == "$dict":
+            return {_hashable(decode_value(k)): decode_value(v) for k, v in inner}
+    return {k: decode_value(v) for k, v in value.items()}
+
+def _hashable(value):
+    return tuple(_hashable(v) for v in value) if isinstance(value, list) else value
+
+def segment_codec(compress) -> str:
+    """None, 'gzip' or 'zstd' for the compress option: False, True (gzip), 'gzip', 'zstd' or 'best'"""
+    if not compress:
+        return None
+    if compress == 'best':
+        return 'zstd' if zstandard is not None else 'gzip'
+    if compress is True or compress == 'gzip':
+        return 'gzip'
+    if compress == 'zstd':
+        if zstandard is None:
+            raise ValueError("compress='zstd' needs the zstandard package")
+        return 'zstd'
+    raise ValueError(f"compress must be a bool, 'gzip', 'zstd' or 'best', got {compress!r}")
+
+def run_path(task_id: str, id: str, compress=False) -> str:
+    base_dir = os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice')
+    return os.path.join(base_dir, task_id, f"{id}.jsonl" + _SEGMENT_SUFFIXES[segment_codec(compress)])
+
+def open_segment(file_path: str, mode: str = "rb"):
+    """A segment file opened for reading, decompressed, in 'rb' or 'rt' mode"""
+    if file_path.endswith('.gz'):
+        return gzip.open(file_path, mode, encoding="utf-8" if mode == "rt" else None)
+    if file_path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"{file_path} is zstd compressed, install zstandard to read it")
+        stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True))
+        return io.TextIOWrapper(stream, encoding="utf-8") if mode == "rt" else stream
+    return open(file_path, mode, encoding="utf-8" if mode == "rt" else None)
+
+def _segment_writer(raw, codec: str):
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=raw, mode="wb")
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+    return raw
+
+def find_run(task_id: str, id: str):
+    """Path of a saved run in any supported format, or None"""
+    base_dir = os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice')
+    for extension in RUN_EXTENSIONS:
+        file_path = os.path.join(base_dir, task_id, id + extension)
+        if os.path.isfile(file_path):
+            return file_path
+    return None
+
+def split_run_name(name: str):
+    """(id, extension) of a run file name, or None for other files"""
+    for extension in RUN_EXTENSIONS:
+        if name.endswith(extension):
+            return name[:-len(extension)], extension
+    return None
+
+def is_pickled(name: str) -> bool:
+    return name.endswith(PICKLE_EXTENSION)
+
+def run_files(base_dir: str = None, task_id: str = None, since: float = None, pickles: bool = False):
+    """
+    Paths of the saved runs under base_dir, optionally of one task and modified after since.
+    Pickled runs are only listed with pickles=True.
+    """
+    base_dir = base_dir or os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice')
+    if not os.path.isdir(base_dir):
+        return
+    tasks = [task_id] if task_id else sorted(entry.name for entry in os.scandir(base_dir)
+                                             if entry.is_dir() and entry.name != BLOB_DIR)
+    for task in tasks:
+        task_dir = os.path.join(base_dir, task)
+        if not os.path.isdir(task_dir):
+            continue
+        for entry in os.scandir(task_dir):
+            if not split_run_name(entry.name) or (is_pickled(entry.name) and not pickles):
+                continue
+            if since is not None and entry.stat().st_mtime < since:
+                continue
+            yield entry.path
+
+class StreamRecorder:
+    """
+    Appends a run's steps to its segment file as they happen.
+    fsync: 'never', 'step' (after every line) or 'end' (after the footer).
+    flush_every: flush the write buffer every N lines, 0 leaves it to the OS buffer.
+    compress: see segment_codec. blobs: BlobStore that strings of at least
+    blob_threshold characters and the run's tool schemas are moved to.
+    schemas: descriptions of schema ids not compiled in this process, when rewriting old runs.
+    path: file to write instead of the run's usual path.
+    """
+
+    def __init__(self, task_id: str, id: str, compress=False, fsync: str = 'end', flush_every: int = 1,
+                 blobs=None, blob_threshold: int = 1024, schemas: dict = None, path: str = None):
+        self.path = path or run_path(task_id, id, compress)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._raw = open(self.path, "wb")
+        self._stream = _segment_writer(self._raw, segment_codec(compress))
+        self.task_id = task_id
+        self.id = id
+        self.fsync = fsync
+        self.flush_every = flush_every
+        self.blobs = blobs
+        self.blob_threshold = blob_threshold
+        self._descriptions = schemas or {}
+        self._lines = 0
+        self._schemas = set()
+        self.steps = 0
+        self.bytes_written = 0
+        self.write_time = 0.0
+        self.completed = False
+
+    def _encode(self, record: dict, shared: tuple = ()) -> dict:
+        if self.blobs is None:
+            return encode_value(record)
+        return {key: self.blobs.share(encode_value(value)) if key in shared else encode_value(value, self.blobs, self.blob_threshold)
+                for key, value in record.items()}
+
+    def _write(self, record: dict, sync: bool = False, shared: tuple = ()):
+        clock = time.perf_counter()
+        line = (json.dumps(self._encode(record, shared), separators=(',', ':')) + "\n").encode("utf-8")
+        self._stream.write(line)
+        self.bytes_written += len(line)
+        self._lines += 1
+        if sync or (self.flush_every and self._lines % self.flush_every == 0):
+            self._stream.flush()
+            self._raw.flush()
+            if sync or self.fsync == 'step':
+                os.fsync(self._raw.fileno())
+        self.write_time += time.perf_counter() - clock
+
+    def header(self, task: str, inputs: dict, functions: list, started: datetime = None):
+        self._write({
+            "type": "header",
+            "format": FORMAT_VERSION,
+            "task_id": self.task_id,
+            "id": self.id,
+            "task": task,
+            "inputs": inputs,
+            "functions": functions,
+            "started": started or datetime.now(),
+            **({"blobs": True} if self.blobs is not None else {})
+        }, shared=("functions",))
+
+    def record(self, step: tuple):
+        """Write one step, preceded by the schemas it is the first to reference"""
+        if step[0] == 'llm':
+            _, recorded, schema_ids, trace = step
+            for schema_id in schema_ids:
+                # runs older than schema ids stored the descriptions themselves
+                if isinstance(schema_id, str) and schema_id not in self._schemas:
+                    self._schemas.add(schema_id)
+                    description = self._descriptions.get(schema_id) or schema_by_id(schema_id)
+                    self._write({"type": "schema", "id": schema_id, "description": description}, shared=("description",))
+            added = recorded.added() if isinstance(recorded, MessageSlice) else recorded
+            reset = isinstance(recorded, MessageSlice) and recorded.start == 0 and self.steps > 0
+            self._write({"type": "llm", "messages": added, "reset": reset, "schemas": schema_ids, "trace": trace})
+        elif step[0] == 'function':
+            _, name, args, output, trace = step
+            self._write({"type": "function", "name": name, "args": args, "output": output, "trace": trace})
+        else:
+            self._write({"type": "other", "step": step})
+        self.steps += 1
+
+    def footer(self, answer_generated: bool, final_result, ended: datetime = None, stopped: str = None):
+        footer = {
+            "type": "footer",
+            "answer_generated": answer_generated,
+            "final_result": final_result,
+            "steps": self.steps,
+            "ended": ended or datetime.now()
+        }
+        if stopped is not None:
+            footer["stopped"] = stopped
+        self._write(footer, sync=self.fsync != 'never')
+        self.completed = True
+
+    def close(self):
+        if not self._raw.closed:
+            clock = time.perf_counter()
+            self._stream.close()
+            self._raw.close()
+            self.write_time += time.perf_counter() - clock
+
+def decode_line(line, file_path: str) -> dict:
+    """One segment line decoded, with blob references resolved from the run's save location"""
+    record = json.loads(line)
+    if (b'"$blob"' if isinstance(line, bytes) else '"$blob"') in line:
+        record = internalize(record, blob_store_of(file_path))
+    return decode_value(record)
+
+def iter_records(file_path: str):
+    """Decoded records of a segment file, stopping quietly at a truncated tail"""
+    with open_segment(file_path, "rt") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    return
+                yield decode_line(line, file_path)
+        except (json.JSONDecodeError,) + SEGMENT_ERRORS:
+            return
+
+def read_run(file_path: str, allow_pickle: bool = False) -> dict:
+    """
+    Load a saved run into the same shape save_steps pickles, with 'complete' telling
+    whether the footer was written. Pickle files raise ValueError unless allow_pickle,
+    only pass it for a run the user asked for.
+    """
+    if is_pickled(file_path):
+        if not allow_pickle:
+            raise ValueError(f"{file_path} is a pickled run, convert it with `dollarslice migrate` to read it")
+        with open(file_path, "rb") as f:
+            data = pickle.load(f)
+        data.setdefault("complete", True)
+        return data
+    data = {"steps": [], "schemas": {}, "complete": False, "answer_generated": None}
+    log = MessageLog()
+    for record in iter_records(file_path):
+        kind = record["type"]
+        if kind == "header":
+            data.update({k: record[k] for k in ("task_id", "id", "task", "inputs", "functions", "started")})
+        elif kind == "schema":
+            data["schemas"][record["id"]] = record["description"]
+        elif kind == "llm":
+            if record.get("reset"):
+                log = MessageLog()
+            start = len(log.messages)
+            log.messages.extend(record["messages"])
+            data["steps"].append(('llm', MessageSlice(log, start, len(log.messages)), record["schemas"], record["trace"]))
+        elif kind == "function":
+            data["steps"].append(('function', record["name"], record["args"], record["output"], record["trace"]))
+        elif kind == "footer":
+            data.update(complete=True, answer_generated=record["answer_generated"],
+                        final_result=record["final_result"], ended=record["ended"], stopped=record.get("stopped"))
+        else:
+            data["steps"].append(record.get("step"))
+    return data
+
+def rewrite_run(file_path: str, blobs=None, compress='best', blob_threshold: int = 1024) -> str:
+    """
+    Write a saved run (a pickle or a segment) again as a segment using blobs, next to
+    the original; returns the new file's path. The original is left for the caller
+    to remove, unless the new file took its name. Pickles are loaded, so only rewrite
+    runs the user asked to migrate.
+    """
+    data = read_run(file_path, allow_pickle=True)
+    task_id = os.path.basename(os.path.dirname(file_path))
+    run_id = split_run_name(os.path.basename(file_path))[0]
+    target = os.path.join(os.path.dirname(file_path), f"{run_id}.jsonl" + _SEGMENT_SUFFIXES[segment_codec(compress)])
+    temp_path = target + ".tmp"
+    steps = data.get("steps", [])
+    recorder = StreamRecorder(task_id, run_id, compress=compress, fsync='never', flush_every=0, blobs=blobs,
+                              blob_threshold=blob_threshold, schemas=data.get("schemas"), path=temp_path)
+    try:
+        started = data.get("started") or steps_start(steps) or datetime.fromtimestamp(os.path.getmtime(file_path))
+        recorder.header(data.get("task"), data.get("inputs"), data.get("functions", []), started=started)
+        log, previous = MessageLog(), None
+        for step in steps:
+            if step[0] == 'llm' and not isinstance(step[1], MessageSlice):
+                # older pickles hold a full copy of the conversation in every LLM step
+                added = step_added_messages(step[1], previous)
+                if previous is not None and added is step[1]:
+                    log = MessageLog()
+                previous, start = step[1], len(log.messages)
+                log.messages.extend(added)
+                step = ('llm', MessageSlice(log, start, len(log.messages))) + tuple(step[2:])
+            recorder.record(step)
+        if data.get("complete", True):
+            recorder.footer(data.get("answer_generated"), data.get("final_result"), ended=data.get("ended"),
+                            stopped=data.get("stopped"))
+        recorder.close()
+        os.replace(temp_path, target)
+    except BaseException:
+        recorder.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return target
@@ -0,0 +1,228 @@
+"""
+Replay of previously saved successful runs, so repeat tasks can skip the LLM
+
+solve(..., replay=True) looks for a saved successful run of the same template, tools
+and identical inputs, an exact-input replay: the answer may depend on any input, so a
+run with other inputs of the same shape is not reused. The run's @pure tool calls and
+its final answer are made again and must return what was recorded, a tool that
+diverges or raises falls back to solving. Other tools are not called again, they may
+have side effects, so their recorded outputs cannot be checked against the world as
+it is now: runs that call them are only replayed with replay='unverified'.
+Pickled runs are not unpickled here, convert them with `dollarslice migrate` first.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .utils import schema_of, func_map
+from .recorder import decode_value, encode_value, is_pickled, read_run, split_run_name
+from .trajectory import steps_duration
+
+# runs indexed per task_id, the oldest are dropped beyond this
+MAX_ENTRIES = 1000
+
+def _base_dir():
+    return os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice')
+
+def input_shape(inputs: dict) -> tuple:
+    return tuple(sorted((key, type(value).__name__) for key, value in inputs.items()))
+
+def tool_signature(described: list) -> str:
+    """Order independent hash of a list of describe_function tuples"""
+    payload = '\n'.join(sorted(repr(tuple(d)) for d in described))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def bake_key(task: str, inputs: dict, described: list) -> tuple:
+    return task, input_shape(inputs), tool_signature(described)
+
+def inputs_key(inputs: dict) -> str:
+    return json.dumps(inputs, sort_keys=True, default=repr)
+
+def recorded_form(value):
+    """value as it reads back from a saved run (tuples of pickles stay tuples, objects become their repr)"""
+    return decode_value(encode_value(value))
+
+def _index_entry(data, mtime):
+    calls = [(step[1], step[2], step[3]) for step in data['steps'] if step[0] == 'function']
+    return {
+        "id": data['id'],
+        "inputs": data['inputs'],
+        "calls": calls,
+        "answer_generated": data.get('answer_generated'),
+        "duration": steps_duration(data['steps']),
+        "mtime": mtime
+    }
+
+class ReplayIndex:
+    """
+    Index of saved runs under DOLLAR_SLICE_SAVE_LOC, bucketed by task template,
+    input shape and tool signatures, keeping the newest run per identical inputs and
+    at most max_entries runs per task_id. Task directories are rescanned
+    incrementally: finished files are loaded once, runs still being written (or cut
+    off) again only when their size or mtime changes.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._seen = {}
+        self._counts = {}
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "divergences": 0, "unverified": 0, "time_saved": 0.0}
+
+    def refresh(self, task_id: str):
+        task_dir = os.path.join(_base_dir(), task_id)
+        try:
+            names = os.listdir(task_dir)
+        except OSError:
+            return
+        where = (task_dir, task_id)
+        # name -> None once it is indexed or skipped for good, (mtime, size) while incomplete
+        seen = self._seen.setdefault(where, {})
+        buckets = self._buckets.setdefault(where, {})
+        for name in names:
+            if not split_run_name(name) or is_pickled(name):
+                continue
+            signature = seen.get(name, False)
+            if signature is None:
+                continue
+            file_path = os.path.join(task_dir, name)
+            try:
+                stat = os.stat(file_path)
+                if signature == (stat.st_mtime, stat.st_size):
+                    continue
+                data = read_run(file_path)
+            except Exception:
+                seen[name] = None
+                continue
+            if not data.get('complete') or 'task' not in data:
+                seen[name] = (stat.st_mtime, stat.st_size)
+                continue
+            seen[name] = None
+            if data.get('answer_generated') is False:
+                continue
+            self._add(where, bake_key(data['task'], data['inputs'], data['functions']), _index_entry(data, stat.st_mtime))
+
+    def _add(self, where: tuple, key: tuple, entry: dict):
+        bucket = self._buckets[where].setdefault(key, {})
+        same_inputs = inputs_key(entry["inputs"])
+        current = bucket.get(same_inputs)
+        if current is not None and current["mtime"] >= entry["mtime"]:
+            return
+        bucket[same_inputs] = entry
+        if current is None:
+            self._counts[where] = self._counts.get(where, 0) + 1
+        while self._counts[where] > self.max_entries:
+            self._drop_oldest(where)
+
+    def _drop_oldest(self, where: tuple):
+        buckets = self._buckets[where]
+        key, same_inputs = min(((key, same_inputs) for key, bucket in buckets.items() for same_inputs in bucket),
+                               key=lambda found: buckets[found[0]][found[1]]["mtime"])
+        del buckets[key][same_inputs]
+        if not buckets[key]:
+            del buckets[key]
+        self._counts[where] -= 1
+
+    def lookup(self, task_id: str, task: str, inputs: dict, functions: list):
+        """
+        Newest successful run recorded for the same template and tools with identical
+        inputs; runs are bucketed by input shape, but the final answer may depend on any
+        input value.
+        """
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.refresh(task_id)
+            described = [schema_of(f).description for f in functions]
+            bucket = self._buckets.get((os.path.join(_base_dir(), task_id), task_id), {})
+            entry = bucket.get(bake_key(task, inputs, described), {}).get(inputs_key(inputs))
+            if entry is not None and entry["inputs"] == inputs and entry["calls"]:
+                succeeded = entry["answer_generated"]
+                if succeeded is None:
+                    final_names = {f.__name__ for f in functions if getattr(f, '_is_final_answer', False)}
+                    succeeded = entry["calls"][-1][0] in final_names
+                if succeeded:
+                    return entry
+            self.stats["misses"] += 1
+            return None
+
+    def replay(self, entry: dict, functions: list, unverified: bool = False):
+        """
+        Check the recording against the supplied functions: @pure tools and the final
+        answer are run again and must return what was recorded (compared as it reads
+        back from a saved run). Runs that called other tools are refused unless
+        unverified, and then those tools are not run, they may have side effects.
+        Returns (final_result, True), or None as soon as a tool is missing, diverges or
+        raises.
+        """
+        start = time.perf_counter()
+        checks, outcome = self._checks(entry, functions, unverified)
+        try:
+            for function, args, recorded_output in checks:
+                if recorded_form(function(**args)) != recorded_form(recorded_output):
+                    outcome = "divergences"
+                    break
+        except Exception:
+            outcome = "misses"
+        return self._settle(entry, checks, outcome, start)
+
+    async def areplay(self, entry: dict, functions: list, unverified: bool = False):
+        """replay for arun_solve, async def tools are awaited and plain ones run in the default executor"""
+        from .core import call_tool_async
+        start = time.perf_counter()
+        checks, outcome = self._checks(entry, functions, unverified)
+        try:
+            for function, args, recorded_output in checks:
+                if recorded_form(await call_tool_async(function, args)) != recorded_form(recorded_output):
+                    outcome = "divergences"
+                    break
+        except Exception:
+            outcome = "misses"
+        return self._settle(entry, checks, outcome, start)
+
+    def _checks(self, entry: dict, functions: list, unverified: bool) -> tuple:
+        """
+        (calls to run again up to the final answer, as (function, args, recorded output),
+        None or the stat counting why the run cannot be replayed)
+        """
+        from .core import is_pure_function
+        function_map = dict([func_map(f) for f in functions])
+        checks = []
+        for name, args, recorded_output in entry["calls"]:
+            function = function_map.get(name)
+            if function is None:
+                return [], "divergences"
+            final = getattr(function, '_is_final_answer', False)
+            if final or is_pure_function(function):
+                checks.append((function, args, recorded_output))
+            elif not unverified:
+                return [], "unverified"
+            if final:
+                return checks, None
+        return [], "divergences"
+
+    def _settle(self, entry: dict, checks: list, outcome: str, start: float):
+        if outcome is not None:
+            with self._lock:
+                self.stats[outcome] += 1
+            return None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["time_saved"] += max(entry["duration"] - elapsed, 0.0)
+        return checks[-1][2], True
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
+
+replay_index = ReplayIndex()
+
+def replay_stats() -> dict:
+    """Replay hits, misses, divergences, runs refused as unverified, hit rate and estimated seconds saved"""
+    return replay_index.report()
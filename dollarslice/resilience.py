@@ -0,0 +1,376 @@
+"""
+Retries, hedged requests, circuit breakers and provider failover for LLM calls
+
+A Resilience tries the providers of its ordered list in turn. Each provider gets up
+to retry.max_attempts attempts with jittered exponential backoff (or the server's
+Retry-After), and a circuit breaker per provider skips one that keeps failing until
+its reset_timeout has passed. Requests still running past the hedge_percentile of
+a provider's recent latencies get a duplicate, and the first response wins.
+Every attempt is reported, create_simple_llm(resilience=...) puts them in the
+call metrics.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import httpx
+
+from .ratelimit import parse_reset
+
+ATTEMPTS_KEY = '_dollarslice_attempts'
+
+class PartialResponseError(Exception):
+    """A streamed response failed after tool calls were reported, it cannot be sent again"""
+
+def retry_after(headers) -> float:
+    """Seconds asked for by retry-after-ms or Retry-After (seconds or an HTTP date), None without one"""
+    if headers is None:
+        return None
+    if headers.get('retry-after-ms'):
+        try:
+            return float(headers['retry-after-ms']) / 1000
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    seconds = parse_reset(value)
+    if seconds is not None:
+        return seconds
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """
+    Full jitter exponential backoff: attempt n waits a random time up to
+    min(max_delay, base_delay * 2**n). A Retry-After longer than max_retry_after
+    moves on to the next provider instead of waiting.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 20.0,
+                 retry_statuses: tuple = (408, 409, 429, 500, 502, 503, 504), max_retry_after: float = 60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self.max_retry_after = max_retry_after
+
+    def classify(self, error: Exception) -> tuple:
+        """(status, retryable, seconds the server asked to wait)"""
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            return status, status in self.retry_statuses, retry_after(error.response.headers)
+        return None, isinstance(error, (httpx.TransportError, ValueError)), None
+
+    def delay(self, attempt: int, wait_for: float = None) -> float:
+        if wait_for is not None:
+            return wait_for
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class CircuitBreaker:
+    """Opens after failure_threshold failures in a row, lets one trial call through after reset_timeout"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def admit(self) -> tuple:
+        """(whether a call may go through, whether it is the half-open trial)"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True, False
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True, True
+            return False, False
+
+    def allow(self) -> bool:
+        return self.admit()[0]
+
+    def end_trial(self):
+        """
+        Settle a trial call that neither succeeded nor failed in a way that counts
+        (a client error, an exception), so the next call can be the trial
+        """
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at, self._trial = time.monotonic(), False
+
+class LatencyTracker:
+    """Durations of a provider's last window successful calls"""
+
+    def __init__(self, window: int = 200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, duration: float):
+        with self._lock:
+            self.samples.append(duration)
+
+    def percentile(self, q: float, min_samples: int) -> float:
+        with self._lock:
+            if len(self.samples) < min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+class Resilience:
+    """
+    providers: names tried in order; those without an API key in the environment are left out.
+    hedge_after: fixed seconds before a duplicate request is sent, otherwise the
+    hedge_percentile of the provider's latencies once hedge_min_samples calls have
+    completed; hedge_percentile=None disables hedging. Streamed calls are not hedged.
+    timeout: seconds per attempt, instead of the transport's timeout.
+    One Resilience is meant to be shared, its breakers and latencies are per provider.
+    """
+
+    def __init__(self, providers: tuple = ('openai', 'groq', 'anthropic'), retry: RetryPolicy = None,
+                 hedge_percentile: float = 0.95, hedge_min_samples: int = 20, hedge_after: float = None,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0, timeout: float = None):
+        self.providers = list(providers)
+        self.retry = retry or RetryPolicy()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+        self._breakers = {}
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "failovers": 0, "hedges": 0, "hedge_wins": 0,
+                      "circuit_open": 0, "failures": 0}
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(provider)
+            if breaker is None:
+                breaker = self._breakers[provider] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def latencies(self, provider: str) -> LatencyTracker:
+        with self._lock:
+            tracker = self._latencies.get(provider)
+            if tracker is None:
+                tracker = self._latencies[provider] = LatencyTracker()
+            return tracker
+
+    def _count(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def hedge_delay(self, provider: str, hedge: bool) -> float:
+        if not hedge or self.hedge_percentile is None:
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        return self.latencies(provider).percentile(self.hedge_percentile, self.hedge_min_samples)
+
+    def _open(self, provider: str, attempt: int, attempts: list) -> bool:
+        """None when the provider's breaker stops this attempt, else whether it is the breaker's trial"""
+        allowed, trial = self.breaker(provider).admit()
+        if allowed:
+            self._count(attempts=1, retries=1 if attempt else 0)
+            return trial
+        attempts.append({"provider": provider, "attempt": attempt + 1, "outcome": "circuit_open", "duration": 0.0})
+        self._count(circuit_open=1)
+        return None
+
+    def _close(self, provider: str, attempt: int, result: tuple, hedge_started: bool, clock: float, attempts: list) -> float:
+        """Record a finished attempt; seconds to wait before retrying a failed one, None to move on"""
+        _, error, own_duration, hedge_won = result
+        record = {"provider": provider, "attempt": attempt + 1, "hedged": hedge_started, "duration": time.perf_counter() - clock}
+        if error is None:
+            record.update(outcome="ok", status=200)
+            attempts.append(record)
+            if hedge_won:
+                self._count(hedge_wins=1)
+            self.breaker(provider).record_success()
+            self.latencies(provider).add(own_duration)
+            return None
+        if not isinstance(error, (httpx.HTTPError, ValueError)):
+            raise error
+        status, retryable, wait_for = self.retry.classify(error)
+        record.update(outcome="error", status=status, error=f"HTTP {status}" if status else repr(error))
+        attempts.append(record)
+        if retryable:
+            self.breaker(provider).record_failure()
+        if not retryable or attempt + 1 >= self.retry.max_attempts:
+            return None
+        if wait_for is not None and wait_for > self.retry.max_retry_after:
+            return None
+        return self.retry.delay(attempt, wait_for)
+
+    def _failed_over(self, plan: list, error: Exception):
+        self._count(failures=1)
+        if error is None:
+            raise RuntimeError(f"No provider available, tried {', '.join(p for p, _, _ in plan) or 'none'}")
+        raise error
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="dollarslice-hedge")
+            return self._executor
+
+    def _timed(self, send, hedge: bool) -> tuple:
+        """(body, error, duration of this request, whether it is the hedge)"""
+        clock = time.perf_counter()
+        try:
+            return send(self.timeout), None, time.perf_counter() - clock, hedge
+        except Exception as e:
+            return None, e, time.perf_counter() - clock, hedge
+
+    def _hedged(self, send, delay: float) -> tuple:
+        """(_timed result of the first successful request, or the last failed one; whether a hedge was sent)"""
+        pool = self._pool()
+        first = pool.submit(self._timed, send, False)
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result(), False
+        self._count(hedges=1)
+        pending = {first, pool.submit(self._timed, send, True)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            result = next(iter(done)).result()
+            if result[1] is None:
+                break
+        return result, True
+
+    def run(self, plan: list) -> tuple:
+        """
+        plan: (provider, send(timeout) -> body, hedge allowed) in failover order.
+        (body, attempts), or the last error once every provider has failed.
+        A losing hedge is left to finish in the background.
+        """
+        self._count(calls=1)
+        attempts, error = [], None
+        for position, (provider, send, hedge) in enumerate(plan):
+            if position:
+                self._count(failovers=1)
+            for attempt in range(self.retry.max_attempts):
+                trial = self._open(provider, attempt, attempts)
+                if trial is None:
+                    break
+                try:
+                    clock, delay = time.perf_counter(), self.hedge_delay(provider, hedge)
+                    result, hedge_started = (self._timed(send, False), False) if delay is None else self._hedged(send, delay)
+                    wait_for = self._close(provider, attempt, result, hedge_started, clock, attempts)
+                finally:
+                    if trial:
+                        self.breaker(provider).end_trial()
+                body, error = result[:2]
+                if error is None:
+                    return body, attempts
+                if wait_for is None:
+                    break
+                time.sleep(wait_for)
+        self._failed_over(plan, error)
+
+    async def _atimed(self, send, hedge: bool) -> tuple:
+        clock = time.perf_counter()
+        try:
+            return await send(self.timeout), None, time.perf_counter() - clock, hedge
+        except Exception as e:
+            return None, e, time.perf_counter() - clock, hedge
+
+    async def _ahedged(self, send, delay: float) -> tuple:
+        first = asyncio.ensure_future(self._atimed(send, False))
+        done, _ = await asyncio.wait([first], timeout=delay)
+        if done:
+            return first.result(), False
+        self._count(hedges=1)
+        pending = {first, asyncio.ensure_future(self._atimed(send, True))}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                result = next(iter(done)).result()
+                if result[1] is None:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+        return result, True
+
+    async def arun(self, plan: list) -> tuple:
+        """run for plans whose send functions are coroutines; a losing hedge is cancelled"""
+        self._count(calls=1)
+        attempts, error = [], None
+        for position, (provider, send, hedge) in enumerate(plan):
+            if position:
+                self._count(failovers=1)
+            for attempt in range(self.retry.max_attempts):
+                trial = self._open(provider, attempt, attempts)
+                if trial is None:
+                    break
+                try:
+                    clock, delay = time.perf_counter(), self.hedge_delay(provider, hedge)
+                    result, hedge_started = (await self._atimed(send, False), False) if delay is None else await self._ahedged(send, delay)
+                    wait_for = self._close(provider, attempt, result, hedge_started, clock, attempts)
+                finally:
+                    if trial:
+                        self.breaker(provider).end_trial()
+                body, error = result[:2]
+                if error is None:
+                    return body, attempts
+                if wait_for is None:
+                    break
+                await asyncio.sleep(wait_for)
+        self._failed_over(plan, error)
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["circuits"] = {provider: breaker.state for provider, breaker in list(self._breakers.items())}
+        return stats
+
+_default_resilience = None
+
+def get_resilience() -> Resilience:
+    """Process wide Resilience, created on first use"""
+    global _default_resilience
+    if _default_resilience is None:
+        _default_resilience = Resilience()
+    return _default_resilience
+
+def configure_resilience(**kwargs) -> Resilience:
+    """Replace the process wide Resilience, e.g. configure_resilience(providers=('groq', 'openai'))"""
+    global _default_resilience
+    _default_resilience = Resilience(**kwargs)
+    return _default_resilience
+
+def resolve_resilience(resilience):
+    """True selects the process wide Resilience, None/False makes single attempts"""
+    if resilience is True:
+        return get_resilience()
+    return resilience or None
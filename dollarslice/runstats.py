@@ -0,0 +1,198 @@
+"""
+Aggregate statistics over saved runs, streamed one run at a time
+
+Each run file is reduced to a small summary (in worker processes when there are
+many), and summaries are folded into per task_id aggregates whose size does not
+grow with the number of runs: latencies and token counts go into QuantileSketches,
+LLM call counts into a histogram and tool durations into running totals.
+"""
+
+import math
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+from .recorder import is_pickled, iter_records
+
+# below this many files, starting worker processes costs more than it saves
+_PARALLEL_MIN_FILES = 64
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram: quantiles within relative_accuracy of the exact value,
+    memory bounded by the range of the values rather than their number
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = value if self.max is None else max(self.max, value)
+        if value <= 0:
+            self.zeros += 1
+        else:
+            self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return min(2 * self.gamma ** index / (self.gamma + 1), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {"mean": self.total / self.count if self.count else None, "p50": self.quantile(0.5),
+                "p95": self.quantile(0.95), "p99": self.quantile(0.99), "max": self.max}
+
+def _trace_span(trace: dict, span: list):
+    if trace and trace.get('start_time') and trace.get('end_time'):
+        span[0] = trace['start_time'] if span[0] is None else min(span[0], trace['start_time'])
+        span[1] = trace['end_time'] if span[1] is None else max(span[1], trace['end_time'])
+
+def _summarize_steps(steps, summary: dict):
+    span = [None, None]
+    for step in steps:
+        if step[0] == 'llm':
+            trace = step[3][2] or {}
+            summary["llm_calls"] += 1
+            summary["tokens"] += trace.get("total_tokens", 0) or 0
+            _trace_span(trace, span)
+        elif step[0] == 'function':
+            name, trace = step[1], step[4] or {}
+            tool = summary["tools"].setdefault(name, [0, 0.0, 0.0])
+            duration = trace.get("duration")
+            if duration is None and trace.get('start_time') and trace.get('end_time'):
+                duration = (trace['end_time'] - trace['start_time']).total_seconds()
+            tool[0] += 1
+            tool[1] += duration or 0.0
+            tool[2] = max(tool[2], duration or 0.0)
+            _trace_span(trace, span)
+    if span[0] is not None:
+        summary["duration"] = (span[1] - span[0]).total_seconds()
+
+def _records_as_steps(records):
+    for record in records:
+        kind = record["type"]
+        if kind == "llm":
+            yield ('llm', None, None, record["trace"])
+        elif kind == "function":
+            yield ('function', record["name"], None, None, record["trace"])
+
+def summarize_run(path: str) -> dict:
+    """Summary of one run file; success is None for runs that never finished, pickled runs are not read"""
+    task_id = os.path.basename(os.path.dirname(path))
+    summary = {"task_id": task_id, "path": path, "success": None, "duration": None,
+               "tokens": 0, "llm_calls": 0, "tools": {}, "error": None}
+    try:
+        if is_pickled(path):
+            summary["error"] = "pickled run, convert it with `dollarslice migrate`"
+            return summary
+        footer = {}
+        def records():
+            for record in iter_records(path):
+                if record["type"] == "footer":
+                    footer.update(record)
+                yield record
+        _summarize_steps(_records_as_steps(records()), summary)
+        if footer:
+            summary["success"] = bool(footer.get("answer_generated"))
+    except Exception as e:
+        summary["error"] = repr(e)
+    return summary
+
+class TaskStats:
+    """Running aggregate of the summaries of one task_id (or of every run)"""
+
+    def __init__(self):
+        self.runs = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.incomplete = 0
+        self.unreadable = 0
+        self.latency = QuantileSketch()
+        self.tokens = QuantileSketch()
+        self.llm_calls = Counter()
+        self.tools = {}
+
+    def add(self, summary: dict):
+        self.runs += 1
+        if summary["error"] is not None:
+            self.unreadable += 1
+            return
+        if summary["success"] is None:
+            self.incomplete += 1
+        elif summary["success"]:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        if summary["duration"] is not None:
+            self.latency.add(summary["duration"])
+        self.tokens.add(summary["tokens"])
+        self.llm_calls[summary["llm_calls"]] += 1
+        for name, (calls, total, longest) in summary["tools"].items():
+            tool = self.tools.setdefault(name, [0, 0.0, 0.0])
+            tool[0] += calls
+            tool[1] += total
+            tool[2] = max(tool[2], longest)
+
+    def report(self, top_tools: int = 5) -> dict:
+        finished = self.succeeded + self.failed
+        slowest = sorted(self.tools.items(), key=lambda item: item[1][1] / item[1][0] if item[1][0] else 0.0, reverse=True)
+        return {
+            "runs": self.runs,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "incomplete": self.incomplete,
+            "unreadable": self.unreadable,
+            "success_rate": self.succeeded / finished if finished else None,
+            "latency": self.latency.summary(),
+            "tokens_per_run": self.tokens.summary(),
+            "tokens_total": self.tokens.total,
+            "llm_calls": {str(calls): runs for calls, runs in sorted(self.llm_calls.items())},
+            "slowest_tools": [{"name": name, "calls": calls, "mean": total / calls if calls else 0.0,
+                               "max": longest, "total": total}
+                              for name, (calls, total, longest) in slowest[:top_tools]]
+        }
+
+def iter_summaries(paths, jobs: int = None):
+    """summarize_run over paths, in jobs worker processes; order is not kept"""
+    jobs = jobs if jobs is not None else os.cpu_count() or 1
+    paths = iter(paths)
+    head = list(islice(paths, _PARALLEL_MIN_FILES))
+    if jobs <= 1 or len(head) < _PARALLEL_MIN_FILES:
+        for path in chain(head, paths):
+            yield summarize_run(path)
+        return
+    paths = chain(head, paths)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # a bounded window of files in flight, so memory does not grow with the number of runs
+        pending = deque(executor.submit(summarize_run, path) for path in islice(paths, jobs * 4))
+        while pending:
+            future = pending.popleft()
+            for path in islice(paths, 1):
+                pending.append(executor.submit(summarize_run, path))
+            yield future.result()
+
+def aggregate(paths, jobs: int = None, top_tools: int = 5) -> dict:
+    """{"overall": report, "tasks": {task_id: report}} over the runs at paths"""
+    overall, tasks = TaskStats(), {}
+    for summary in iter_summaries(paths, jobs):
+        overall.add(summary)
+        tasks.setdefault(summary["task_id"], TaskStats()).add(summary)
+    return {"overall": overall.report(top_tools),
+            "tasks": {task_id: stats.report(top_tools) for task_id, stats in sorted(tasks.items())}}
@@ -0,0 +1,299 @@
+"""
+Speculative prefetch of tool calls, predicted from earlier runs of the same task
+
+solve(..., speculate=Speculator()) learns, per task_id, which call usually follows
+which (tool and arguments) from the saved runs and from the runs it sees. Before each
+LLM call it starts the likely next calls of @pure tools in the background; when the
+model then asks for one of them, the result that is ready (or nearly) is used instead
+of running the tool again. Wrong guesses are dropped: only pure tools are ever run
+speculatively, so they have no side effects to undo.
+
+The run's SpeculationRun sits in front of the memo (it has the same get/put), so
+answered calls show up as cached in their trace.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .isolation import ToolFailure
+from .memo import MISSING, args_key, tool_key
+
+START = "^"
+
+def run_calls(file_path: str) -> list:
+    """(name, args) of every tool call of a saved segment, in order"""
+    from .recorder import iter_records
+    return [(record["name"], record["args"]) for record in iter_records(file_path) if record["type"] == "function"]
+
+class TransitionModel:
+    """
+    How often each call followed each other call (or started a run), in one task_id's runs.
+    Keeps the max_states most recently seen calls, each with its max_following most
+    frequent next calls; the arguments of a call are kept while some state can lead to it.
+    """
+
+    def __init__(self, max_states: int = 10000, max_following: int = 32):
+        self.max_states = max_states
+        self.max_following = max_following
+        self.transitions = OrderedDict()
+        self.args = {}
+        self.runs = 0
+        self._refs = Counter()
+        self._lock = threading.Lock()
+
+    def learn(self, calls: list):
+        with self._lock:
+            self.runs += 1
+            state = START
+            for name, args in calls:
+                key = (name, args_key(args))
+                following = self.transitions.get(state)
+                if following is None:
+                    following = self.transitions[state] = Counter()
+                    while len(self.transitions) > self.max_states:
+                        for evicted in self.transitions.popitem(last=False)[1]:
+                            self._release(evicted)
+                else:
+                    self.transitions.move_to_end(state)
+                if key not in following:
+                    if len(following) >= self.max_following:
+                        # the least frequent, the oldest of those on a tie
+                        least = min(following, key=following.get)
+                        del following[least]
+                        self._release(least)
+                    self._refs[key] += 1
+                    self.args.setdefault(key, args)
+                following[key] += 1
+                state = key
+
+    def _release(self, key):
+        self._refs[key] -= 1
+        if not self._refs[key]:
+            del self._refs[key]
+            del self.args[key]
+
+    def predict(self, state, limit: int, min_confidence: float) -> list:
+        """
+        [(name, args, probability)] of the calls most likely to come next, also looking
+        further ahead along likely paths, best first
+        """
+        with self._lock:
+            found, frontier = {}, [(state, 1.0)]
+            while frontier and len(found) < limit:
+                next_frontier = []
+                for current, probability in frontier:
+                    following = self.transitions.get(current)
+                    if not following:
+                        continue
+                    total = sum(following.values())
+                    for key, count in following.most_common(limit):
+                        chance = probability * count / total
+                        if chance < min_confidence or key in found:
+                            continue
+                        found[key] = chance
+                        next_frontier.append((key, chance))
+                frontier = next_frontier
+            best = sorted(found.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [(key[0], self.args[key], chance) for key, chance in best]
+
+def _timed(function, args: dict) -> tuple:
+    start = time.perf_counter()
+    output = function(**args)
+    return output, start, time.perf_counter()
+
+async def _atimed(function, args: dict) -> tuple:
+    start = time.perf_counter()
+    output = await function(**args)
+    return output, start, time.perf_counter()
+
+class Speculator:
+    """
+    min_confidence: calls predicted less likely than this are not started.
+    max_predictions: calls started ahead of each LLM call.
+    history_runs: newest saved runs of a task_id learned from, read in the background
+    the first time the task_id is solved (pickled runs are skipped).
+    workers: threads speculative calls of plain tools run on; async tools run as tasks.
+    One Speculator can be shared by many solves, each gets its own SpeculationRun.
+    """
+
+    def __init__(self, min_confidence: float = 0.3, max_predictions: int = 4, history_runs: int = 200, workers: int = 4):
+        self.min_confidence = min_confidence
+        self.max_predictions = max_predictions
+        self.history_runs = history_runs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dollarslice-speculate")
+        self._models = {}
+        self._lock = threading.Lock()
+        self.stats = {"runs": 0, "rounds": 0, "started": 0, "hits": 0, "late": 0, "wasted": 0,
+                      "unpredicted": 0, "errors": 0, "time_saved": 0.0}
+
+    def model(self, task_id: str) -> TransitionModel:
+        """The task_id's model, learning from its saved runs in the background on first use"""
+        with self._lock:
+            model = self._models.get(task_id)
+            if model is None:
+                model = self._models[task_id] = TransitionModel()
+                if task_id is not None and self.history_runs:
+                    self._executor.submit(self._learn_history, task_id, model)
+            return model
+
+    def _learn_history(self, task_id: str, model: TransitionModel):
+        from .recorder import run_files
+        files = sorted(run_files(task_id=task_id), key=os.path.getmtime, reverse=True)
+        for file_path in files[:self.history_runs]:
+            try:
+                model.learn(run_calls(file_path))
+            except Exception:
+                continue
+
+    def open(self, task_id: str, function_map: dict, memo=None, blocking: bool = True) -> 'SpeculationRun':
+        self._add(runs=1)
+        return SpeculationRun(self, self.model(task_id), function_map, memo, blocking)
+
+    def _add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def report(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, tasks=len(self._models))
+        stats["accuracy"] = stats["hits"] / stats["started"] if stats["started"] else 0.0
+        requested = stats["hits"] + stats["late"] + stats["unpredicted"]
+        stats["coverage"] = stats["hits"] / requested if requested else 0.0
+        return stats
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+class SpeculationRun:
+    """
+    The speculation state of one run, used as the run's memo: get answers pure calls
+    that were started ahead, put forwards to the memo behind it. blocking=False (in
+    ablind_solve) never waits for a call still running, it is counted as late instead.
+    """
+
+    def __init__(self, speculator: Speculator, model: TransitionModel, function_map: dict, memo=None, blocking: bool = True):
+        self.speculator = speculator
+        self.model = model
+        self.function_map = function_map
+        self.memo = memo
+        self.blocking = blocking
+        self.state = START
+        self.calls = []
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = {"rounds": 0, "started": 0, "hits": 0, "late": 0, "wasted": 0,
+                      "unpredicted": 0, "errors": 0, "time_saved": 0.0}
+
+    def _count(self, **counts):
+        for key, value in counts.items():
+            self.stats[key] += value
+        self.speculator._add(**counts)
+
+    def launch(self):
+        """Start the likely next pure calls, before an LLM call; unused earlier guesses are dropped"""
+        from .core import is_pure_function
+        predictions = self.model.predict(self.state, self.speculator.max_predictions, self.speculator.min_confidence)
+        wanted, started = {}, 0
+        for name, args, _ in predictions:
+            function = self.function_map.get(name)
+            if function is None or not is_pure_function(function):
+                continue
+            if self.blocking and inspect.iscoroutinefunction(function):
+                # async tools need the event loop of ablind_solve
+                continue
+            wanted[(tool_key(function), args_key(args))] = (function, args)
+        with self._lock:
+            self._count(rounds=1)
+            for key in [key for key in self._pending if key not in wanted]:
+                self._pending.pop(key).cancel()
+                self._count(wasted=1)
+            for key, (function, args) in wanted.items():
+                if key not in self._pending:
+                    self._pending[key] = self._submit(function, args)
+                    started += 1
+            self._count(started=started)
+
+    def _submit(self, function, args: dict):
+        if inspect.iscoroutinefunction(function):
+            return asyncio.ensure_future(_atimed(function, args))
+        return self.speculator._executor.submit(_timed, function, args)
+
+    def get(self, function, args: dict):
+        key = (tool_key(function), args_key(args))
+        asked = time.perf_counter()
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None and (self.blocking or pending.done()):
+                del self._pending[key]
+            else:
+                pending = None
+        if pending is None:
+            with self._lock:
+                self._count(**({"late": 1} if key in self._pending else {"unpredicted": 1}))
+            return self.memo.get(function, args) if self.memo is not None else MISSING
+        try:
+            output, start, end = pending.result()
+        except Exception:
+            output = None
+            with self._lock:
+                self._count(errors=1)
+        else:
+            if not isinstance(output, ToolFailure):
+                with self._lock:
+                    self._count(hits=1, time_saved=max(min(end, asked) - start, 0.0))
+                if self.memo is not None:
+                    self.memo.put(function, args, output)
+                return output
+        # the tool runs for real, so a failure or an exception surfaces as it would have
+        return self.memo.get(function, args) if self.memo is not None else MISSING
+
+    def put(self, function, args: dict, output):
+        if self.memo is not None:
+            self.memo.put(function, args, output)
+
+    def observe(self, name: str, args: dict):
+        """A call the run made, predictions continue from it"""
+        self.calls.append((name, args))
+        self.state = (name, args_key(args))
+
+    def close(self):
+        with self._lock:
+            for pending in self._pending.values():
+                pending.cancel()
+            self._count(wasted=len(self._pending))
+            self._pending.clear()
+        self.model.learn(self.calls)
+
+    def report(self) -> dict:
+        stats = dict(self.stats)
+        stats["accuracy"] = stats["hits"] / stats["started"] if stats["started"] else 0.0
+        return stats
+
+_default_speculator = None
+
+def get_speculator() -> Speculator:
+    """Process wide speculator, created on first use"""
+    global _default_speculator
+    if _default_speculator is None:
+        _default_speculator = Speculator()
+    return _default_speculator
+
+def configure_speculator(**kwargs) -> Speculator:
+    """Replace the process wide speculator, e.g. configure_speculator(min_confidence=0.5)"""
+    global _default_speculator
+    previous, _default_speculator = _default_speculator, Speculator(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _default_speculator
+
+def resolve_speculator(speculate):
+    """Speculator for the speculate option of solve: off by default, True for the process wide one"""
+    if speculate is True:
+        return get_speculator()
+    return speculate or None
@@ -0,0 +1,110 @@
+"""
+Upkeep of a save location's blob store
+
+migrate_runs rewrites saved runs (pickles, and optionally plain segments) to use the
+blob store; collect_garbage removes blobs that no saved run references anymore.
+Both are available as `dollarslice migrate` and `dollarslice gc`.
+"""
+
+import os
+import re
+import time
+
+from .blobstore import BLOB_DIR, get_blob_store
+from .catalog import reindex
+from .recorder import SEGMENT_ERRORS, is_pickled, open_segment, rewrite_run, run_files
+
+_BLOB_REF = re.compile(rb'"\$blob":"([0-9a-f]{64})"')
+
+def _base_dir(base_dir: str = None) -> str:
+    return base_dir or os.environ.get("DOLLAR_SLICE_SAVE_LOC",'.dollar_slice')
+
+def _uses_blobs(file_path: str) -> bool:
+    with open_segment(file_path, "rb") as f:
+        return b'"blobs":true' in f.readline()
+
+def migrate_runs(base_dir: str = None, task_id: str = None, segments: bool = False, keep_source: bool = False,
+                 compress='best', blob_threshold: int = 1024, min_age: float = 600) -> dict:
+    """
+    Rewrite .pkl runs, and with segments=True .jsonl(.gz) runs too, to use the blob
+    store. Segments modified in the last min_age seconds are skipped since they may
+    still be being written. The originals are removed unless keep_source=True.
+    """
+    base_dir = _base_dir(base_dir)
+    store = get_blob_store(base_dir)
+    blob_bytes = store.report()["bytes_written"]
+    stats = {"migrated": 0, "skipped": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0, "errors": []}
+    cutoff = time.time() - min_age
+    for file_path in list(run_files(base_dir, task_id, pickles=True)):
+        try:
+            if not is_pickled(file_path):
+                if not segments or os.path.getmtime(file_path) > cutoff or _uses_blobs(file_path):
+                    stats["skipped"] += 1
+                    continue
+            size = os.path.getsize(file_path)
+            target = rewrite_run(file_path, store, compress=compress, blob_threshold=blob_threshold)
+        except Exception as e:
+            stats["failed"] += 1
+            stats["errors"].append(f"{file_path}: {e!r}")
+            continue
+        if target != file_path and not keep_source:
+            os.remove(file_path)
+        stats["migrated"] += 1
+        stats["bytes_before"] += size
+        stats["bytes_after"] += os.path.getsize(target)
+    stats["bytes_after"] += store.report()["bytes_written"] - blob_bytes
+    if stats["migrated"]:
+        reindex(base_dir)
+    return stats
+
+def collect_garbage(base_dir: str = None, grace: float = 3600, dry_run: bool = False) -> dict:
+    """
+    Remove blobs no saved run references. Blobs written or reused in the last grace
+    seconds are kept, they may belong to runs whose lines are not written yet.
+    Refuses to remove anything when a run file cannot be read.
+    """
+    base_dir = _base_dir(base_dir)
+    referenced = set()
+    stats = {"runs": 0, "blobs": 0, "referenced": 0, "recent": 0, "removed": 0, "bytes": 0, "bytes_freed": 0}
+    for file_path in run_files(base_dir, pickles=True):
+        stats["runs"] += 1
+        if is_pickled(file_path):
+            continue
+        try:
+            with open_segment(file_path, "rb") as f:
+                for line in f:
+                    referenced.update(digest.decode() for digest in _BLOB_REF.findall(line))
+        except SEGMENT_ERRORS:
+            # a truncated tail, the references before it were read
+            pass
+        except (OSError, RuntimeError) as e:
+            raise RuntimeError(f"Cannot read {file_path} ({e}), not collecting so its blobs are kept")
+    cutoff = time.time() - grace
+    root = os.path.join(base_dir, BLOB_DIR)
+    for prefix in sorted(os.listdir(root)) if os.path.isdir(root) else []:
+        prefix_dir = os.path.join(root, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for entry in os.scandir(prefix_dir):
+            stat = entry.stat()
+            if entry.name.endswith('.tmp'):
+                # left behind by a writer that died
+                if stat.st_mtime < cutoff and not dry_run:
+                    os.remove(entry.path)
+                continue
+            stats["blobs"] += 1
+            stats["bytes"] += stat.st_size
+            if entry.name in referenced:
+                stats["referenced"] += 1
+            elif stat.st_mtime >= cutoff:
+                stats["recent"] += 1
+            else:
+                if not dry_run:
+                    os.remove(entry.path)
+                stats["removed"] += 1
+                stats["bytes_freed"] += stat.st_size
+        if not dry_run and not os.listdir(prefix_dir):
+            os.rmdir(prefix_dir)
+    if stats["removed"] and not dry_run:
+        get_blob_store(base_dir).forget()
+    return stats
@@ -0,0 +1,257 @@
+"""
+Incremental parsers for streamed LLM responses
+
+Each parser is fed the response line by line, reports every tool call to
+on_tool_call(name, arguments, id) as soon as its arguments are complete, and
+finish() assembles a body shaped like the provider's non-streaming response
+so the usual parsing applies.
+"""
+
+import json
+import time
+
+TIMINGS_KEY = '_dollarslice_timings'
+
+class StreamParser:
+    stream_fields = {"stream": True}
+
+    def __init__(self, on_tool_call=None):
+        self.on_tool_call = on_tool_call
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.first_tool_call = None
+
+    def _token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.start
+
+    def _tool_call(self, name, arguments, id):
+        if self.first_tool_call is None:
+            self.first_tool_call = time.perf_counter() - self.start
+        if self.on_tool_call is not None:
+            self.on_tool_call(name, arguments, id)
+
+    def timings(self) -> dict:
+        return {"time_to_first_token": self.first_token, "time_to_first_tool_call": self.first_tool_call}
+
+def _sse_data(line: str):
+    if not line.startswith('data:'):
+        return None
+    payload = line[5:].strip()
+    if not payload or payload == '[DONE]':
+        return None
+    return json.loads(payload)
+
+class OpenAIStreamParser(StreamParser):
+    """Server-sent chat.completion.chunk events of OpenAI-compatible APIs (OpenAI, Groq)"""
+
+    stream_fields = {"stream": True, "stream_options": {"include_usage": True}}
+
+    def __init__(self, on_tool_call=None):
+        super().__init__(on_tool_call)
+        self.content = []
+        self.tool_calls = {}
+        self.emitted = set()
+        self.usage = None
+
+    def feed_line(self, line: str):
+        chunk = _sse_data(line)
+        if chunk is None:
+            return
+        usage = chunk.get('usage') or (chunk.get('x_groq') or {}).get('usage')
+        if usage:
+            self.usage = usage
+        for choice in chunk.get('choices') or []:
+            delta = choice.get('delta') or {}
+            if delta.get('content'):
+                self._token()
+                self.content.append(delta['content'])
+            for tool_delta in delta.get('tool_calls') or []:
+                self._token()
+                index = tool_delta.get('index', 0)
+                # a delta for a later call means every earlier call's arguments are complete
+                for earlier in [i for i in self.tool_calls if i < index]:
+                    self._emit(earlier)
+                entry = self.tool_calls.setdefault(index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+                if tool_delta.get('id'):
+                    entry['id'] = tool_delta['id']
+                function = tool_delta.get('function') or {}
+                entry['function']['name'] += function.get('name') or ''
+                entry['function']['arguments'] += function.get('arguments') or ''
+            if choice.get('finish_reason'):
+                for index in list(self.tool_calls):
+                    self._emit(index)
+
+    def _emit(self, index):
+        if index in self.emitted:
+            return
+        self.emitted.add(index)
+        entry = self.tool_calls[index]
+        try:
+            arguments = json.loads(entry['function']['arguments'] or '{}')
+        except json.JSONDecodeError:
+            return
+        self._tool_call(entry['function']['name'], arguments, entry['id'])
+
+    def finish(self) -> dict:
+        for index in list(self.tool_calls):
+            self._emit(index)
+        message = {"role": "assistant", "content": ''.join(self.content) or None}
+        if self.tool_calls:
+            message["tool_calls"] = [self.tool_calls[i] for i in sorted(self.tool_calls)]
+        return {
+            "choices": [{"message": message}],
+            "usage": self.usage or {"total_tokens": 0},
+            TIMINGS_KEY: self.timings()
+        }
+
+class AnthropicStreamParser(StreamParser):
+    """Anthropic Messages API events; tool_use blocks are complete at content_block_stop"""
+
+    def __init__(self, on_tool_call=None):
+        super().__init__(on_tool_call)
+        self.blocks = {}
+        self.usage = {"input_tokens": 0, "output_tokens": 0}
+
+    def feed_line(self, line: str):
+        event = _sse_data(line)
+        if event is None:
+            return
+        kind = event.get('type')
+        if kind == 'message_start':
+            self.usage.update((event.get('message') or {}).get('usage') or {})
+        elif kind == 'content_block_start':
+            self.blocks[event['index']] = dict(event['content_block'], partial_json='')
+        elif kind == 'content_block_delta':
+            self._token()
+            block, delta = self.blocks[event['index']], event['delta']
+            if delta.get('type') == 'text_delta':
+                block['text'] = block.get('text', '') + delta['text']
+            elif delta.get('type') == 'input_json_delta':
+                block['partial_json'] += delta['partial_json']
+        elif kind == 'content_block_stop':
+            block = self.blocks[event['index']]
+            if block.get('type') == 'tool_use':
+                block['input'] = json.loads(block['partial_json']) if block['partial_json'] else block.get('input') or {}
+                self._tool_call(block['name'], block['input'], block['id'])
+        elif kind == 'message_delta':
+            self.usage.update(event.get('usage') or {})
+            self.stop_reason = (event.get('delta') or {}).get('stop_reason')
+
+    def finish(self) -> dict:
+        content = []
+        for index in sorted(self.blocks):
+            block = {k: v for k, v in self.blocks[index].items() if k != 'partial_json'}
+            content.append(block)
+        usage = dict(self.usage)
+        return {
+            "type": "message",
+            "role": "assistant",
+            "content": content,
+            "stop_reason": getattr(self, 'stop_reason', None),
+            "usage": usage,
+            TIMINGS_KEY: self.timings()
+        }
+
+class OllamaChatStreamParser(StreamParser):
+    """Newline-delimited /api/chat chunks; Ollama sends each native tool call whole"""
+
+    def __init__(self, on_tool_call=None):
+        super().__init__(on_tool_call)
+        self.content = []
+        self.tool_calls = []
+        self.final = {}
+
+    def feed_line(self, line: str):
+        if not line.strip():
+            return
+        chunk = json.loads(line)
+        message = chunk.get('message') or {}
+        if message.get('content'):
+            self._token()
+            self.content.append(message['content'])
+        for tool_call in message.get('tool_calls') or []:
+            self._token()
+            function = tool_call['function']
+            arguments = function.get('arguments') or {}
+            if isinstance(arguments, str):
+                arguments = json.loads(arguments)
+            self.tool_calls.append(tool_call)
+            self._tool_call(function['name'], arguments, tool_call.get('id') or f"call_{len(self.tool_calls) - 1}")
+        if chunk.get('done'):
+            self.final = chunk
+
+    def finish(self) -> dict:
+        body = {k: v for k, v in self.final.items() if k != 'message'}
+        body['message'] = {"role": "assistant", "content": ''.join(self.content)}
+        if self.tool_calls:
+            body['message']['tool_calls'] = self.tool_calls
+        body[TIMINGS_KEY] = self.timings()
+        return body
+
+class OllamaStreamParser(StreamParser):
+    """
+    Newline-delimited /api/generate chunks. The raw prompt asks for a single JSON
+    object, which counts as the tool call once its outer braces close.
+    """
+
+    def __init__(self, on_tool_call=None):
+        super().__init__(on_tool_call)
+        self.text = []
+        self.final = {}
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object = None
+        self._done_object = False
+
+    def feed_line(self, line: str):
+        if not line.strip():
+            return
+        chunk = json.loads(line)
+        piece = chunk.get('response', '')
+        if piece:
+            self._token()
+            self.text.append(piece)
+            self._scan(piece)
+        if chunk.get('done'):
+            self.final = chunk
+
+    def _scan(self, piece: str):
+        for char in piece:
+            if self._done_object:
+                return
+            if self._object is None:
+                if char != '{':
+                    continue
+                self._object = []
+            self._object.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._done_object = True
+                    self._emit(''.join(self._object))
+
+    def _emit(self, text: str):
+        try:
+            call = json.loads(text)
+            self._tool_call(call['name'], call['arguments'], 'ollama_call')
+        except (json.JSONDecodeError, KeyError, TypeError):
+            pass
+
+    def finish(self) -> dict:
+        body = {k: v for k, v in self.final.items() if k != 'response'}
+        body['response'] = ''.join(self.text)
+        body[TIMINGS_KEY] = self.timings()
+        return body
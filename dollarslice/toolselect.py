@@ -0,0 +1,228 @@
+"""
+Tool selection: offers the model only the tools relevant to each round
+
+solve(..., tool_selector=ToolSelector(top_k=16)) puts a stage in front of each LLM
+call that ranks the run's tools against the task and the latest messages and tool
+outputs, with BM25 over their names, parameter names and docstrings (as
+describe_function sees them). Only the top_k best are sent, together with:
+
+- the final_answer tools, and tools in `always`
+- every tool the model already called in the run
+- the find_tools tool, through which the model searches the whole set; the tools it
+  finds are offered from the next round on
+
+Every tool can still be called, being left out only means its schema is not sent.
+Each round's metrics get tools_offered and tool_tokens_saved, the estimated schema
+tokens of the tools left out. A tool set that changes between rounds is a different
+prompt prefix, so provider side prompt caching of the tool list hits less often.
+"""
+
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from .context import estimate_tokens
+from .utils import schema_of
+
+_STOPWORDS = frozenset("""a an and are as at be by for from has have how i if in into is it its of on or
+that the this to was what when where which who will with you your""".split())
+_MAX_MESSAGE_CHARS = 2000
+_MAX_INDEXES = 16
+
+def terms(text: str) -> list:
+    """Lowercase words of text, splitting snake_case and camelCase, without stopwords"""
+    words = re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+', text)
+    found = []
+    for word in words:
+        word = word.lower()
+        if len(word) < 2 or word in _STOPWORDS:
+            continue
+        # plural and singular are the same term
+        found.append(word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word)
+    return found
+
+class ToolIndex:
+    """BM25 index of a tool set; name terms count name_weight times"""
+
+    def __init__(self, functions: list, name_weight: int = 3, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.lengths = []
+        self.tokens = []
+        for index, function in enumerate(functions):
+            schema = schema_of(function)
+            name, params, _, docstring = schema.description
+            document = Counter(terms(name) * name_weight + terms(" ".join(params)) + terms(docstring))
+            for term, count in document.items():
+                self.postings.setdefault(term, []).append((index, count))
+            self.lengths.append(sum(document.values()))
+            self.tokens.append(estimate_tokens(json.dumps(schema.tool_json)))
+        self.average_length = (sum(self.lengths) / len(self.lengths) if self.lengths else 0.0) or 1.0
+
+    def scores(self, query: list) -> list:
+        scores = [0.0] * len(self.lengths)
+        size = len(self.lengths)
+        for term, weight in Counter(query).items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (size - len(postings) + 0.5) / (len(postings) + 0.5))
+            # a term the query repeats matters more, but not linearly
+            idf *= 1 + math.log(weight)
+            for index, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / self.average_length)
+                scores[index] += idf * count * (self.k1 + 1) / (count + norm)
+        return scores
+
+    def rank(self, query: list) -> list:
+        """Tool positions, best first; ties keep the tools' order"""
+        scores = self.scores(query)
+        return sorted(range(len(scores)), key=lambda index: -scores[index])
+
+def _message_text(message: dict) -> str:
+    content = message.get('content')
+    parts = [content if isinstance(content, str) else json.dumps(content) if content is not None else '']
+    for tool_call in message.get('tool_calls') or []:
+        function = tool_call.get('function', tool_call)
+        parts += [str(function.get('name', '')), str(function.get('arguments', ''))]
+    return " ".join(parts)[:_MAX_MESSAGE_CHARS]
+
+class ToolSelector:
+    """
+    top_k: tools chosen by relevance each round, on top of the ones always offered.
+    history: latest messages (and the previous round's tool outputs) that join the
+    task in the query.
+    always: names of tools offered every round.
+    expand_k: tools find_tools returns per search.
+    Tool sets of at most top_k tools are sent whole. One ToolSelector can be shared
+    by many solves, each gets its own ToolSelection; indexes are kept per tool set.
+    """
+
+    def __init__(self, top_k: int = 16, history: int = 4, always: tuple = (), expand_k: int = 8):
+        self.top_k = top_k
+        self.history = history
+        self.always = frozenset(always)
+        self.expand_k = expand_k
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"runs": 0, "rounds": 0, "tools_offered": 0, "tools_total": 0, "tokens_sent": 0,
+                      "tokens_saved": 0, "searches": 0, "expanded": 0, "unoffered_calls": 0}
+
+    def index(self, functions: list) -> ToolIndex:
+        key = tuple(schema_of(function).id for function in functions)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+                return index
+        index = ToolIndex(functions)
+        with self._lock:
+            self._indexes[key] = index
+            while len(self._indexes) > _MAX_INDEXES:
+                self._indexes.popitem(last=False)
+        return index
+
+    def open(self, functions: list, pinned: list = ()) -> 'ToolSelection':
+        self._add(runs=1)
+        return ToolSelection(self, functions, pinned)
+
+    def _add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+
+    def report(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+class ToolSelection:
+    """The tool selection state of one run"""
+
+    def __init__(self, selector: ToolSelector, functions: list, pinned: list = ()):
+        from .core import is_final_answer_function
+        self.selector = selector
+        pinned = list(pinned)
+        self.all_functions = list(functions)
+        self.pinned = [f for f in functions if is_final_answer_function(f) or f.__name__ in selector.always or f in pinned]
+        self.candidates = [f for f in functions if f not in self.pinned]
+        self.position = {function.__name__: index for index, function in enumerate(self.candidates)}
+        self.active = len(self.candidates) > selector.top_k
+        self.index = selector.index(self.candidates) if self.active else None
+        self.used = set()
+        self.expanded = set()
+        self.offered = {f.__name__ for f in functions}
+        self._round = None
+        self.stats = {"rounds": 0, "tools_offered": 0, "tools_total": 0, "tokens_sent": 0,
+                      "tokens_saved": 0, "searches": 0, "expanded": 0, "unoffered_calls": 0}
+        self.find_tools = self._make_find_tool()
+        self.tools = [self.find_tools] if self.active else []
+
+    def _count(self, **counts):
+        for key, value in counts.items():
+            self.stats[key] += value
+        self.selector._add(**counts)
+
+    def _make_find_tool(self):
+        selection = self
+        def find_tools(query: str) -> str:
+            '''Search all available tools by what they do, not only the ones offered now. The tools found can be called from the next step on'''
+            names = [function.__name__ for function in selection.search(query)]
+            new = [name for name in names if name not in selection.expanded]
+            selection.expanded.update(names)
+            selection._count(searches=1, expanded=len(new))
+            if not names:
+                return f"No tools match {query!r}"
+            return "\n".join(schema_of(selection.candidates[selection.position[name]]).one_liner for name in names)
+        return find_tools
+
+    def search(self, query: str) -> list:
+        if not self.active:
+            return []
+        found = terms(query)
+        scores = self.index.scores(found)
+        ranked = [index for index in self.index.rank(found) if scores[index] > 0]
+        return [self.candidates[index] for index in ranked[:self.selector.expand_k]]
+
+    def query(self, messages: list, function_results: list) -> list:
+        """Terms of the task and of the latest messages and tool outputs"""
+        history = self.selector.history
+        texts = [_message_text(messages[0])] if messages else []
+        texts += [_message_text(message) for message in messages[1:][-history:]] if history else []
+        texts += [f"{result['name']} {str(result['output'])[:_MAX_MESSAGE_CHARS]}" for result in function_results[-history:]]
+        return terms(" ".join(texts))
+
+    def functions(self, messages: list, function_results: list) -> list:
+        """The tools to offer this round, in the order they were given"""
+        if not self.active:
+            self._round = None
+            return self.all_functions
+        chosen = set(self.index.rank(self.query(messages, function_results))[:self.selector.top_k])
+        offered, tokens_sent, tokens_saved = [], 0, 0
+        for index, function in enumerate(self.candidates):
+            if index in chosen or function.__name__ in self.used or function.__name__ in self.expanded:
+                offered.append(function)
+                tokens_sent += self.index.tokens[index]
+            else:
+                tokens_saved += self.index.tokens[index]
+        offered += self.pinned + self.tools
+        self.offered = {function.__name__ for function in offered}
+        self._round = (len(offered), tokens_saved)
+        self._count(rounds=1, tools_offered=len(offered), tools_total=len(self.candidates) + len(self.pinned) + len(self.tools),
+                    tokens_sent=tokens_sent, tokens_saved=tokens_saved)
+        return offered
+
+    def annotate(self, metrics: dict):
+        if self._round is not None and metrics is not None:
+            metrics["tools_offered"], metrics["tool_tokens_saved"] = self._round
+
+    def observe(self, name: str):
+        """A call the run made; its tool stays offered"""
+        if name not in self.offered:
+            self._count(unoffered_calls=1)
+        self.used.add(name)
+
+    def report(self) -> dict:
+        return dict(self.stats)
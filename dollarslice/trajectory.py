@@ -0,0 +1,98 @@
+"""
+Append-only message recording for solve steps
+"""
+
+import copy
+
+class MessageLog:
+    """Messages of one run, only ever appended to"""
+
+    def __init__(self):
+        self.messages = []
+
+class MessageSlice:
+    """
+    The messages one LLM step added, as a range of a shared MessageLog.
+    Earlier messages are shared with the previous steps instead of copied.
+    """
+
+    __slots__ = ('log', 'start', 'end')
+
+    def __init__(self, log: MessageLog, start: int, end: int):
+        self.log = log
+        self.start = start
+        self.end = end
+
+    def __getstate__(self):
+        return self.log, self.start, self.end
+
+    def __setstate__(self, state):
+        self.log, self.start, self.end = state
+
+    def added(self) -> list:
+        return self.log.messages[self.start:self.end]
+
+    def conversation(self) -> list:
+        """Full conversation as it was at this step"""
+        return self.log.messages[:self.end]
+
+class Trajectory:
+    """Records each LLM round's conversation into one MessageLog per run"""
+
+    def __init__(self):
+        self.log = MessageLog()
+        self._sources = []
+
+    def _rewritten(self, messages) -> bool:
+        known = len(self._sources)
+        if not known:
+            return False
+        return len(messages) < known or messages[0] is not self._sources[0] or messages[known-1] is not self._sources[-1]
+
+    def record(self, messages: list) -> MessageSlice:
+        """
+        Append the messages not seen yet. If the adapter returned a history that does
+        not extend the recorded one, a fresh log is started from the whole history.
+        """
+        if self._rewritten(messages):
+            self.log = MessageLog()
+            self._sources = []
+        known = len(self._sources)
+        start = len(self.log.messages)
+        for message in messages[known:]:
+            self._sources.append(message)
+            self.log.messages.append(copy.deepcopy(message))
+        return MessageSlice(self.log, start, len(self.log.messages))
+
+def steps_duration(steps: list) -> float:
+    """Wall time of recorded steps, from the first step start to the last step end"""
+    starts, ends = [], []
+    for step in steps:
+        trace = step[3][2] if step[0] == 'llm' else step[4]
+        if trace and 'start_time' in trace and 'end_time' in trace:
+            starts.append(trace['start_time'])
+            ends.append(trace['end_time'])
+    if not starts:
+        return 0.0
+    return (max(ends) - min(starts)).total_seconds()
+
+def steps_start(steps: list):
+    """Start time of the first timed step, or None"""
+    for step in steps:
+        trace = step[3][2] if step[0] == 'llm' else step[4]
+        if trace and 'start_time' in trace:
+            return trace['start_time']
+    return None
+
+def steps_tokens(steps: list) -> int:
+    return sum(step[3][2].get("total_tokens", 0) for step in steps if step[0] == 'llm')
+
+def step_messages(recorded) -> list:
+    """Full conversation of an LLM step, for both MessageSlices and older full copies"""
+    return recorded.conversation() if isinstance(recorded, MessageSlice) else recorded
+
+def step_added_messages(recorded, previous=None) -> list:
+    """Messages an LLM step added; for older full copies, relative to the previous LLM step's copy"""
+    if isinstance(recorded, MessageSlice):
+        return recorded.added()
+    return recorded[len(previous):] if previous is not None and len(previous) <= len(recorded) else recorded
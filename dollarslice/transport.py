@@ -0,0 +1,145 @@
+"""
+Long-lived, pooled HTTP transport shared by all LLM providers
+"""
+
+import asyncio
+import atexit
+import threading
+import weakref
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class Transport:
+    """
+    Holds one keep-alive httpx.Client per origin (scheme, host, port), so repeated
+    calls to the same provider reuse TCP/TLS connections. Safe to share across threads.
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0, timeout: float = 30.0, http2: bool = None):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def origin(url: str) -> tuple:
+        parsed = httpx.URL(url)
+        return parsed.scheme, parsed.host, parsed.port
+
+    def client(self, url: str) -> httpx.Client:
+        key = self.origin(url)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Transport is closed")
+            client = self._clients.get(key)
+            if client is None:
+                client = httpx.Client(limits=self.limits, timeout=self.timeout, http2=self.http2)
+                self._clients[key] = client
+            return client
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.client(url).post(url, **kwargs)
+
+    def stream(self, url: str, **kwargs):
+        """Context manager for a POST whose response body is read incrementally"""
+        return self.client(url).stream("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+class AsyncTransport(Transport):
+    """
+    httpx.AsyncClient counterpart of Transport. Its clients belong to the event loop
+    they were first used on, close it with aclose() before that loop ends.
+    """
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        key = self.origin(url)
+        client = self._clients.get(key)
+        if client is None:
+            if self._closed:
+                raise RuntimeError("Transport is closed")
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, http2=self.http2)
+            self._clients[key] = client
+        return client
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client(url).post(url, **kwargs)
+
+    def stream(self, url: str, **kwargs):
+        """Async context manager for a POST whose response body is read incrementally"""
+        return self.client(url).stream("POST", url, **kwargs)
+
+    async def aclose(self):
+        self._closed = True
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def close(self):
+        raise TypeError("AsyncTransport must be closed with 'await transport.aclose()'")
+
+_default_transport = None
+_async_transports = weakref.WeakKeyDictionary()
+_default_lock = threading.Lock()
+
+def get_transport() -> Transport:
+    """Process wide transport, created on first use"""
+    global _default_transport
+    if _default_transport is None:
+        with _default_lock:
+            if _default_transport is None:
+                _default_transport = Transport()
+    return _default_transport
+
+def get_async_transport() -> AsyncTransport:
+    """Transport shared by everything running on the current event loop"""
+    loop = asyncio.get_running_loop()
+    transport = _async_transports.get(loop)
+    if transport is None:
+        transport = _async_transports[loop] = AsyncTransport()
+    return transport
+
+async def close_async_transport():
+    """Close the current event loop's shared transport"""
+    transport = _async_transports.pop(asyncio.get_running_loop(), None)
+    if transport is not None:
+        await transport.aclose()
+
+def configure_transport(**kwargs) -> Transport:
+    """Replace the process wide transport with one using the given pool settings"""
+    global _default_transport
+    with _default_lock:
+        previous, _default_transport = _default_transport, Transport(**kwargs)
+    if previous is not None:
+        previous.close()
+    return _default_transport
+
+def close_transport():
+    global _default_transport
+    with _default_lock:
+        previous, _default_transport = _default_transport, None
+    if previous is not None:
+        previous.close()
+
+atexit.register(close_transport)
@@ -1,5 +1,9 @@
+import hashlib
 import inspect
-from typing import get_type_hints
+import threading
+import weakref
+from collections import OrderedDict
+from typing import get_type_hints, NamedTuple, Any
 
 def describe_function(fn):
     sig = inspect.signature(fn)
@@ -40,12 +44,79 @@ def format_for_openai_tool(description_tuple):
         }
     }
 
+class ToolSchema(NamedTuple):
+    id: str
+    description: tuple
+    tool_json: dict
+    one_liner: str
+    fingerprint: Any
+
+_schemas = weakref.WeakKeyDictionary()
+# most recently compiled or looked up descriptions; live functions are found in _schemas
+_schemas_by_id = OrderedDict()
+_schemas_lock = threading.Lock()
+_MAX_SCHEMA_IDS = 4096
+
+def _fingerprint(fn):
+    annotations = getattr(fn, '__annotations__', None) or {}
+    return (getattr(fn, '__code__', None), fn.__name__, fn.__doc__, getattr(fn, '__defaults__', None),
+            getattr(fn, '__kwdefaults__', None), tuple(annotations.items()))
+
+def _compile_schema(fn, fingerprint) -> ToolSchema:
+    description = describe_function(fn)
+    name, params, _, docstring = description
+    schema_id = hashlib.sha1(repr(description).encode()).hexdigest()[:16]
+    return ToolSchema(schema_id, description, format_for_openai_tool(description), name+str(params)+' -> '+docstring, fingerprint)
+
+def schema_of(fn) -> ToolSchema:
+    """
+    Precompiled description, OpenAI tool JSON and one-liner of a function. Compiled
+    once per function object and recompiled when its code, name, docstring,
+    defaults or annotations change.
+    """
+    fingerprint = _fingerprint(fn)
+    try:
+        schema = _schemas.get(fn)
+    except TypeError:
+        schema = None
+    if schema is not None and schema.fingerprint == fingerprint:
+        return schema
+    schema = _compile_schema(fn, fingerprint)
+    with _schemas_lock:
+        _remember_id(schema)
+        try:
+            _schemas[fn] = schema
+        except TypeError:
+            pass
+    return schema
+
+def _remember_id(schema: ToolSchema):
+    _schemas_by_id[schema.id] = schema.description
+    _schemas_by_id.move_to_end(schema.id)
+    while len(_schemas_by_id) > _MAX_SCHEMA_IDS:
+        _schemas_by_id.popitem(last=False)
+
+def schema_by_id(schema_id: str) -> tuple:
+    """
+    describe_function tuple of a schema compiled in this process. KeyError once the
+    id has aged out and no live function has that schema.
+    """
+    with _schemas_lock:
+        description = _schemas_by_id.get(schema_id)
+        if description is not None:
+            _schemas_by_id.move_to_end(schema_id)
+            return description
+        for schema in list(_schemas.values()):
+            if schema.id == schema_id:
+                _remember_id(schema)
+                return schema.description
+    raise KeyError(schema_id)
+
 def func_to_tool_json(x):
-    return format_for_openai_tool(describe_function(x))
+    return schema_of(x).tool_json
 
 def func_to_one_liner(x):
-    name, params, _, docstring = describe_function(x)
-    return name+str(params)+' -> '+docstring
+    return schema_of(x).one_liner
 
 def func_map(x):
     return x.__name__,x
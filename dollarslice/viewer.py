@@ -0,0 +1,109 @@
+"""
+Lazy, random access to the steps of a saved run
+"""
+
+import pickle
+
+from .recorder import SEGMENT_ERRORS, decode_line, is_pickled, open_segment
+from .trajectory import MessageSlice, step_added_messages
+
+_TYPE_PREFIX = b'{"type":"'
+
+def _record_kind(line: bytes):
+    if not line.startswith(_TYPE_PREFIX):
+        return None
+    end = line.find(b'"', len(_TYPE_PREFIX))
+    return line[len(_TYPE_PREFIX):end].decode() if end > 0 else None
+
+def _skip_to(f, offset: int):
+    if f.seekable():
+        f.seek(offset)
+        return
+    # zstd segments can only be read forward
+    while offset > 0:
+        chunk = f.read(min(offset, 1 << 20))
+        if not chunk:
+            return
+        offset -= len(chunk)
+
+class RunView:
+    """
+    Opens a saved run by scanning it once for the header, schemas, footer and the
+    byte offset of every step; step bodies are only decoded by step(i). LLM steps
+    come back with just the messages they added. Pickled runs cannot be read
+    partially and are loaded whole, only with allow_pickle (see read_run).
+    """
+
+    def __init__(self, file_path: str, allow_pickle: bool = False):
+        self.path = file_path
+        self.header = {}
+        self.footer = None
+        self.schemas = {}
+        self._offsets = []
+        self._steps = None
+        if is_pickled(file_path):
+            if not allow_pickle:
+                raise ValueError(f"{file_path} is a pickled run, convert it with `dollarslice migrate` to read it")
+            self._load_pickle()
+        else:
+            self._scan()
+
+    def _open(self):
+        return open_segment(self.path, "rb")
+
+    def _scan(self):
+        with self._open() as f:
+            offset = 0
+            try:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    kind = _record_kind(line)
+                    if kind == "header":
+                        self.header = decode_line(line, self.path)
+                    elif kind == "schema":
+                        record = decode_line(line, self.path)
+                        self.schemas[record["id"]] = record["description"]
+                    elif kind == "footer":
+                        self.footer = decode_line(line, self.path)
+                    else:
+                        self._offsets.append((offset, len(line)))
+                    offset += len(line)
+            except SEGMENT_ERRORS:
+                pass
+
+    def _load_pickle(self):
+        with open(self.path, "rb") as f:
+            data = pickle.load(f)
+        self.schemas = data.pop("schemas", {})
+        self._steps = data.pop("steps")
+        self.header = data
+        self.footer = {"answer_generated": data.get("answer_generated"), "steps": len(self._steps)}
+
+    @property
+    def complete(self) -> bool:
+        return self.footer is not None
+
+    def __len__(self):
+        return len(self._steps) if self._steps is not None else len(self._offsets)
+
+    def step(self, index: int) -> tuple:
+        if self._steps is not None:
+            return self._pickled_step(index)
+        offset, length = self._offsets[index]
+        with self._open() as f:
+            _skip_to(f, offset)
+            record = decode_line(f.read(length), self.path)
+        kind = record["type"]
+        if kind == "llm":
+            return ('llm', record["messages"], record["schemas"], record["trace"])
+        if kind == "function":
+            return ('function', record["name"], record["args"], record["output"], record["trace"])
+        return record.get("step")
+
+    def _pickled_step(self, index: int) -> tuple:
+        step = self._steps[index]
+        if step[0] != 'llm' or isinstance(step[1], MessageSlice):
+            return step if step[0] != 'llm' else ('llm', step[1].added()) + tuple(step[2:])
+        previous = next((s[1] for s in reversed(self._steps[:index]) if s[0] == 'llm'), None)
+        return ('llm', step_added_messages(step[1], previous)) + tuple(step[2:])
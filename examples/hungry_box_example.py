@@ -1,4 +1,4 @@
-from dollarslice import solve, final_answer, create_simple_llm
+from dollarslice import solve, final_answer, concurrent_safe, create_simple_llm
 from glob import glob
 import os
 
@@ -6,6 +6,7 @@ def get_boxes() -> list[str]:
     '''Get all potential boxes'''
     return ['box1', 'box2', 'box3']
 
+@concurrent_safe
 def check_box(box : str) -> str:
     '''Check contents of the box'''
     boxes = {
@@ -26,7 +27,8 @@ result,_ = solve(
     inputs={"feeling":"hungry"},
     functions=[get_boxes,check_box,answer_box],
     llm_call=create_simple_llm(),
-    save=True
+    save=True,
+    parallel_tools=4
 )
 
 print(result)
\ No newline at end of file
@@ -12,6 +12,10 @@ setup(
         "httpx",
         "python-dotenv",
     ],
+    extras_require={
+        "http2": ["httpx[http2]"],
+        "zstd": ["zstandard"],
+    },
     entry_points={
         "console_scripts": [
             "dollarslice=dollarslice.__main__:main",
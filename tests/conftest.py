@@ -0,0 +1,93 @@
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+
+from dollarslice.transport import AsyncTransport, Transport
+
+
+@pytest.fixture(autouse=True)
+def save_location(tmp_path, monkeypatch):
+    """Runs, caches and blobs of each test go to its own directory"""
+    location = tmp_path / "dollar_slice"
+    monkeypatch.setenv("DOLLAR_SLICE_SAVE_LOC", str(location))
+    return location
+
+
+class ScriptedLLM:
+    """
+    An llm_call that asks for the tool calls of script, one list of (name, args) per
+    round (the last one repeating), appending tool results like the real adapters
+    """
+
+    def __init__(self, script: list):
+        self.script = script
+        self.calls = 0
+
+    def __call__(self, messages, functions, function_results, **kwargs):
+        start = datetime.now()
+        for result in function_results:
+            messages.append({"tool_call_id": result["id"], "role": "tool", "name": result["name"], "content": str(result["output"])})
+        round_calls = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        ids = [f"call{self.calls}_{index}" for index in range(len(round_calls))]
+        messages.append({"role": "assistant", "content": None, "tool_calls": [
+            {"id": id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+            for id, (name, args) in zip(ids, round_calls)]})
+        metrics = {"total_tokens": 10, "start_time": start, "end_time": datetime.now()}
+        return messages, [(name, args, id) for id, (name, args) in zip(ids, round_calls)], metrics
+
+
+@pytest.fixture
+def scripted_llm():
+    return ScriptedLLM
+
+
+class MockTransport(Transport):
+    """Transport whose clients answer every request with handler(request)"""
+
+    def __init__(self, handler, **kwargs):
+        super().__init__(**kwargs)
+        self.handler = handler
+        self.requests = []
+
+    def _record(self, request):
+        self.requests.append(request)
+        return self.handler(request)
+
+    def client(self, url: str) -> httpx.Client:
+        key = self.origin(url)
+        if key not in self._clients:
+            self._clients[key] = httpx.Client(transport=httpx.MockTransport(self._record))
+        return self._clients[key]
+
+
+class AsyncMockTransport(MockTransport, AsyncTransport):
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        key = self.origin(url)
+        if key not in self._clients:
+            self._clients[key] = httpx.AsyncClient(transport=httpx.MockTransport(self._record))
+        return self._clients[key]
+
+
+@pytest.fixture
+def mock_transport():
+    return MockTransport
+
+
+@pytest.fixture
+def async_mock_transport():
+    return AsyncMockTransport
+
+
+@pytest.fixture
+def provider_keys(monkeypatch):
+    """Only the API keys passed to the returned function are set"""
+    def use(**keys):
+        for name in ("OPENAI_API_KEY", "GROQ_API_KEY", "ANTHROPIC_API_KEY"):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in keys.items():
+            monkeypatch.setenv(name, value)
+    return use
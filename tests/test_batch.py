@@ -0,0 +1,56 @@
+import asyncio
+
+from dollarslice import ratelimit
+from dollarslice.batch import BatchStats, asolve_many, solve_many
+from dollarslice.core import final_answer
+
+INPUTS = [{"value": str(value)} for value in range(6)]
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+def test_queue_depth_is_the_inputs_not_submitted_yet(scripted_llm, monkeypatch):
+    # requests of other solves waiting on a limiter are reported apart
+    monkeypatch.setattr(ratelimit.rate_limits, "waiting", lambda: 5)
+    stats = BatchStats()
+    seen = []
+
+    def llm(**kwargs):
+        seen.append(stats.report())
+        return scripted_llm([[("answer", {"result": "ok"})]])(**kwargs)
+    results = list(solve_many("batch", "Echo {value}", INPUTS, [answer], llm, concurrency=2, stats=stats))
+    assert sorted(result["index"] for result in results) == list(range(6))
+    assert all(result["result"] == "ok" and result["error"] is None for result in results)
+    # the first runs start with the rest of the inputs waiting
+    assert seen[0]["queue_depth"] >= 4
+    assert {report["queue_depth"] for report in seen} <= {5, 4, 3, 2, 1, 0}
+    assert all(report["in_flight"] <= 2 and report["limiter_waiting"] == 5 for report in seen)
+    report = stats.report()
+    assert (report["completed"], report["failed"], report["queue_depth"], report["limiter_waiting"]) == (6, 0, 0, 5)
+
+
+def test_inputs_without_len_have_no_queue_depth(scripted_llm):
+    stats = BatchStats()
+    inputs = (dict(item) for item in INPUTS)
+    results = list(solve_many("batch", "Echo {value}", inputs, [answer], scripted_llm([[("answer", {"result": "ok"})]]),
+                              concurrency=2, stats=stats))
+    assert len(results) == 6 and stats.report()["queue_depth"] is None
+
+
+def test_asolve_many_reports_its_backlog(scripted_llm):
+    stats = BatchStats()
+    depths = []
+
+    async def llm(**kwargs):
+        depths.append(stats.report()["queue_depth"])
+        return scripted_llm([[("answer", {"result": "ok"})]])(**kwargs)
+
+    async def run():
+        return [result async for result in asolve_many("batch", "Echo {value}", INPUTS, [answer], llm, concurrency=2, stats=stats)]
+    results = asyncio.run(run())
+    assert len(results) == 6 and stats.report()["queue_depth"] == 0
+    assert depths[0] >= 4 and stats.submitted == stats.started == 6
@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+import time
+
+from dollarslice.cache import ResponseCache, cache_bypass, request_key
+
+
+def response(text: str) -> dict:
+    return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+
+def disk_rows(path) -> list:
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+    finally:
+        connection.close()
+
+
+def test_request_key_ignores_dict_order():
+    first = request_key("https://x/v1", {"model": "m", "messages": [{"role": "user", "content": "hi"}]})
+    second = request_key("https://x/v1", {"messages": [{"content": "hi", "role": "user"}], "model": "m"})
+    assert first == second
+    assert first != request_key("https://y/v1", {"model": "m", "messages": [{"role": "user", "content": "hi"}]})
+
+
+def test_memory_hit():
+    cache = ResponseCache(disk_path=None)
+    assert cache.get("a") is None
+    cache.put("a", response("one"))
+    assert cache.get("a") == (response("one"), 'memory')
+    report = cache.report()
+    assert (report["memory_hits"], report["misses"], report["stores"]) == (1, 1, 1)
+    assert report["hit_rate"] == 0.5
+
+
+def test_disk_hit_from_another_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(disk_path=path).put("a", response("one"))
+    cache = ResponseCache(disk_path=path)
+    assert cache.get("a") == (response("one"), 'disk')
+    assert cache.get("a") == (response("one"), 'memory')
+    assert cache.report()["disk_hits"] == 1
+
+
+def test_connection_is_reused(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.sqlite3"))
+    cache.put("a", response("one"))
+    connection = cache._connection
+    cache.put("b", response("two"))
+    cache._memory.clear()
+    assert cache.get("a")[1] == 'disk'
+    assert cache._connection is connection
+    cache.close()
+    assert cache._connection is None
+    assert cache.get("b")[1] == 'disk'
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.sqlite3"), ttl=60)
+    cache.put("a", response("one"))
+    cache._memory.clear()
+    connection = sqlite3.connect(cache.disk_path)
+    connection.execute("UPDATE responses SET created = ?", (time.time() - 3600,))
+    connection.commit()
+    connection.close()
+    assert cache.get("a") is None
+    assert disk_rows(cache.disk_path) == []
+    assert cache._disk_bytes == 0
+
+
+def test_memory_lru_eviction():
+    cache = ResponseCache(max_entries=2, disk_path=None)
+    for key in "abc":
+        cache.put(key, response(key))
+    assert cache.get("a") is None
+    assert cache.get("c")[1] == 'memory'
+    assert cache.report()["evictions"] == 1
+
+
+def test_disk_eviction_keeps_a_running_total(tmp_path):
+    body_size = len('{"choices":[{"message":{"role":"assistant","content":"x"}}]}')
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.sqlite3"), max_disk_bytes=3 * body_size)
+    for key in "abcd":
+        cache.put(key, response("x"))
+        time.sleep(0.01)
+    assert [key for key, _ in disk_rows(cache.disk_path)] == ["b", "c", "d"]
+    assert cache._disk_bytes == 3 * body_size
+    cache.put("d", response("x"))
+    assert cache._disk_bytes == 3 * body_size
+    assert cache.report()["evictions"] == 1
+    cache.clear()
+    assert cache._disk_bytes == 0 and disk_rows(cache.disk_path) == []
+
+
+def test_threads_share_the_disk_tier(tmp_path):
+    cache = ResponseCache(disk_path=str(tmp_path / "cache.sqlite3"), max_entries=1)
+    def work(number: int):
+        for index in range(20):
+            key = f"{number}-{index}"
+            cache.put(key, response(key))
+            assert cache.get(key)[0] == response(key)
+    threads = [threading.Thread(target=work, args=(number,)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(disk_rows(cache.disk_path)) == 80
+    assert cache._disk_bytes == sum(size for _, size in disk_rows(cache.disk_path))
+
+
+def test_cache_bypass_skips_lookups_but_stores():
+    cache = ResponseCache(disk_path=None)
+    cache.put("a", response("one"))
+    with cache_bypass():
+        assert cache.get("a") is None
+        cache.put("b", response("two"))
+    assert cache.get("b") == (response("two"), 'memory')
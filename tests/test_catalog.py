@@ -0,0 +1,79 @@
+import os
+import pickle
+import time
+
+import pytest
+
+from dollarslice import catalog
+from dollarslice.catalog import catalog_path, close_connections, query_runs, reindex, task_ids
+from dollarslice.core import final_answer, run_solve
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+def note(text: str) -> str:
+    '''Write a note'''
+    return text
+
+
+def solve(scripted_llm, task_id: str, answered: bool = True):
+    script = [[("answer", {"result": "done"})]] if answered else [[("note", {"text": "hm"})]]
+    return run_solve(task_id, "Do it", {}, [note, answer], scripted_llm(script), save=True, call_limit=2)
+
+
+def test_filters_order_and_pages(scripted_llm):
+    for task_id, answered in (("alpha", True), ("alpha", False), ("beta", True)):
+        solve(scripted_llm, task_id, answered)
+    assert task_ids() == [("alpha", 2), ("beta", 1)]
+    assert len(query_runs(task_id="alpha")) == 2
+    assert [row["task_id"] for row in query_runs(success=False)] == ["alpha"]
+    assert len(query_runs(success=True)) == 2
+    assert query_runs(since=time.time() + 60) == []
+    rows = query_runs(order_by='step_count', descending=False)
+    assert [row["step_count"] for row in rows] == sorted(row["step_count"] for row in rows)
+    assert len(query_runs(limit=2)) == 2 and len(query_runs(limit=2, offset=2)) == 1
+
+
+def test_reindex_picks_up_changes(scripted_llm, save_location):
+    solve(scripted_llm, "alpha")
+    solve(scripted_llm, "alpha")
+    assert reindex() == {"indexed": 0, "unchanged": 2, "removed": 0, "unreadable": 0, "pickled": 0}
+    row = query_runs()[0]
+    os.remove(os.path.join(save_location, "alpha", row["file"]))
+    assert reindex()["removed"] == 1
+    assert reindex(full=True)["indexed"] == 1
+
+
+def test_reindex_does_not_unpickle_runs(scripted_llm, monkeypatch):
+    run_solve("alpha", "Do it", {}, [note, answer], scripted_llm([[("answer", {"result": "done"})]]),
+              save=True, save_format="pickle")
+    monkeypatch.setattr(pickle, "load", lambda f: pytest.fail("unpickled during reindex"))
+    assert reindex(full=True)["pickled"] == 1
+    assert task_ids() == [("alpha", 1)]
+
+
+def test_runs_saved_before_the_catalog_are_indexed_after_an_upgrade(scripted_llm, save_location):
+    solve(scripted_llm, "old")
+    solve(scripted_llm, "old")
+    # a save directory from before the catalog existed
+    close_connections()
+    os.remove(catalog_path())
+    # the first solve after the upgrade creates the catalog
+    solve(scripted_llm, "new")
+    assert os.path.exists(catalog_path())
+    assert task_ids() == [("new", 1), ("old", 2)]
+    assert catalog.indexed_version() == catalog.SCHEMA_VERSION
+
+
+def test_recording_runs_reuses_one_connection(scripted_llm, monkeypatch):
+    opened = []
+    connect = catalog.connect
+    monkeypatch.setattr(catalog, "connect", lambda base_dir=None: opened.append(base_dir) or connect(base_dir))
+    for _ in range(3):
+        solve(scripted_llm, "alpha")
+    assert len(opened) <= 1
+    assert len(query_runs()) == 3
@@ -0,0 +1,83 @@
+import json
+import time
+
+import pytest
+
+from dollarslice.cli import main, parse_since
+from dollarslice.core import final_answer, run_solve
+
+
+def lookup(key: str) -> str:
+    '''Look a key up'''
+    return key.upper()
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+def solve(scripted_llm, task_id: str, answered: bool = True):
+    script = [[("lookup", {"key": "a"})], [("answer", {"result": "A"})] if answered else [("lookup", {"key": "b"})]]
+    run_solve(task_id, "Look up a", {}, [lookup, answer], scripted_llm(script), save=True, call_limit=3)
+
+
+@pytest.fixture
+def runs(scripted_llm):
+    """Two runs of alpha, one failed, and one of beta"""
+    for task_id, answered in (("alpha", True), ("alpha", False), ("beta", True)):
+        solve(scripted_llm, task_id, answered)
+
+
+def output(capsys, argv: list):
+    assert main(argv) == 0
+    return capsys.readouterr().out
+
+
+def test_list(runs, capsys):
+    rows = json.loads(output(capsys, ["list", "--json"]))
+    assert sorted(row["task_id"] for row in rows) == ["alpha", "alpha", "beta"]
+    failed = json.loads(output(capsys, ["list", "--failed", "--json"]))
+    assert [(row["task_id"], row["success"]) for row in failed] == [("alpha", 0)]
+    assert json.loads(output(capsys, ["list", "--tasks", "--json"])) == [{"task_id": "alpha", "runs": 2}, {"task_id": "beta", "runs": 1}]
+    text = output(capsys, ["list", "--task", "beta"])
+    assert text.startswith("beta\t") and "\tok\t" in text
+
+
+def test_show(runs, capsys):
+    row = json.loads(output(capsys, ["list", "--task", "beta", "--json"]))[0]
+    run = json.loads(output(capsys, ["show", "beta", row["run_id"], "--json"]))
+    assert (run["task_id"], run["complete"], run["answer_generated"], run["final_result"]) == ("beta", True, True, "A")
+    assert [step["type"] for step in run["steps"]] == ["llm", "function", "llm", "function"]
+    assert run["steps"][1]["output"] == "A"
+    assert "Look up a" in output(capsys, ["show", "beta", row["run_id"]])
+    assert main(["show", "beta", "missing"]) == 1
+
+
+def test_stats(runs, capsys):
+    stats = json.loads(output(capsys, ["stats", "--json", "--jobs", "1"]))
+    alpha = stats["tasks"]["alpha"]
+    assert (alpha["runs"], alpha["succeeded"], alpha["failed"], alpha["success_rate"]) == (2, 1, 1, 0.5)
+    # the failed run used all three of its LLM calls
+    assert stats["overall"]["runs"] == 3 and stats["overall"]["tokens_total"] == 70
+    assert alpha["llm_calls"] == {"2": 1, "3": 1}
+    assert {tool["name"]: tool["calls"] for tool in alpha["slowest_tools"]} == {"lookup": 4, "answer": 1}
+    assert "beta: 1 runs, 100.0% success" in output(capsys, ["stats", "--task", "beta"])
+
+
+def test_export(runs, capsys, tmp_path):
+    lines = output(capsys, ["export", "--task", "alpha"]).splitlines()
+    assert [json.loads(line)["task_id"] for line in lines] == ["alpha", "alpha"]
+    target = tmp_path / "runs.jsonl"
+    assert main(["export", "-o", str(target)]) == 0
+    assert "Exported 3 runs" in capsys.readouterr().err
+    assert len(target.read_text().splitlines()) == 3
+    assert output(capsys, ["export", "--since", "1h"]).count("\n") == 3
+    assert output(capsys, ["export", "--since", str(time.time() + 60)]) == ""
+
+
+def test_parse_since():
+    assert abs(parse_since("2h") - (time.time() - 7200)) < 5
+    assert parse_since("1700000000") == 1700000000.0
+    assert parse_since("2024-01-02") == parse_since("2024-01-02T00:00:00")
@@ -0,0 +1,85 @@
+from dollarslice.context import ContextBudget, KeepLastK, estimate_tokens
+from dollarslice.core import final_answer, run_solve
+
+
+def fetch(page: int) -> str:
+    '''Fetch a page of a long document'''
+    return f"page {page} " + "x" * 8000
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+class RecordingLLM:
+    """Wraps a ScriptedLLM, keeping the messages each round was sent"""
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.sent = []
+
+    def __call__(self, messages, functions, function_results, **kwargs):
+        messages, tool_results, metrics = self.llm(messages, functions, function_results, **kwargs)
+        self.sent.append([dict(message) for message in messages])
+        return messages, tool_results, metrics
+
+
+def tool_contents(messages: list) -> list:
+    return [message["content"] for message in messages if message.get("role") == "tool"]
+
+
+def test_offloaded_outputs_are_recorded_whole(scripted_llm):
+    llm = RecordingLLM(scripted_llm([[("fetch", {"page": 1})], [("fetch", {"page": 2})], [("answer", {"result": "done"})]]))
+    budget = ContextBudget(max_tokens=100000, offload_tokens=1000)
+    final_result, answered, steps = run_solve("read", "Read the document", {}, [fetch, answer], llm, context_budget=budget)
+    assert (final_result, answered) == ("done", True)
+    recorded = tool_contents(steps[-2][1].conversation())
+    assert recorded == [fetch(1), fetch(2)]
+    # the adapter got stubs, also for the earlier output in the last round
+    sent = tool_contents(llm.sent[-1])
+    assert len(sent) == 2 and all("call recall_output" in content for content in sent)
+    assert budget.report()["offloaded"] == 2
+
+
+def test_recall_output_reads_the_offloaded_text(scripted_llm):
+    script = [[("fetch", {"page": 1})], [("recall_output", {"handle": "out1", "offset": 4000})], [("answer", {"result": "done"})]]
+    budget = ContextBudget(max_tokens=100000, offload_tokens=1000)
+    _, _, steps = run_solve("read", "Read the document", {}, [fetch, answer], scripted_llm(script), context_budget=budget)
+    recalled = [step[3] for step in steps if step[0] == 'function' and step[1] == "recall_output"]
+    assert recalled[0].startswith(fetch(1)[4000:8000])
+
+
+def test_compaction_only_changes_what_is_sent(scripted_llm):
+    script = [[("fetch", {"page": page})] for page in range(1, 6)] + [[("answer", {"result": "done"})]]
+    llm = RecordingLLM(scripted_llm(script))
+    budget = ContextBudget(max_tokens=5000, offload_tokens=100000, policy=KeepLastK(1))
+    _, _, steps = run_solve("read", "Read the document", {}, [fetch, answer], llm, context_budget=budget)
+    assert tool_contents(steps[-2][1].conversation()) == [fetch(page) for page in range(1, 6)]
+    assert budget.report()["compactions"] >= 1
+    assert any("moved out of context" in content for content in tool_contents(llm.sent[-1]))
+
+
+def test_message_tokens_follow_the_content():
+    window = ContextBudget().open()
+    for size in (10, 400, 10, 4000):
+        message = {"role": "tool", "content": "y" * size}
+        assert window.message_tokens(message) == 4 + estimate_tokens("y" * size)
+        message["content"] = "z" * (size + 100)
+        assert window.message_tokens(message) == 4 + estimate_tokens("z" * (size + 100))
+
+
+def test_schema_tokens_are_counted_once_per_schema(scripted_llm):
+    schemas = []
+
+    def estimator(text):
+        if text.startswith('{"type": "function"'):
+            schemas.append(text)
+        return estimate_tokens(text)
+    budget = ContextBudget(max_tokens=100000, estimator=estimator)
+    script = [[("fetch", {"page": page})] for page in range(1, 4)] + [[("answer", {"result": "done"})]]
+    for _ in range(2):
+        run_solve("read", "Read the document", {}, [fetch, answer], scripted_llm(script), context_budget=budget)
+    # fetch, answer and recall_output, whose schema is the same in every run
+    assert len(schemas) == 3
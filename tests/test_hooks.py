@@ -0,0 +1,100 @@
+import json
+
+import httpx
+import pytest
+
+from dollarslice.core import final_answer, run_solve
+from dollarslice.hooks import Hooks, HookSet, use_hooks
+from dollarslice.llm import create_simple_llm
+
+
+def add(a: int, b: int) -> int:
+    '''Add two numbers'''
+    return a + b
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+SCRIPT = [[("add", {"a": 1, "b": 2})], [("answer", {"result": "3"})]]
+
+
+class Recorder(Hooks):
+
+    def __init__(self):
+        self.events = []
+
+    def on_llm_start(self, messages, functions):
+        self.events.append(("llm_start", [function.__name__ for function in functions]))
+
+    def on_llm_end(self, messages, tool_results, metrics):
+        self.events.append(("llm_end", [name for name, _, _ in tool_results], metrics))
+
+    def on_tool_start(self, name, args, id):
+        self.events.append(("tool_start", name, args))
+
+    def on_tool_end(self, name, args, id, output, trace):
+        self.events.append(("tool_end", name, output, trace))
+
+    def on_solve_end(self, final_result, answer_generated, steps, timings):
+        self.events.append(("solve_end", final_result, answer_generated, timings))
+
+
+def test_solve_emits_events_in_order(scripted_llm):
+    hooks = Recorder()
+    run_solve("math", "Add", {}, [add, answer], scripted_llm(SCRIPT), hooks=hooks)
+    assert [event[0] for event in hooks.events] == ["llm_start", "llm_end", "tool_start", "tool_end",
+                                                    "llm_start", "llm_end", "tool_start", "tool_end", "solve_end"]
+    assert hooks.events[0][1] == ["add", "answer"]
+    assert hooks.events[1][1] == ["add"] and hooks.events[1][2]["total_tokens"] == 10
+    assert hooks.events[2][1:] == ("add", {"a": 1, "b": 2})
+    _, name, output, trace = hooks.events[3]
+    assert (name, output) == ("add", 3)
+    assert {"start_time", "end_time", "duration"} <= trace.keys()
+    _, final_result, answered, timings = hooks.events[-1]
+    assert (final_result, answered) == ("3", True)
+    assert timings.keys() == {"duration", "save_time", "replayed", "stopped"}
+    assert timings["replayed"] is False and timings["stopped"] is None
+
+
+def test_use_hooks_applies_to_solves_without_hooks(scripted_llm):
+    installed, explicit = Recorder(), Recorder()
+    with use_hooks(installed):
+        run_solve("math", "Add", {}, [add, answer], scripted_llm(SCRIPT))
+        run_solve("math", "Add", {}, [add, answer], scripted_llm(SCRIPT), hooks=explicit)
+    run_solve("math", "Add", {}, [add, answer], scripted_llm(SCRIPT))
+    assert len(installed.events) == len(explicit.events) == 9
+
+
+def test_failing_hook_only_warns(scripted_llm):
+    class Broken:
+        def on_tool_end(self, *args):
+            raise RuntimeError("broken hook")
+    hooks = HookSet([Broken(), Recorder()])
+    assert hooks.handlers["on_llm_start"] and len(hooks.handlers["on_tool_end"]) == 2
+    with pytest.warns(UserWarning, match="on_tool_end hook failed"):
+        result = run_solve("math", "Add", {}, [add, answer], scripted_llm(SCRIPT), hooks=hooks)
+    assert result[:2] == ("3", True)
+
+
+def chat_completion(request):
+    return httpx.Response(200, json={
+        "choices": [{"message": {"role": "assistant", "content": None, "tool_calls": [
+            {"id": "call1", "type": "function", "function": {"name": "answer", "arguments": json.dumps({"result": "3"})}}]}}],
+        "usage": {"prompt_tokens": 40, "completion_tokens": 5, "total_tokens": 45}})
+
+
+def test_adapter_metrics_reach_the_hooks(mock_transport, provider_keys):
+    provider_keys(OPENAI_API_KEY="test")
+    hooks = Recorder()
+    llm = create_simple_llm(transport=mock_transport(chat_completion))
+    assert run_solve("math", "Add", {}, [add, answer], llm, hooks=hooks)[:2] == ("3", True)
+    metrics = [event[2] for event in hooks.events if event[0] == "llm_end"][0]
+    assert (metrics["total_tokens"], metrics["prompt_tokens"], metrics["completion_tokens"]) == (45, 40, 5)
+    timings = ("schema_time", "serialization_time", "rate_limit_wait", "time_to_first_byte",
+               "network_time", "parse_time", "duration")
+    assert all(metrics[key] >= 0 for key in timings)
+    assert metrics["time_to_first_byte"] <= metrics["network_time"] <= metrics["duration"]
@@ -0,0 +1,67 @@
+import os
+import signal
+import time
+
+import pytest
+
+from dollarslice.isolation import ToolFailure, ToolProcessPool
+
+
+def sleep_then_size(data: bytes, seconds: float) -> int:
+    time.sleep(seconds)
+    return len(data)
+
+
+def crash() -> None:
+    os._exit(3)
+
+
+def shared_blocks() -> set:
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+@pytest.fixture
+def pool():
+    pool = ToolProcessPool(workers=1, shm_threshold=1024)
+    yield pool
+    pool.close()
+
+
+def test_large_payloads_go_through_shared_memory(pool):
+    assert pool.call(sleep_then_size, {"data": b"x" * 100000, "seconds": 0}) == 100000
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="shared memory blocks are not visible as files")
+def test_unread_payload_is_unlinked_after_a_timeout(pool):
+    pool.start()
+    before = shared_blocks()
+    # a stopped worker never reads the block it was sent
+    os.kill(pool._idle[0].process.pid, signal.SIGSTOP)
+    output = pool.call(sleep_then_size, {"data": b"y" * 100000, "seconds": 0}, timeout=0.5)
+    assert isinstance(output, ToolFailure) and output.kind == "timeout"
+    assert shared_blocks() == before
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="shared memory blocks are not visible as files")
+def test_payload_to_a_dead_worker_is_unlinked(pool):
+    pool.start()
+    before = shared_blocks()
+    worker = pool._idle[0]
+    worker.process.kill()
+    worker.process.join()
+    output = pool.call(sleep_then_size, {"data": b"y" * 100000, "seconds": 0})
+    assert isinstance(output, ToolFailure) and output.kind == "crash"
+    assert shared_blocks() == before
+
+
+def test_dead_workers_are_replaced_on_the_next_call(pool):
+    output = pool.call(crash, {})
+    assert isinstance(output, ToolFailure) and output.kind == "crash"
+    assert pool.report()["workers"] == 0
+    assert pool.call(sleep_then_size, {"data": b"x", "seconds": 0}) == 1
+    assert pool.report()["workers"] == 1 and pool.report()["restarts"] == 1
+
+
+def test_exceptions_are_raised_again(pool):
+    with pytest.raises(TypeError):
+        pool.call(sleep_then_size, {"data": b"x"})
@@ -0,0 +1,149 @@
+import json
+
+import httpx
+
+from dollarslice.core import final_answer, run_solve
+from dollarslice.llm import CACHE_CONTROL, add_cache_breakpoints, anthropic_messages, create_from_anthropic, create_from_ollama_chat
+
+
+def lookup(key: str) -> str:
+    '''Look a key up'''
+    return key.upper()
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+def ollama_chat(rounds: list, stream: bool = False):
+    """Handler answering the nth request with the tool calls of rounds[n], as Ollama's /api/chat would"""
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        tool_calls = [{"function": {"name": name, "arguments": args}} for name, args in rounds[len(bodies) - 1]]
+        final = {"model": body["model"], "done": True, "prompt_eval_count": 30, "eval_count": 6,
+                 "load_duration": 1_000_000, "prompt_eval_duration": 2_000_000, "eval_duration": 3_000_000}
+        if not stream:
+            return httpx.Response(200, json=dict(final, message={"role": "assistant", "content": "", "tool_calls": tool_calls}))
+        chunks = [{"message": {"role": "assistant", "content": "ok"}, "done": False}]
+        # some servers send the arguments as a JSON string
+        chunks += [{"message": {"role": "assistant", "content": "", "tool_calls": [
+            {"function": {"name": call["function"]["name"], "arguments": json.dumps(call["function"]["arguments"])}}]}, "done": False}
+            for call in tool_calls]
+        chunks.append(dict(final, message={"role": "assistant", "content": ""}))
+        return httpx.Response(200, content="\n".join(json.dumps(chunk) for chunk in chunks) + "\n")
+    return handler, bodies
+
+
+ROUNDS = [[("lookup", {"key": "a"})], [("answer", {"result": "A"})]]
+
+
+def test_ollama_chat_native_tool_calls(mock_transport):
+    handler, bodies = ollama_chat(ROUNDS)
+    llm = create_from_ollama_chat("llama3.1", transport=mock_transport(handler), keep_alive=-1)
+    final_result, answered, steps = run_solve("ollama", "Look up a", {}, [lookup, answer], llm)
+    assert (final_result, answered) == ("A", True)
+    assert ('function', 'lookup', {"key": "a"}, "A") in [step[:4] for step in steps]
+    assert [body["keep_alive"] for body in bodies] == [-1, -1]
+    assert [tool["function"]["name"] for tool in bodies[0]["tools"]] == ["lookup", "answer"]
+    # each request only appends to the previous one, so the server can reuse its prompt cache
+    assert bodies[1]["tools"] == bodies[0]["tools"]
+    assert bodies[1]["messages"][:len(bodies[0]["messages"])] == bodies[0]["messages"]
+    assert bodies[1]["messages"][-1] == {"role": "tool", "tool_name": "lookup", "content": "A"}
+    metrics = [step for step in steps if step[0] == 'llm'][0][3][2]
+    assert (metrics["total_tokens"], metrics["prompt_tokens"], metrics["completion_tokens"]) == (36, 30, 6)
+    assert (metrics["load_time"], metrics["prompt_eval_time"], metrics["eval_time"]) == (0.001, 0.002, 0.003)
+
+
+def test_ollama_chat_stream(mock_transport):
+    handler, bodies = ollama_chat(ROUNDS, stream=True)
+    llm = create_from_ollama_chat("llama3.1", transport=mock_transport(handler), stream=True)
+    calls = []
+    messages, tool_results, metrics = llm([{"role": "user", "content": "Look up a"}], [lookup, answer], [],
+                                          on_tool_call=lambda *call: calls.append(call))
+    assert bodies[0]["stream"] is True and bodies[0]["keep_alive"] == "30m"
+    assert calls == [("lookup", {"key": "a"}, "call_0")]
+    assert tool_results == [("lookup", {"key": "a"}, "call_0")]
+    assert messages[-1]["content"] == "ok" and metrics["total_tokens"] == 36
+    assert metrics["time_to_first_tool_call"] is not None
+
+
+CONVERSATION = [
+    {"role": "system", "content": "Be brief"},
+    {"role": "user", "content": "Look up a and b"},
+    {"role": "assistant", "content": None, "tool_calls": [
+        {"id": "toolu_1", "type": "function", "function": {"name": "lookup", "arguments": '{"key": "a"}'}},
+        {"id": "toolu_2", "type": "function", "function": {"name": "lookup", "arguments": {"key": "b"}}}]},
+    {"role": "tool", "tool_call_id": "toolu_1", "name": "lookup", "content": "A"},
+    {"role": "tool", "tool_call_id": "toolu_2", "name": "lookup", "content": "B"},
+    {"role": "assistant", "content": None},
+    {"role": "user", "content": "And now?"},
+]
+
+
+def test_anthropic_messages():
+    system, messages = anthropic_messages(CONVERSATION)
+    assert system == [{"type": "text", "text": "Be brief"}]
+    assert [message["role"] for message in messages] == ["user", "assistant", "user", "assistant", "user"]
+    assert messages[1]["content"] == [{"type": "tool_use", "id": "toolu_1", "name": "lookup", "input": {"key": "a"}},
+                                      {"type": "tool_use", "id": "toolu_2", "name": "lookup", "input": {"key": "b"}}]
+    # both results go back in one user turn
+    assert messages[2]["content"] == [{"type": "tool_result", "tool_use_id": "toolu_1", "content": "A"},
+                                      {"type": "tool_result", "tool_use_id": "toolu_2", "content": "B"}]
+    assert messages[3]["content"] == [{"type": "text", "text": "(no output)"}]
+
+
+def test_cache_breakpoints():
+    system, messages = anthropic_messages(CONVERSATION)
+    data = {"tools": [{"name": "lookup"}, {"name": "answer"}], "system": system, "messages": messages}
+    add_cache_breakpoints(data)
+    marked = lambda blocks: [block.get("cache_control") == CACHE_CONTROL for block in blocks]
+    assert marked(data["tools"]) == [False, True]
+    assert marked(data["system"]) == [True]
+    # the end of this round and of the previous one, not older user turns
+    assert [marked(message["content"]) for message in messages if message["role"] == "user"] == [[False], [False, True], [True]]
+    assert not any(any(marked(message["content"])) for message in messages if message["role"] == "assistant")
+
+
+def anthropic_api(rounds: list):
+    bodies = []
+
+    def handler(request):
+        assert request.url.path.endswith("/messages") and request.headers["x-api-key"] == "test"
+        body = json.loads(request.content)
+        bodies.append(body)
+        content = [{"type": "text", "text": "Looking"}] + [
+            {"type": "tool_use", "id": f"toolu_{len(bodies)}_{index}", "name": name, "input": args}
+            for index, (name, args) in enumerate(rounds[len(bodies) - 1])]
+        return httpx.Response(200, json={"type": "message", "role": "assistant", "content": content, "stop_reason": "tool_use",
+                                         "usage": {"input_tokens": 12, "output_tokens": 7, "cache_creation_input_tokens": 100,
+                                                   "cache_read_input_tokens": 300 * (len(bodies) - 1)}})
+    return handler, bodies
+
+
+def test_anthropic_tool_use_and_prompt_caching(mock_transport, provider_keys):
+    provider_keys(ANTHROPIC_API_KEY="test")
+    handler, bodies = anthropic_api(ROUNDS)
+    llm = create_from_anthropic(model="claude-test", transport=mock_transport(handler))
+    final_result, answered, steps = run_solve("anthropic", "Look up a", {}, [lookup, answer], llm)
+    assert (final_result, answered) == ("A", True)
+    assert [body["model"] for body in bodies] == ["claude-test", "claude-test"]
+    assert [tool["name"] for tool in bodies[0]["tools"]] == ["lookup", "answer"]
+    assert bodies[0]["tools"][-1]["cache_control"] == CACHE_CONTROL
+    assert bodies[1]["messages"][-1]["content"][-1] == {"type": "tool_result", "tool_use_id": "toolu_1_0", "content": "A",
+                                                          "cache_control": CACHE_CONTROL}
+    metrics = [step[3][2] for step in steps if step[0] == 'llm']
+    assert [(m["cache_creation_tokens"], m["cache_read_tokens"]) for m in metrics] == [(100, 0), (100, 300)]
+    assert metrics[1]["prompt_tokens"] == 412 and metrics[1]["cached_tokens"] == 300
+
+
+def test_anthropic_without_prompt_caching(mock_transport, provider_keys):
+    provider_keys(ANTHROPIC_API_KEY="test")
+    handler, bodies = anthropic_api(ROUNDS)
+    llm = create_from_anthropic(transport=mock_transport(handler), prompt_caching=False)
+    llm([{"role": "user", "content": "Look up a"}], [lookup, answer], [])
+    assert "cache_control" not in json.dumps(bodies[0])
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from dollarslice.core import final_answer, run_solve
+from dollarslice.hooks import Hooks
+from dollarslice.loopguard import LoopGuard
+from dollarslice.recorder import find_run, read_run
+
+
+def move_forward() -> str:
+    '''Move one step forward'''
+    return "You bumped your face in the wall"
+
+
+def turn_left() -> str:
+    '''Turn left'''
+    return "You turned left"
+
+
+def turn_right() -> str:
+    '''Turn right'''
+    return "You turned right"
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+TOOLS = [move_forward, turn_left, turn_right, answer]
+
+
+class Ended(Hooks):
+    def on_solve_end(self, final_result, answer_generated, steps, timings):
+        self.timings = timings
+
+
+def llm_metrics(steps):
+    return [step[3][2] for step in steps if step[0] == 'llm']
+
+
+def test_abort_leaves_no_answer(scripted_llm):
+    guard, hooks = LoopGuard(actions=('abort',)), Ended()
+    final_result, answered, steps = run_solve("stuck", "Escape", {}, TOOLS, scripted_llm([[("move_forward", {})]]),
+                                              save=True, call_limit=50, loop_guard=guard, hooks=hooks)
+    assert final_result is None and answered is False
+    stopped = llm_metrics(steps)[-1]["loop_guard"]
+    assert stopped["action"] == "abort" and stopped["kind"] == "repeat"
+    assert stopped["reason"].startswith("Stopped after 3 of 50 rounds")
+    assert hooks.timings["stopped"] == stopped["reason"]
+    run_id = os.listdir(os.path.join(os.environ["DOLLAR_SLICE_SAVE_LOC"], "stuck"))[0].split('.')[0]
+    run = read_run(find_run("stuck", run_id))
+    assert run["stopped"] == stopped["reason"] and run["final_result"] is None
+    assert guard.report()["rounds_saved"] == 47
+
+
+def test_escalation_hint_then_final_only(scripted_llm):
+    llm = scripted_llm([[("move_forward", {})]])
+    final_result, answered, steps = run_solve("stuck", "Escape", {}, TOOLS, llm, call_limit=50, loop_guard=LoopGuard())
+    actions = [metrics["loop_guard"]["action"] for metrics in llm_metrics(steps) if "loop_guard" in metrics]
+    assert actions == ["hint", "final_only", "abort"]
+    offered = [step[2] for step in steps if step[0] == 'llm']
+    assert len(offered[-1]) == 1
+    tool_messages = [m["content"] for m in steps[-2][1].conversation() if m.get("role") == "tool"]
+    assert "Note: move_forward() returned the same result 3 times in a row" in tool_messages[2]
+
+
+def test_cycle_detected(scripted_llm):
+    llm = scripted_llm([[("turn_left", {})], [("turn_right", {})]] * 10)
+    _, _, steps = run_solve("spin", "Escape", {}, TOOLS, llm, call_limit=50, loop_guard=LoopGuard(actions=('abort',)))
+    assert llm_metrics(steps)[-1]["loop_guard"]["kind"] == "cycle"
+
+
+def test_answer_after_hint_counts_saved_rounds(scripted_llm):
+    guard = LoopGuard()
+    llm = scripted_llm([[("move_forward", {})]] * 3 + [[("answer", {"result": "out"})]])
+    final_result, answered, _ = run_solve("stuck", "Escape", {}, TOOLS, llm, call_limit=50, loop_guard=guard)
+    assert (final_result, answered) == ("out", True)
+    assert guard.report()["hint"] == 1 and guard.report()["rounds_saved"] == 46
+
+
+def test_no_saving_counted_when_run_fails(scripted_llm):
+    guard = LoopGuard()
+    script = scripted_llm([[("move_forward", {})]])
+
+    def llm(**kwargs):
+        if script.calls == 4:
+            raise RuntimeError("provider down")
+        return script(**kwargs)
+    with pytest.raises(RuntimeError):
+        run_solve("stuck", "Escape", {}, TOOLS, llm, call_limit=50, loop_guard=guard)
+    assert guard.report()["detections"] == 1 and guard.report()["rounds_saved"] == 0
@@ -0,0 +1,104 @@
+import functools
+import time
+
+from dollarslice.core import pure
+from dollarslice.memo import MISSING, ToolMemo, args_key, tool_key
+
+
+def make_adder(amount: int):
+    @pure
+    def add(value: int) -> int:
+        '''Add a fixed amount'''
+        return value + amount
+    return add
+
+
+@pure
+def double(value: int) -> int:
+    '''Double a value'''
+    return value * 2
+
+
+def test_closures_from_one_factory_are_different_tools():
+    add_one, add_hundred = make_adder(1), make_adder(100)
+    assert tool_key(add_one) != tool_key(add_hundred)
+    memo = ToolMemo()
+    memo.put(add_one, {"value": 1}, 2)
+    assert memo.get(add_hundred, {"value": 1}) is MISSING
+    assert memo.get(add_one, {"value": 1}) == 2
+
+
+def test_same_function_same_key():
+    assert tool_key(double) == tool_key(double)
+    memo = ToolMemo()
+    memo.put(double, {"value": 3}, 6)
+    assert memo.get(double, {"value": 3}) == 6
+    assert memo.report()["hits"] == 1
+
+
+def test_wrapper_shares_key_of_wrapped_function():
+    @functools.wraps(double)
+    def wrapper(**kwargs):
+        return double(**kwargs)
+    assert tool_key(wrapper) == tool_key(double)
+
+
+def test_argument_order_does_not_matter():
+    assert args_key({"a": 1, "b": [1, 2]}) == args_key({"b": [1, 2], "a": 1})
+
+
+def test_outputs_are_detached():
+    memo = ToolMemo()
+    memo.put(double, {"value": 1}, [1, 2])
+    memo.get(double, {"value": 1}).append(3)
+    assert memo.get(double, {"value": 1}) == [1, 2]
+
+
+def test_ttl_and_per_tool_limit():
+    @pure(ttl=0.05, max_entries=2)
+    def look(query: str) -> str:
+        '''Look something up'''
+        return query
+    memo = ToolMemo()
+    memo.put(look, {"query": "a"}, "a")
+    time.sleep(0.06)
+    assert memo.get(look, {"query": "a"}) is MISSING
+    for query in "bcd":
+        memo.put(look, {"query": query}, query)
+    assert memo.get(look, {"query": "b"}) is MISSING
+    assert memo.get(look, {"query": "d"}) == "d"
+
+
+def test_global_limit_evicts_least_recently_used():
+    memo = ToolMemo(max_entries=2)
+    memo.put(double, {"value": 1}, 2)
+    memo.put(double, {"value": 2}, 4)
+    memo.get(double, {"value": 1})
+    memo.put(double, {"value": 3}, 6)
+    assert memo.get(double, {"value": 2}) is MISSING
+    assert memo.get(double, {"value": 1}) == 2
+
+
+def test_per_tool_limit_evicts_least_recently_used():
+    @pure(max_entries=2)
+    def look(query: str) -> str:
+        '''Look something up'''
+        return query
+    memo = ToolMemo()
+    memo.put(look, {"query": "a"}, "a")
+    memo.put(look, {"query": "b"}, "b")
+    memo.put(double, {"value": 1}, 2)
+    memo.get(look, {"query": "a"})
+    memo.put(look, {"query": "c"}, "c")
+    assert memo.get(look, {"query": "b"}) is MISSING
+    assert memo.get(look, {"query": "a"}) == "a"
+    assert memo.get(double, {"value": 1}) == 2
+
+
+def test_tools_without_entries_are_forgotten():
+    memo = ToolMemo(max_entries=4)
+    for amount in range(50):
+        memo.put(make_adder(amount), {"value": 1}, amount + 1)
+    assert len(memo._per_tool) == 4
+    memo.clear()
+    assert memo._per_tool == {}
@@ -0,0 +1,124 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from dollarslice.blobstore import BLOB_TAG, BlobStore, internalize
+from dollarslice.core import final_answer, pure, run_solve
+from dollarslice.recorder import StreamRecorder, decode_value, encode_value, find_run, read_run, rewrite_run, run_files
+
+
+class Point:
+    def __repr__(self):
+        return "Point(1, 2)"
+
+
+VALUES = [
+    None, True, 3, 2.5, "text", [1, "two", None],
+    (1, (2, 3), [4]),
+    {"nested": {"tuple": ("a", 1), "list": [("b", 2)]}},
+    {1: "int key", ("tuple", "key"): [1]},
+    {"$tuple": "a dict that looks like a tag"},
+    {"$dict": [], "other": 1},
+    datetime(2024, 5, 17, 12, 30, 5, 250),
+]
+
+
+@pytest.mark.parametrize("value", VALUES, ids=repr)
+def test_encode_decode_round_trip(value):
+    encoded = encode_value(value)
+    assert decode_value(json.loads(json.dumps(encoded))) == value
+
+
+def test_unknown_objects_come_back_as_their_repr():
+    assert decode_value(json.loads(json.dumps(encode_value({"point": Point()})))) == {"point": "Point(1, 2)"}
+
+
+def test_long_strings_become_blob_references(tmp_path):
+    store = BlobStore(str(tmp_path))
+    value = {"short": "abc", "long": "x" * 2000, "items": ("y" * 2000, 1)}
+    encoded = json.loads(json.dumps(encode_value(value, store, threshold=1024)))
+    assert encoded["short"] == "abc" and set(encoded["long"]) == {BLOB_TAG}
+    # the same string is stored once
+    assert encoded["long"] != encoded["items"]["$tuple"][0]
+    assert decode_value(internalize(encoded, store)) == value
+
+
+@pure
+def lookup(key: str) -> tuple:
+    '''Look a key up'''
+    return (key, len(key))
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+SCRIPT = [[("lookup", {"key": "k" * 3000})], [("answer", {"result": "done"})]]
+
+
+def saved_run(scripted_llm, **kwargs):
+    final_result, answered, steps = run_solve("record", "Look it up", {}, [lookup, answer], scripted_llm(SCRIPT), save=True, **kwargs)
+    task_dir = os.path.join(os.environ["DOLLAR_SLICE_SAVE_LOC"], "record")
+    run_id = os.listdir(task_dir)[0].split(".")[0]
+    return steps, read_run(find_run("record", run_id), allow_pickle=kwargs.get("save_format") == "pickle")
+
+
+def function_steps(steps: list) -> list:
+    return [step[:4] for step in steps if step[0] == 'function']
+
+
+@pytest.mark.parametrize("options", [{}, {"compress": True}, {"save_format": "blobs"}, {"save_format": "pickle"}], ids=repr)
+def test_saved_run_reads_back(scripted_llm, options):
+    steps, data = saved_run(scripted_llm, **options)
+    assert data["complete"] and data["answer_generated"] is True
+    assert function_steps(data["steps"]) == function_steps(steps)
+    conversations = [step[1].conversation() if hasattr(step[1], "conversation") else step[1]
+                     for step in data["steps"] if step[0] == 'llm']
+    assert conversations[-1] == steps[-2][1].conversation()
+    schema_ids = [schema_id for step in data["steps"] if step[0] == 'llm' for schema_id in step[2]]
+    assert set(schema_ids) <= set(data["schemas"])
+
+
+def test_pickled_runs_are_only_read_when_allowed(scripted_llm):
+    saved_run(scripted_llm, save_format="pickle")
+    task_dir = os.path.join(os.environ["DOLLAR_SLICE_SAVE_LOC"], "record")
+    with pytest.raises(ValueError, match="dollarslice migrate"):
+        read_run(os.path.join(task_dir, os.listdir(task_dir)[0]))
+    assert list(run_files()) == [] and len(list(run_files(pickles=True))) == 1
+
+
+def test_truncated_segment_reads_up_to_the_last_line(tmp_path):
+    recorder = StreamRecorder("record", "cut", path=str(tmp_path / "cut.jsonl"))
+    recorder.header("task", {}, [])
+    recorder.record(('function', "lookup", {"key": "a"}, ("a", 1), {}))
+    recorder.close()
+    with open(recorder.path, "ab") as f:
+        f.write(b'{"type":"function","name":"lo')
+    data = read_run(recorder.path)
+    assert not data["complete"]
+    assert data["steps"] == [('function', "lookup", {"key": "a"}, ("a", 1), {})]
+
+
+def test_rewrite_run_keeps_the_run(scripted_llm):
+    steps, data = saved_run(scripted_llm, save_format="pickle")
+    task_dir = os.path.join(os.environ["DOLLAR_SLICE_SAVE_LOC"], "record")
+    pickle_path = os.path.join(task_dir, os.listdir(task_dir)[0])
+    store = BlobStore(os.environ["DOLLAR_SLICE_SAVE_LOC"])
+    rewritten = read_run(rewrite_run(pickle_path, blobs=store, compress=True))
+    assert rewritten["complete"] and rewritten["answer_generated"] is True
+    assert function_steps(rewritten["steps"]) == function_steps(steps)
+
+
+def test_rewrite_run_keeps_the_footer(tmp_path):
+    recorder = StreamRecorder("record", "stopped", path=str(tmp_path / "record" / "stopped.jsonl"))
+    recorder.header("task", {}, [])
+    recorder.record(('function', "lookup", {"key": "a"}, ("a", 1), {}))
+    recorder.footer(False, None, stopped="the model was stuck")
+    recorder.close()
+    rewritten = read_run(rewrite_run(recorder.path, compress=True))
+    assert (rewritten["complete"], rewritten["answer_generated"], rewritten["stopped"]) == (True, False, "the model was stuck")
+    assert rewritten["steps"] == [('function', "lookup", {"key": "a"}, ("a", 1), {})]
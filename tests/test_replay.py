@@ -0,0 +1,180 @@
+import asyncio
+import os
+import pickle
+
+import pytest
+
+from dollarslice.core import arun_solve, final_answer, pure, run_solve
+from dollarslice.recorder import StreamRecorder, read_run
+from dollarslice.replay import ReplayIndex
+
+effects = []
+
+
+@pure
+def corners(size: str) -> tuple:
+    '''Corners of a square'''
+    return (0, int(size))
+
+
+def move(steps: int) -> str:
+    '''Move some steps, which has a side effect'''
+    effects.append(steps)
+    return f"moved {steps}"
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+TOOLS = [corners, move, answer]
+TASK = "Walk a square of size {size}"
+SCRIPT = [[("corners", {"size": "3"})], [("move", {"steps": 3})], [("answer", {"result": "done"})]]
+
+
+def solve_once(scripted_llm, size: str = "3", **kwargs):
+    llm = scripted_llm(SCRIPT)
+    result = run_solve("walk", TASK, {"size": size}, TOOLS, llm, save=True, **kwargs)
+    return result, llm
+
+
+def lookup(index: ReplayIndex, size: str = "3"):
+    return index.lookup("walk", TASK, {"size": size}, TOOLS)
+
+
+def test_replay_skips_llm_and_side_effects(scripted_llm):
+    (final_result, answered, _), _ = solve_once(scripted_llm)
+    assert (final_result, answered) == ("done", True)
+    effects.clear()
+    (final_result, answered, steps), llm = solve_once(scripted_llm, replay='unverified')
+    assert (final_result, answered, steps) == ("done", True, [])
+    assert llm.calls == 0
+    # only pure tools and the final answer are run again
+    assert effects == []
+
+
+def test_runs_with_unchecked_tools_need_an_opt_in(scripted_llm):
+    solve_once(scripted_llm)
+    (final_result, answered, steps), llm = solve_once(scripted_llm, replay=True)
+    assert (final_result, answered) == ("done", True) and steps and llm.calls == 3
+    index = ReplayIndex()
+    assert index.replay(lookup(index), TOOLS) is None
+    assert index.report()["unverified"] == 1
+
+
+def test_runs_of_pure_tools_replay_without_an_opt_in(scripted_llm):
+    script = [[("corners", {"size": "3"})], [("answer", {"result": "done"})]]
+    run_solve("walk", TASK, {"size": "3"}, TOOLS, scripted_llm(script), save=True)
+    llm = scripted_llm(script)
+    assert run_solve("walk", TASK, {"size": "3"}, TOOLS, llm, replay=True) == ("done", True, [])
+    assert llm.calls == 0
+
+
+def test_tool_raising_during_replay_falls_back_to_solving(scripted_llm):
+    solve_once(scripted_llm)
+
+    @pure
+    def corners(size: str) -> tuple:
+        '''Corners of a square'''
+        raise ConnectionError("the service is down")
+    index = ReplayIndex()
+    assert index.replay(lookup(index), [corners, move, answer], unverified=True) is None
+    assert asyncio.run(index.areplay(lookup(index), [corners, move, answer], unverified=True)) is None
+    assert index.report()["misses"] == 2
+    llm = scripted_llm([[("answer", {"result": "solved"})]])
+    result = run_solve("walk", TASK, {"size": "3"}, [corners, move, answer], llm, replay='unverified')
+    assert result[:2] == ("solved", True) and llm.calls == 1
+
+
+def test_async_solve_replays(scripted_llm):
+    solve_once(scripted_llm)
+    effects.clear()
+
+    async def never_called(**kwargs):
+        raise AssertionError("the LLM is not called for a replayed run")
+    final_result, answered, steps = asyncio.run(
+        arun_solve("walk", TASK, {"size": "3"}, TOOLS, never_called, replay='unverified'))
+    assert (final_result, answered, steps) == ("done", True, [])
+    assert effects == []
+
+
+def test_async_replay_awaits_async_tools(scripted_llm):
+    solve_once(scripted_llm)
+    index = ReplayIndex()
+
+    @pure
+    async def corners(size: str) -> tuple:
+        '''Corners of a square'''
+        return (0, int(size))
+    assert asyncio.run(index.areplay(lookup(index), [corners, move, answer], unverified=True)) == ("done", True)
+    assert index.report()["hits"] == 1
+
+
+def test_tuple_output_does_not_diverge(scripted_llm):
+    solve_once(scripted_llm)
+    index = ReplayIndex()
+    entry = lookup(index)
+    assert entry is not None
+    assert index.replay(entry, TOOLS, unverified=True) == ("done", True)
+    assert index.report()["divergences"] == 0
+
+
+def test_changed_pure_tool_diverges(scripted_llm):
+    solve_once(scripted_llm)
+    index = ReplayIndex()
+    entry = lookup(index)
+
+    @pure
+    def corners(size: str) -> tuple:
+        '''Corners of a square'''
+        return (1, int(size))
+    assert index.replay(entry, [corners, move, answer], unverified=True) is None
+    assert index.report()["divergences"] == 1
+
+
+def test_other_inputs_miss(scripted_llm):
+    solve_once(scripted_llm)
+    index = ReplayIndex()
+    assert lookup(index, "4") is None
+    assert index.report()["misses"] == 1
+
+
+def test_pickled_runs_are_not_unpickled(scripted_llm, monkeypatch):
+    script = [[("corners", {"size": "3"})], [("answer", {"result": "done"})]]
+    run_solve("walk", TASK, {"size": "3"}, TOOLS, scripted_llm(script), save=True, save_format="pickle")
+    monkeypatch.setattr(pickle, "load", lambda f: pytest.fail("unpickled during replay"))
+    llm = scripted_llm(script)
+    assert run_solve("walk", TASK, {"size": "3"}, TOOLS, llm, replay=True)[:2] == ("done", True)
+    assert llm.calls == 2
+
+
+def test_incomplete_runs_are_read_again_only_when_changed(save_location, monkeypatch):
+    recorder = StreamRecorder("walk", "unfinished")
+    recorder.header(TASK, {"size": "3"}, [])
+    recorder.close()
+    reads = []
+    import dollarslice.replay as replay
+    read_run = replay.read_run
+    monkeypatch.setattr(replay, "read_run", lambda path: reads.append(path) or read_run(path))
+    index = ReplayIndex()
+    assert lookup(index) is None
+    assert lookup(index) is None
+    assert len(reads) == 1
+    os.utime(recorder.path, (1, 1))
+    lookup(index)
+    assert len(reads) == 2
+
+
+def test_index_is_bounded(scripted_llm, save_location):
+    for size in ("1", "2", "3"):
+        solve_once(scripted_llm, size)
+    task_dir = save_location / "walk"
+    for path in task_dir.iterdir():
+        size = read_run(str(path))["inputs"]["size"]
+        os.utime(path, (int(size), int(size)))
+    index = ReplayIndex(max_entries=2)
+    assert lookup(index, "1") is None
+    assert lookup(index, "2") is not None
+    assert lookup(index, "3") is not None
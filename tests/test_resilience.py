@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from dollarslice.resilience import CircuitBreaker, Resilience, RetryPolicy
+
+
+def http_error(status: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://provider.test/v1/chat")
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=httpx.Response(status, request=request))
+
+
+def failing(error: Exception):
+    def send(timeout):
+        raise error
+    return send
+
+
+def resilience() -> Resilience:
+    return Resilience(providers=("p",), retry=RetryPolicy(max_attempts=1), hedge_percentile=None,
+                      failure_threshold=1, reset_timeout=0.05)
+
+
+def open_breaker(r: Resilience):
+    with pytest.raises(httpx.HTTPStatusError):
+        r.run([("p", failing(http_error(503)), False)])
+    assert r.breaker("p").state == "open"
+    assert not r.breaker("p").allow()
+    time.sleep(0.06)
+    assert r.breaker("p").state == "half_open"
+
+
+def test_breaker_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.admit() == (True, True)
+    # only one trial at a time
+    assert breaker.admit() == (False, False)
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_half_open_trial_settled_by_client_error():
+    r = resilience()
+    open_breaker(r)
+    with pytest.raises(httpx.HTTPStatusError):
+        r.run([("p", failing(http_error(400)), False)])
+    # a 400 says nothing about the provider's health, the next call may try again
+    assert r.breaker("p").allow()
+
+
+def test_half_open_trial_settled_by_exception():
+    r = resilience()
+    open_breaker(r)
+    with pytest.raises(KeyError):
+        r.run([("p", failing(KeyError("boom")), False)])
+    assert r.breaker("p").allow()
+
+
+def test_half_open_trial_settled_async():
+    r = resilience()
+    open_breaker(r)
+
+    async def send(timeout):
+        raise http_error(404)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(r.arun([("p", send, False)]))
+    assert r.breaker("p").allow()
+
+
+def test_successful_trial_closes():
+    r = resilience()
+    open_breaker(r)
+    body, attempts = r.run([("p", lambda timeout: {"ok": True}, False)])
+    assert body == {"ok": True} and attempts[-1]["outcome"] == "ok"
+    assert r.breaker("p").state == "closed"
+
+
+def test_failover_skips_open_circuit():
+    r = Resilience(providers=("a", "b"), retry=RetryPolicy(max_attempts=1), hedge_percentile=None,
+                   failure_threshold=1, reset_timeout=60)
+    plan = [("a", failing(http_error(503)), False), ("b", lambda timeout: "from b", False)]
+    assert r.run(plan)[0] == "from b"
+    body, attempts = r.run(plan)
+    assert body == "from b"
+    assert attempts[0]["outcome"] == "circuit_open"
@@ -0,0 +1,51 @@
+import asyncio
+
+from dollarslice.core import arun_solve, final_answer, run_solve
+
+
+def add(a: int, b: int) -> int:
+    '''Add two numbers'''
+    return a + b
+
+
+def multiply(a: int, b: int) -> int:
+    '''Multiply two numbers'''
+    return a * b
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+SCRIPT = [[("add", {"a": 1, "b": 2}), ("multiply", {"a": 3, "b": 4})], [("answer", {"result": "12"})]]
+
+
+def shape(steps: list) -> list:
+    return [(step[0], len(step[1].conversation())) if step[0] == 'llm' else step[:4] for step in steps]
+
+
+def test_sync_and_async_loops_record_the_same_steps(scripted_llm):
+    sync_llm, async_llm = scripted_llm(SCRIPT), scripted_llm(SCRIPT)
+
+    async def allm(**kwargs):
+        return async_llm(**kwargs)
+    sync_result = run_solve("math", "Compute", {}, [add, multiply, answer], sync_llm)
+    async_result = asyncio.run(arun_solve("math", "Compute", {}, [add, multiply, answer], allm))
+    assert sync_result[:2] == async_result[:2] == ("12", True)
+    assert shape(sync_result[2]) == shape(async_result[2])
+    assert ('function', 'multiply', {"a": 3, "b": 4}, 12) in shape(async_result[2])
+
+
+def test_call_limit_ends_both_loops(scripted_llm):
+    script = [[("add", {"a": 1, "b": 1})]]
+    llm = scripted_llm(script)
+    final_result, answered, steps = run_solve("math", "Compute", {}, [add, answer], llm, call_limit=3)
+    assert (final_result, answered, llm.calls) == (None, False, 3)
+    async_llm = scripted_llm(script)
+
+    async def allm(**kwargs):
+        return async_llm(**kwargs)
+    final_result, answered, steps = asyncio.run(arun_solve("math", "Compute", {}, [add, answer], allm, call_limit=3))
+    assert (final_result, answered, async_llm.calls) == (None, False, 3)
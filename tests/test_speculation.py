@@ -0,0 +1,97 @@
+import threading
+
+from dollarslice.core import final_answer, pure, run_solve
+from dollarslice.speculation import START, Speculator, TransitionModel
+
+ran = []
+ran_lock = threading.Lock()
+
+
+@pure
+def weather(city: str) -> str:
+    '''Weather of a city'''
+    with ran_lock:
+        ran.append(("weather", city))
+    return f"sunny in {city}"
+
+
+def book(city: str) -> str:
+    '''Book a trip, which has a side effect'''
+    with ran_lock:
+        ran.append(("book", city))
+    return f"booked {city}"
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+TOOLS = [weather, book, answer]
+
+
+def trip(scripted_llm, speculator, city: str = "Oslo", script: list = None):
+    script = script or [[("weather", {"city": city})], [("book", {"city": city})], [("answer", {"result": "ok"})]]
+    return run_solve("trip", "Plan a trip", {}, TOOLS, scripted_llm(script), speculate=speculator)
+
+
+def test_model_is_bounded():
+    model = TransitionModel(max_states=8, max_following=3)
+    for number in range(200):
+        model.learn([("fetch", {"page": number}), ("fetch", {"page": number + 1}), ("done", {})])
+    assert len(model.transitions) <= 8
+    assert all(len(following) <= 3 for following in model.transitions.values())
+    # arguments are kept for exactly the calls some state can lead to
+    assert set(model.args) == {key for following in model.transitions.values() for key in following}
+
+
+def test_frequent_next_calls_survive_the_bound():
+    model = TransitionModel(max_following=2)
+    for _ in range(5):
+        model.learn([("weather", {"city": "Oslo"})])
+    for city in ("Rome", "Lima", "Pune"):
+        model.learn([("weather", {"city": city})])
+    predicted = model.predict(START, 2, 0.0)
+    assert predicted[0][:2] == ("weather", {"city": "Oslo"})
+    assert len(model.transitions[START]) == 2
+
+
+def test_only_pure_calls_are_prefetched(scripted_llm):
+    speculator = Speculator(history_runs=0, min_confidence=0.1)
+    try:
+        trip(scripted_llm, speculator)
+        ran.clear()
+        trip(scripted_llm, speculator)
+        report = speculator.report()
+        assert report["started"] == 1 and report["hits"] == 1
+        # book was predicted too but has side effects, so it ran once, when asked for
+        assert ran.count(("book", "Oslo")) == 1 and ran.count(("weather", "Oslo")) == 1
+    finally:
+        speculator.close()
+
+
+def test_wrong_guesses_are_counted_as_wasted(scripted_llm):
+    speculator = Speculator(history_runs=0, min_confidence=0.1)
+    try:
+        trip(scripted_llm, speculator, "Oslo")
+        trip(scripted_llm, speculator, "Rome")
+        report = speculator.report()
+        assert report["hits"] == 0 and report["wasted"] == report["started"] >= 1
+        assert report["unpredicted"] >= 1
+    finally:
+        speculator.close()
+
+
+def test_history_is_learned_from_saved_runs(scripted_llm):
+    script = [[("weather", {"city": "Oslo"})], [("answer", {"result": "ok"})]]
+    run_solve("trip", "Plan a trip", {}, TOOLS, scripted_llm(script), save=True)
+    # one worker, so the history is learned before the next task runs
+    speculator = Speculator(min_confidence=0.1, workers=1)
+    try:
+        model = speculator.model("trip")
+        speculator._executor.submit(lambda: None).result()
+        assert model.runs == 1
+        assert model.predict(START, 1, 0.0)[0][:2] == ("weather", {"city": "Oslo"})
+    finally:
+        speculator.close()
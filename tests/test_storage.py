@@ -0,0 +1,97 @@
+import os
+import time
+
+from dollarslice.blobstore import BLOB_DIR, BLOB_TAG, BlobStore, internalize
+from dollarslice.core import final_answer, run_solve
+from dollarslice.recorder import read_run, run_files
+from dollarslice.storage import collect_garbage, migrate_runs
+
+LONG = "x" * 5000
+
+
+def fetch(page: str) -> str:
+    '''Fetch a page'''
+    return LONG + page
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+SCRIPT = [[("fetch", {"page": "1"})], [("answer", {"result": "done"})]]
+
+
+def solve(scripted_llm, **kwargs):
+    return run_solve("store", "Fetch page 1", {}, [fetch, answer], scripted_llm(SCRIPT), save=True, **kwargs)
+
+
+def blob_files(save_location) -> list:
+    root = save_location / BLOB_DIR
+    return sorted(path for path in root.rglob("*") if path.is_file()) if root.exists() else []
+
+
+def test_blobs_are_written_once(save_location):
+    store = BlobStore(str(save_location))
+    reference = store.ref(LONG)
+    assert store.ref(LONG) == reference and store.put(b'"' + LONG.encode() + b'"') == reference[BLOB_TAG]
+    assert len(blob_files(save_location)) == 1
+    report = store.report()
+    assert (report["written"], report["deduplicated"]) == (1, 2) and report["ratio"] > 10
+    # a new reader finds it on disk
+    assert internalize({"output": [reference]}, BlobStore(str(save_location))) == {"output": [LONG]}
+
+
+def test_runs_share_their_blobs(scripted_llm, save_location):
+    solve(scripted_llm, save_format="blobs")
+    blobs = blob_files(save_location)
+    solve(scripted_llm, save_format="blobs")
+    assert blob_files(save_location) == blobs
+    runs = [read_run(path) for path in run_files()]
+    assert len(runs) == 2
+    for run in runs:
+        assert [step[3] for step in run["steps"] if step[0] == 'function'] == [LONG + "1", "done"]
+
+
+def test_migrate_a_pickled_run(scripted_llm, save_location):
+    _, _, steps = solve(scripted_llm, save_format="pickle")
+    assert list(run_files()) == []
+    stats = migrate_runs(min_age=0)
+    assert (stats["migrated"], stats["failed"]) == (1, 0)
+    [path] = run_files(pickles=True)
+    assert not path.endswith(".pkl") and blob_files(save_location)
+    run = read_run(path)
+    assert run["complete"] and run["answer_generated"] is True
+    assert [step[:4] for step in run["steps"] if step[0] == 'function'] == [step[:4] for step in steps if step[0] == 'function']
+    # migrated runs can be replayed
+    llm = scripted_llm(SCRIPT)
+    assert run_solve("store", "Fetch page 1", {}, [fetch, answer], llm, replay='unverified')[:2] == ("done", True)
+    assert llm.calls == 0
+
+
+def test_migrate_skips_recent_segments(scripted_llm):
+    solve(scripted_llm)
+    assert migrate_runs(segments=True)["skipped"] == 1
+    assert migrate_runs(segments=True, min_age=0)["migrated"] == 1
+    # already using blobs
+    assert migrate_runs(segments=True, min_age=0)["skipped"] == 1
+
+
+def test_gc_keeps_referenced_and_recent_blobs(scripted_llm, save_location):
+    solve(scripted_llm, save_format="blobs")
+    referenced = blob_files(save_location)
+    store = BlobStore(str(save_location))
+    orphan, recent = store.ref("old " + LONG)[BLOB_TAG], store.ref("new " + LONG)[BLOB_TAG]
+    past = time.time() - 7200
+    for digest in (orphan, *[path.name for path in referenced]):
+        os.utime(store.path(digest), (past, past))
+    stats = collect_garbage(grace=3600, dry_run=True)
+    assert (stats["referenced"], stats["recent"], stats["removed"]) == (len(referenced), 1, 1)
+    assert os.path.exists(store.path(orphan))
+    stats = collect_garbage(grace=3600)
+    assert stats["removed"] == 1 and stats["bytes_freed"] > 0
+    assert not os.path.exists(store.path(orphan)) and os.path.exists(store.path(recent))
+    assert all(path.exists() for path in referenced)
+    assert collect_garbage(grace=0)["removed"] == 1
+    assert blob_files(save_location) == referenced
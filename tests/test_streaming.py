@@ -0,0 +1,126 @@
+import json
+import threading
+
+import httpx
+
+from dollarslice.core import final_answer, run_solve
+from dollarslice.llm import create_simple_llm
+from dollarslice.streaming import TIMINGS_KEY, AnthropicStreamParser, OllamaStreamParser, OpenAIStreamParser
+
+
+def sse(event: dict) -> str:
+    return "data: " + json.dumps(event)
+
+
+def tool_delta(index: int, id: str = None, name: str = None, arguments: str = "") -> dict:
+    delta = {"index": index, "function": {"arguments": arguments}}
+    if id:
+        delta.update(id=id, type="function")
+        delta["function"]["name"] = name
+    return {"choices": [{"index": 0, "delta": {"tool_calls": [delta]}}]}
+
+
+FINISH = {"choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls"}]}
+USAGE = {"choices": [], "usage": {"prompt_tokens": 20, "completion_tokens": 8, "total_tokens": 28}}
+
+
+def feed(parser, lines: list) -> dict:
+    for line in lines:
+        parser.feed_line(line)
+    return parser.finish()
+
+
+def test_openai_chunks_are_reassembled():
+    calls = []
+    parser = OpenAIStreamParser(lambda *call: calls.append(call))
+    parser.feed_line(sse(tool_delta(0, "call_a", "lookup", '{"ke')))
+    parser.feed_line(sse(tool_delta(0, arguments='y": "a"}')))
+    assert calls == []
+    parser.feed_line("")
+    parser.feed_line(sse(tool_delta(1, "call_b", "lookup", '{"key": "b"}')))
+    # the second call's first delta completes the first
+    assert calls == [("lookup", {"key": "a"}, "call_a")]
+    body = feed(parser, [sse(FINISH), sse(USAGE), "data: [DONE]"])
+    assert calls[1] == ("lookup", {"key": "b"}, "call_b")
+    tool_calls = body["choices"][0]["message"]["tool_calls"]
+    assert [call["function"]["arguments"] for call in tool_calls] == ['{"key": "a"}', '{"key": "b"}']
+    assert body["usage"]["total_tokens"] == 28
+    assert body[TIMINGS_KEY]["time_to_first_tool_call"] >= body[TIMINGS_KEY]["time_to_first_token"] >= 0
+
+
+def test_anthropic_events_are_reassembled():
+    calls = []
+    parser = AnthropicStreamParser(lambda *call: calls.append(call))
+    events = [
+        {"type": "message_start", "message": {"usage": {"input_tokens": 15, "cache_read_input_tokens": 200}}},
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Let me "}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "check"}},
+        {"type": "content_block_stop", "index": 0},
+        {"type": "content_block_start", "index": 1, "content_block": {"type": "tool_use", "id": "toolu_1", "name": "lookup", "input": {}}},
+        {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": '{"key"'}},
+        {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": ': "a"}'}},
+    ]
+    for event in events:
+        parser.feed_line("event: " + event["type"])
+        parser.feed_line(sse(event))
+    assert calls == []
+    parser.feed_line(sse({"type": "content_block_stop", "index": 1}))
+    assert calls == [("lookup", {"key": "a"}, "toolu_1")]
+    body = feed(parser, [sse({"type": "message_delta", "delta": {"stop_reason": "tool_use"}, "usage": {"output_tokens": 9}}),
+                         sse({"type": "message_stop"})])
+    assert body["content"] == [{"type": "text", "text": "Let me check"},
+                               {"type": "tool_use", "id": "toolu_1", "name": "lookup", "input": {"key": "a"}}]
+    assert body["stop_reason"] == "tool_use"
+    assert body["usage"] == {"input_tokens": 15, "output_tokens": 9, "cache_read_input_tokens": 200}
+
+
+def test_ollama_generate_object_is_a_tool_call_once_closed():
+    calls = []
+    parser = OllamaStreamParser(lambda *call: calls.append(call))
+    pieces = ['Sure: {"name": "lookup", ', '"arguments": {"key": "}', '{"}}', ' done']
+    for piece in pieces[:-1]:
+        parser.feed_line(json.dumps({"response": piece, "done": False}))
+    assert calls == [("lookup", {"key": "}{"}, "ollama_call")]
+    body = feed(parser, [json.dumps({"response": pieces[-1], "done": False}), "",
+                         json.dumps({"response": "", "done": True, "eval_count": 9})])
+    assert body["response"] == "".join(pieces) and body["eval_count"] == 9
+
+
+lookup_started = threading.Event()
+
+
+def lookup(key: str) -> str:
+    '''Look a key up'''
+    lookup_started.set()
+    return key.upper()
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+def test_tool_call_starts_before_the_stream_ends(mock_transport, provider_keys):
+    provider_keys(OPENAI_API_KEY="test")
+    lookup_started.clear()
+    waited = []
+
+    def round_one():
+        yield (sse(tool_delta(0, "call_a", "lookup", '{"key": "a"}')) + "\n\n").encode()
+        yield (sse(tool_delta(1, "call_b", "answer", '{"result": ')) + "\n\n").encode()
+        # the rest of the response only arrives once the first call has started
+        waited.append(lookup_started.wait(5))
+        for event in (tool_delta(1, arguments='"A"}'), FINISH, USAGE):
+            yield (sse(event) + "\n\n").encode()
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=round_one(), headers={"content-type": "text/event-stream"})
+    llm = create_simple_llm(transport=mock_transport(handler), stream=True)
+    final_result, answered, steps = run_solve("stream", "Look up a", {}, [lookup, answer], llm)
+    assert (final_result, answered) == ("A", True)
+    assert waited == [True]
+    metrics = [step for step in steps if step[0] == 'llm'][0][3][2]
+    assert metrics["time_to_first_tool_call"] is not None and metrics["total_tokens"] == 28
@@ -0,0 +1,80 @@
+from dollarslice.core import final_answer, run_solve
+from dollarslice.toolselect import ToolSelector, terms
+
+TOPICS = ["weather forecast", "stock price", "currency exchange", "flight status", "hotel booking",
+          "restaurant review", "movie showtime", "train schedule", "parcel tracking", "news headline",
+          "recipe search", "dictionary definition", "translation service", "calendar event", "email inbox",
+          "music playlist", "traffic report", "air quality", "sports score", "tide table"]
+
+
+def make_tool(topic: str):
+    name = topic.replace(" ", "_")
+
+    def tool(query: str) -> str:
+        return f"{topic} for {query}"
+    tool.__name__ = tool.__qualname__ = name
+    tool.__doc__ = f"Look up the {topic} for a query"
+    return tool
+
+
+TOOLS = [make_tool(topic) for topic in TOPICS]
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+def offered(llm_class):
+    """llm_class recording the names of the tools offered each round"""
+    class Recording(llm_class):
+        def __call__(self, messages, functions, function_results, **kwargs):
+            self.offered = getattr(self, "offered", []) + [[function.__name__ for function in functions]]
+            return super().__call__(messages, functions, function_results, **kwargs)
+    return Recording
+
+
+def test_terms():
+    assert terms("getWeatherForecast for the_ports") == ["get", "weather", "forecast", "port"]
+
+
+def test_each_round_offers_the_top_k(scripted_llm):
+    script = [[("weather_forecast", {"query": "Paris"})], [("answer", {"result": "sunny"})]]
+    llm = offered(scripted_llm)(script)
+    selector = ToolSelector(top_k=3)
+    final_result, answered, steps = run_solve("select", "What is the weather forecast in Paris?", {}, TOOLS + [answer],
+                                              llm, tool_selector=selector)
+    assert (final_result, answered) == ("sunny", True)
+    first, second = llm.offered
+    assert len(first) == len(second) == 3 + 2
+    assert first[0] == "weather_forecast" and first[-2:] == ["answer", "find_tools"]
+    # the final answer tool is offered every round, whatever the query
+    assert "answer" in second and "weather_forecast" in second
+    metrics = [step[3][2] for step in steps if step[0] == 'llm']
+    assert [m["tools_offered"] for m in metrics] == [5, 5]
+    assert all(m["tool_tokens_saved"] > 0 for m in metrics)
+    report = selector.report()
+    assert (report["runs"], report["rounds"], report["tools_total"]) == (1, 2, 2 * 22)
+
+
+def test_find_tools_offers_what_the_model_asked_for(scripted_llm):
+    script = [[("find_tools", {"query": "track my parcel"})], [("parcel_tracking", {"query": "123"})],
+              [("answer", {"result": "on its way"})]]
+    llm = offered(scripted_llm)(script)
+    selector = ToolSelector(top_k=2, expand_k=1)
+    final_result, answered, steps = run_solve("select", "Where is my order?", {}, TOOLS + [answer], llm,
+                                              tool_selector=selector)
+    assert (final_result, answered) == ("on its way", True)
+    found = [step[3] for step in steps if step[0] == 'function' and step[1] == "find_tools"][0]
+    assert found.startswith("parcel_tracking") and "\n" not in found
+    assert "parcel_tracking" not in llm.offered[0]
+    assert "parcel_tracking" in llm.offered[1] and "parcel_tracking" in llm.offered[2]
+    report = selector.report()
+    assert (report["searches"], report["expanded"], report["unoffered_calls"]) == (1, 1, 0)
+
+
+def test_small_tool_sets_are_sent_whole(scripted_llm):
+    llm = offered(scripted_llm)([[("answer", {"result": "done"})]])
+    run_solve("select", "Anything", {}, TOOLS[:3] + [answer], llm, tool_selector=ToolSelector(top_k=3))
+    assert llm.offered == [[tool.__name__ for tool in TOOLS[:3]] + ["answer"]]
@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+import pytest
+
+from dollarslice import transport as transport_module
+from dollarslice.llm import acreate_simple_llm, create_simple_llm
+from dollarslice.transport import AsyncTransport, Transport, get_async_transport
+
+
+def completion(request):
+    return httpx.Response(200, json={
+        "choices": [{"message": {"role": "assistant", "content": "hi"}}],
+        "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4}})
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """Clients the transports create, each answering with completion"""
+    clients = []
+
+    def factory(client_class):
+        def create(**kwargs):
+            client = client_class(transport=httpx.MockTransport(completion))
+            clients.append((client, kwargs))
+            return client
+        return create
+    monkeypatch.setattr(transport_module.httpx, "Client", factory(httpx.Client))
+    monkeypatch.setattr(transport_module.httpx, "AsyncClient", factory(httpx.AsyncClient))
+    return clients
+
+
+def test_one_client_per_origin():
+    transport = Transport(max_connections=4, http2=False)
+    first = transport.client("https://api.openai.com/v1/chat/completions")
+    assert transport.client("https://api.openai.com/v1/models") is first
+    assert transport.client("https://api.groq.com/openai/v1/chat/completions") is not first
+    assert transport.client("http://api.openai.com/v1/chat/completions") is not first
+    transport.close()
+    with pytest.raises(RuntimeError):
+        transport.client("https://api.openai.com/v1/chat/completions")
+
+
+def test_calls_reuse_the_client(created, provider_keys):
+    provider_keys(OPENAI_API_KEY="test")
+    transport = Transport(max_keepalive_connections=5)
+    llm = create_simple_llm(transport=transport)
+    for _ in range(3):
+        messages, _, metrics = llm([{"role": "user", "content": "hello"}], [], [])
+        assert messages[-1]["content"] == "hi" and metrics["total_tokens"] == 4
+    assert len(created) == 1
+    assert created[0][1]["limits"].max_keepalive_connections == 5
+    transport.close()
+
+
+def test_async_calls_reuse_the_loops_client(created, provider_keys):
+    provider_keys(OPENAI_API_KEY="test")
+
+    async def main():
+        llm = acreate_simple_llm()
+        for _ in range(3):
+            await llm([{"role": "user", "content": "hello"}], [], [])
+        shared = get_async_transport()
+        assert isinstance(shared, AsyncTransport) and get_async_transport() is shared
+        await transport_module.close_async_transport()
+    asyncio.run(main())
+    asyncio.run(main())
+    # one client per event loop
+    assert len(created) == 2
+
+
+def test_async_transport_must_be_closed_with_aclose():
+    with pytest.raises(TypeError):
+        AsyncTransport().close()
+
+
+def test_configure_transport_replaces_the_shared_one():
+    previous = transport_module.get_transport()
+    configured = transport_module.configure_transport(max_connections=7)
+    try:
+        assert transport_module.get_transport() is configured is not previous
+        assert previous._closed and configured.limits.max_connections == 7
+    finally:
+        transport_module.close_transport()
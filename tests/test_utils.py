@@ -0,0 +1,46 @@
+import gc
+
+import pytest
+
+from dollarslice import utils
+from dollarslice.utils import schema_by_id, schema_of
+
+
+def make_tool(number: int):
+    def tool(value: int) -> int:
+        return value
+    tool.__name__ = f"tool_{number}"
+    tool.__doc__ = f"Tool number {number}"
+    return tool
+
+
+@pytest.fixture
+def few_ids(monkeypatch):
+    monkeypatch.setattr(utils, "_MAX_SCHEMA_IDS", 4)
+
+
+def test_schema_ids_are_bounded(few_ids):
+    tools = [make_tool(number) for number in range(10)]
+    ids = [schema_of(tool).id for tool in tools]
+    assert len(utils._schemas_by_id) <= 4
+    # evicted ids of live functions are found again
+    assert schema_by_id(ids[0]) == schema_of(tools[0]).description
+    assert ids[0] in utils._schemas_by_id
+
+
+def test_collected_and_evicted_ids_raise_key_error(few_ids):
+    schema_id = schema_of(make_tool(100)).id
+    gc.collect()
+    for number in range(101, 106):
+        schema_of(make_tool(number))
+    with pytest.raises(KeyError):
+        schema_by_id(schema_id)
+
+
+def test_recompiled_schema_gets_a_new_id():
+    tool = make_tool(200)
+    first = schema_of(tool).id
+    tool.__doc__ = "Changed docstring"
+    second = schema_of(tool).id
+    assert first != second
+    assert schema_by_id(second)[3] == "Changed docstring"
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from dollarslice import browse, viewer
+from dollarslice.core import final_answer, run_solve
+from dollarslice.recorder import find_run
+from dollarslice.viewer import RunView
+
+
+def lookup(key: str) -> str:
+    '''Look a key up'''
+    return key.upper()
+
+
+@final_answer
+def answer(result: str) -> str:
+    '''Give the final answer'''
+    return result
+
+
+SCRIPT = [[("lookup", {"key": key})] for key in "abc"] + [[("answer", {"result": "ABC"})]]
+
+
+def saved_run(scripted_llm, task_id: str = "view", **kwargs) -> str:
+    run_solve(task_id, "Look up a, b and c", {}, [lookup, answer], scripted_llm(SCRIPT), save=True, **kwargs)
+    task_dir = os.path.join(os.environ["DOLLAR_SLICE_SAVE_LOC"], task_id)
+    return sorted(os.listdir(task_dir), key=lambda name: os.path.getmtime(os.path.join(task_dir, name)))[-1].split(".")[0]
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    """Kinds of the records the viewer decodes"""
+    kinds = []
+    decode_line = viewer.decode_line
+
+    def counting(line, file_path):
+        record = decode_line(line, file_path)
+        kinds.append(record["type"])
+        return record
+    monkeypatch.setattr(viewer, "decode_line", counting)
+    return kinds
+
+
+@pytest.mark.parametrize("options", [{}, {"compress": True}, {"save_format": "blobs"}], ids=repr)
+def test_steps_are_decoded_on_access(scripted_llm, decoded, options):
+    run_id = saved_run(scripted_llm, **options)
+    view = RunView(find_run("view", run_id))
+    assert "llm" not in decoded and "function" not in decoded
+    assert decoded.count("header") == decoded.count("footer") == 1
+    assert len(view) == 8 and view.complete
+    assert view.step(5)[:4] == ('function', 'lookup', {"key": "c"}, "C")
+    assert decoded.count("function") == 1 and "llm" not in decoded
+    llm_step = view.step(6)
+    # only the messages this call added
+    assert [message["role"] for message in llm_step[1]] == ["tool", "assistant"]
+    assert llm_step[3][1] == [("answer", {"result": "ABC"}, "call4_0")]
+
+
+def test_pickled_runs_are_shown_only_on_request(scripted_llm, capsys):
+    run_id = saved_run(scripted_llm, save_format="pickle")
+    file_path = find_run("view", run_id)
+    with pytest.raises(ValueError):
+        RunView(file_path)
+    view = RunView(file_path, allow_pickle=True)
+    assert len(view) == 8 and view.step(5)[:4] == ('function', 'lookup', {"key": "c"}, "C")
+    browse.load_and_print("view", run_id)
+    out = capsys.readouterr().out
+    assert "Look up a, b and c" in out and "ABC" in out
+
+
+def test_browse_pages_through_runs(scripted_llm, monkeypatch):
+    run_ids = [saved_run(scripted_llm) for _ in range(3)]
+    monkeypatch.setattr(browse, "PAGE_SIZE", 2)
+    assert [run_id for run_id, _ in browse.list_task_files("view", limit=2)] == run_ids[::-1][:2]
+    assert [run_id for run_id, _ in browse.list_task_files("view", limit=2, offset=2)] == run_ids[:1]
+    answers = iter(["n", "3", ""])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+    assert browse.select_task_file("view") == run_ids[0]
+    assert browse.select_task_file("view") is None
+
+
+def test_browse_run_decodes_only_the_steps_shown(scripted_llm, decoded, monkeypatch, capsys):
+    run_id = saved_run(scripted_llm)
+    prompts, answers = [], iter(["n", "4", "q"])
+    monkeypatch.setattr("builtins.input", lambda prompt: prompts.append(prompt) or next(answers))
+    browse.browse_run("view", run_id)
+    assert [prompt.split(" ")[1] for prompt in prompts] == ["1/8", "2/8", "4/8"]
+    assert decoded.count("llm") + decoded.count("function") == 3
+    assert "lookup" in capsys.readouterr().out